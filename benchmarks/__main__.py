@@ -0,0 +1,80 @@
+"""
+Benchmark suite command line.
+
+Usage (from the repository root):
+
+    python -m benchmarks run --output baseline.json
+    python -m benchmarks run --output current.json --real
+    python -m benchmarks compare baseline.json current.json --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from .compare import compare
+
+DEFAULT_WEIGHTS = "weights/weight-merged.pt"
+
+
+def main(argv=None):
+    """Runs the benchmark command line and returns an exit code."""
+    parser = argparse.ArgumentParser(description="Detection path benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark suite.")
+    run_parser.add_argument("--output", help="Write results to this JSON file.")
+    run_parser.add_argument(
+        "--quick", action="store_true", help="Skip large and real-time cases."
+    )
+    run_parser.add_argument(
+        "--real",
+        action="store_true",
+        help="Also time the real model when its weights are present.",
+    )
+    run_parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    run_parser.add_argument("--filter", help="Only run cases containing this text.")
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare results against a baseline."
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed relative slowdown before a case counts as a regression.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        weights = None
+        if args.real:
+            if os.path.exists(args.weights):
+                weights = args.weights
+            else:
+                print(f"{args.weights} not found; skipping real-model cases.")
+        # Imported here so comparing results does not need the app's dependencies.
+        from .suite import run_suite
+
+        results = run_suite(args.quick, weights, args.filter)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output_file:
+                json.dump(results, output_file, indent=2)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.current, encoding="utf-8") as current_file:
+        current = json.load(current_file)
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} regression(s)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark for extract_image_data against the previous per-box Python loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extract_image_data --boxes 10 100 500
+"""
+
+import argparse
+import timeit
+
+import pandas as pd
+
+from src.detect.image_processing import extract_image_data
+
+from .stub_model import make_result, torch
+
+
+def legacy_extract_image_data(result, confidence_threshold):
+    """The per-box loop that ``extract_image_data`` used before vectorization."""
+    boxes = result.boxes
+    class_ids = boxes.cls
+    confidences = boxes.conf
+    xywh = boxes.xywh
+
+    data = []
+    for i in range(len(class_ids)):
+        confidence = confidences[i] * 100
+        if confidence >= confidence_threshold:
+            class_name = result.names[int(class_ids[i])]
+            x_center, y_center, width, height = xywh[i]
+            x0, y0 = int(x_center - width / 2), int(y_center - height / 2)
+            x1, y1 = int(x_center + width / 2), int(y_center + height / 2)
+            data.append(
+                [
+                    i + 1,
+                    class_name,
+                    f"{confidence:.2f} %",
+                    x0,
+                    x1,
+                    y0,
+                    y1,
+                    f"{width/4:.2f}",
+                    f"{height/4:.2f}",
+                ]
+            )
+
+    return pd.DataFrame(
+        data,
+        columns=[
+            "ID",
+            "Class",
+            "Confidence",
+            "x0",
+            "x1",
+            "y0",
+            "y1",
+            "Width (cm)",
+            "Height (cm)",
+        ],
+    )
+
+
+def bench(func, result, confidence_threshold, repeat):
+    """Returns the best per-call time in milliseconds over ``repeat`` runs."""
+    timer = timeit.Timer(lambda: func(result, confidence_threshold))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--boxes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--confidence", type=float, default=25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backend = "torch" if torch is not None else "numpy"
+    print(f"boxes backend: {backend}")
+    print(f"{'boxes':>6} {'legacy ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for num_boxes in args.boxes:
+        result = make_result(num_boxes)
+        legacy = bench(legacy_extract_image_data, result, args.confidence, args.repeat)
+        vectorized = bench(extract_image_data, result, args.confidence, args.repeat)
+        print(
+            f"{num_boxes:>6} {legacy:>10.3f} {vectorized:>14.3f} {legacy / vectorized:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
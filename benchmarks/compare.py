@@ -0,0 +1,35 @@
+"""
+Regression comparison between two benchmark result files.
+"""
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Compares two result sets and lists regressions.
+
+    Args:
+        baseline (dict): Results loaded from the baseline JSON file.
+        current (dict): Results loaded from the current JSON file.
+        threshold (float): Allowed relative slowdown for cases without their
+            own tolerance.
+
+    Returns:
+        tuple[list[str], list[str]]: Report lines and the names of regressed cases.
+    """
+    lines, regressions = [], []
+    baseline_results = baseline["results"]
+    for name, measurement in current["results"].items():
+        if name not in baseline_results:
+            lines.append(f"{name:<52} new")
+            continue
+        old, new = baseline_results[name]["value"], measurement["value"]
+        change = (new - old) / old if old else 0.0
+        worse = change if measurement["better"] == "lower" else -change
+        tolerance = measurement.get("tolerance", threshold)
+        status = "REGRESSION" if worse > tolerance else "ok"
+        if worse > tolerance:
+            regressions.append(name)
+        lines.append(f"{name:<52} {old:>10.3f} -> {new:>10.3f} {change:+7.1%} {status}")
+    for name in sorted(baseline_results.keys() - current["results"].keys()):
+        lines.append(f"{name:<52} missing")
+    return lines, regressions
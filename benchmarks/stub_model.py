@@ -0,0 +1,170 @@
+"""
+Deterministic stand-ins for the YOLO model and its inputs.
+
+``StubModel`` mimics the parts of an Ultralytics model the app uses: it is
+called with a frame (or a list of frames) and returns results exposing
+``boxes``, ``names``, ``orig_img`` and ``speed``. Box counts and an optional
+simulated inference latency are configurable, so benchmarks of the per-frame
+path run offline without weights.
+"""
+
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+NAMES = {
+    0: "scratch",
+    1: "inclusion",
+    2: "patch",
+    3: "pitted",
+    4: "rolled",
+    5: "crazing",
+}
+
+
+def make_boxes(num_boxes, width=1920, height=1080, seed=0):
+    """
+    Builds random YOLO-like boxes.
+
+    Args:
+        num_boxes (int): Number of boxes.
+        width (int): Frame width the boxes are spread over.
+        height (int): Frame height the boxes are spread over.
+        seed (int): Random seed.
+
+    Returns:
+        SimpleNamespace: Object exposing ``xywh``, ``conf`` and ``cls`` as torch
+            tensors when torch is installed and numpy arrays otherwise.
+    """
+    rng = np.random.default_rng(seed)
+    xywh = np.column_stack(
+        [
+            rng.uniform(0, width, num_boxes),
+            rng.uniform(0, height, num_boxes),
+            rng.uniform(4, 200, num_boxes),
+            rng.uniform(4, 200, num_boxes),
+        ]
+    ).astype(np.float32)
+    conf = rng.uniform(0, 1, num_boxes).astype(np.float32)
+    cls = rng.integers(0, len(NAMES), num_boxes).astype(np.float32)
+    if torch is not None:
+        xywh, conf, cls = (
+            torch.from_numpy(xywh),
+            torch.from_numpy(conf),
+            torch.from_numpy(cls),
+        )
+    return SimpleNamespace(xywh=xywh, conf=conf, cls=cls)
+
+
+def make_result(num_boxes, seed=0, frame=None):
+    """
+    Builds a synthetic YOLO-like result with random boxes.
+
+    Args:
+        num_boxes (int): Number of boxes in the result.
+        seed (int): Random seed.
+        frame (np.ndarray, optional): Image exposed as ``orig_img``.
+
+    Returns:
+        SimpleNamespace: Object exposing ``boxes``, ``names``, ``orig_img`` and
+            ``speed`` like a YOLO result.
+    """
+    if frame is None:
+        width, height = 1920, 1080
+    else:
+        height, width = frame.shape[:2]
+    return SimpleNamespace(
+        boxes=make_boxes(num_boxes, width, height, seed),
+        names=NAMES,
+        orig_img=frame,
+        speed={"preprocess": 0.0, "inference": 0.0, "postprocess": 0.0},
+    )
+
+
+def make_frame(width=1920, height=1080, seed=0):
+    """
+    Builds a synthetic BGR frame with a steel-like texture.
+
+    Args:
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        seed (int): Random seed.
+
+    Returns:
+        np.ndarray: ``uint8`` array of shape ``(height, width, 3)``.
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(90, 170, width, dtype=np.float32)
+    noise = rng.normal(0, 12, (height, width)).astype(np.float32)
+    gray = np.clip(gradient[None, :] + noise, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def make_video(path, num_frames=60, frame_rate=30, width=1280, height=720, seed=0):
+    """
+    Writes a synthetic MP4 whose frames drift so consecutive frames differ.
+
+    Args:
+        path (str): Output path ending in ``.mp4``.
+        num_frames (int): Number of frames.
+        frame_rate (float): Frames per second.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        seed (int): Random seed.
+
+    Returns:
+        str: ``path``.
+    """
+    base = make_frame(width + num_frames, height, seed)
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter_fourcc(*"mp4v"), frame_rate, (width, height)
+    )
+    try:
+        for index in range(num_frames):
+            writer.write(np.ascontiguousarray(base[:, index : index + width]))
+    finally:
+        writer.release()
+    return path
+
+
+class StubModel:
+    """
+    Callable that returns a fixed number of random boxes per frame.
+
+    Each frame gets the same boxes for the same call index, so repeated runs
+    are deterministic.
+
+    Args:
+        num_boxes (int): Boxes returned per frame.
+        latency (float): Simulated inference time per frame, in seconds.
+        seed (int): Random seed.
+    """
+
+    def __init__(self, num_boxes=10, latency=0.0, seed=0):
+        self.num_boxes = num_boxes
+        self.latency = latency
+        self.seed = seed
+        self.names = NAMES
+        self.calls = 0
+
+    def __call__(self, source, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        results = []
+        for frame in frames:
+            start = time.perf_counter()
+            frame = np.asarray(frame)
+            result = make_result(self.num_boxes, self.seed + self.calls, frame)
+            self.calls += 1
+            remaining = self.latency - (time.perf_counter() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+            result.speed["inference"] = (time.perf_counter() - start) * 1000
+            results.append(result)
+        return results
@@ -0,0 +1,297 @@
+"""
+Benchmark cases for the per-frame detection path.
+
+Every case returns one measurement: a value, its unit, whether lower or
+higher is better and optionally its own regression tolerance. Cases run
+against ``StubModel`` and synthetic frames, so the suite needs no weights,
+camera, GPU or Streamlit. When a weights file is given, the real model is
+timed as well.
+"""
+
+import importlib.util
+import io
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import timeit
+
+import cv2
+import numpy as np
+
+from src.detect.image_processing import (
+    AnnotationRenderer,
+    annotate_image,
+    extract_detections,
+    extract_image_data,
+    process_frame,
+)
+from src.detect.offline_processing import process_video_offline
+
+from .stub_model import StubModel, make_frame, make_result, make_video, torch
+
+CONFIDENCE = 25
+FRAME_SIZE = (1920, 1080)
+VIDEO_SIZE = (1280, 720)
+VIDEO_FRAMES = 60
+VIDEO_FRAME_RATE = 30
+# Real-time playback depends on thread scheduling, so its results are noisier.
+VIDEO_TOLERANCE = 0.2
+
+
+def _measurement(value, unit="ms", better="lower", tolerance=None):
+    measurement = {"value": value, "unit": unit, "better": better}
+    if tolerance is not None:
+        measurement["tolerance"] = tolerance
+    return measurement
+
+
+def time_call(func, repeat=5):
+    """
+    Times ``func`` and returns the best per-call time in milliseconds.
+
+    Args:
+        func (callable): Function without arguments.
+        repeat (int): Number of timing rounds; the fastest round is kept.
+
+    Returns:
+        float: Milliseconds per call.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+
+class NullPlaceholder:
+    """Accepts the Streamlit placeholder calls made by ``play_video``."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _record(self, *args, **kwargs):
+        self.calls += 1
+
+    image = text = dataframe = _record
+
+
+def bench_extract_image_data(num_boxes, repeat):
+    result = make_result(num_boxes)
+    return _measurement(
+        time_call(lambda: extract_image_data(result, CONFIDENCE), repeat)
+    )
+
+
+def bench_annotate_image(num_boxes, repeat):
+    result = make_result(num_boxes, frame=make_frame(*FRAME_SIZE))
+    detections = extract_detections(result, CONFIDENCE)
+    renderer = AnnotationRenderer()
+    return _measurement(
+        time_call(
+            lambda: annotate_image(result, detections, renderer, in_place=True),
+            repeat,
+        )
+    )
+
+
+def bench_process_frame(model, repeat):
+    frame = make_frame(*FRAME_SIZE)
+    renderer = AnnotationRenderer()
+    return _measurement(
+        time_call(lambda: process_frame(frame, model, CONFIDENCE, renderer), repeat)
+    )
+
+
+def bench_process_video(video_bytes, latency, keyframe_interval=1):
+    """
+    Plays the synthetic video in real time and measures the processed share.
+
+    Args:
+        video_bytes (bytes): Encoded synthetic video.
+        latency (float): Simulated inference time per frame, in seconds.
+        keyframe_interval (int): Run the stub model on every Nth frame.
+
+    Returns:
+        dict: Processed frames as a fraction of source frames.
+    """
+    # The real-time path hands frames to Streamlit, so it is imported only here.
+    from src.detect.video_processing import process_video
+
+    upload = io.BytesIO(video_bytes)
+    upload.name = "benchmark.mp4"
+    stats = process_video(
+        upload,
+        StubModel(num_boxes=10, latency=latency),
+        NullPlaceholder(),
+        NullPlaceholder(),
+        NullPlaceholder(),
+        NullPlaceholder(),
+        CONFIDENCE,
+        keyframe_interval=keyframe_interval,
+    )
+    return _measurement(
+        stats["frames_processed"] / VIDEO_FRAMES,
+        "ratio",
+        "higher",
+        tolerance=VIDEO_TOLERANCE,
+    )
+
+
+def bench_process_video_offline(video_bytes):
+    """
+    Runs every frame of the synthetic video through the batched offline path.
+
+    Args:
+        video_bytes (bytes): Encoded synthetic video.
+
+    Returns:
+        dict: Milliseconds per frame, including decode, extraction and annotation.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "benchmark.mp4")
+        with open(video_path, "wb") as video_file:
+            video_file.write(video_bytes)
+        stats = process_video_offline(
+            video_path,
+            StubModel(num_boxes=10),
+            CONFIDENCE,
+            os.path.join(directory, "annotated.mp4"),
+            None,
+        )
+    return _measurement(stats["elapsed"] / stats["frames"] * 1000)
+
+
+def _synthetic_video():
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_video(
+            os.path.join(directory, "benchmark.mp4"),
+            VIDEO_FRAMES,
+            VIDEO_FRAME_RATE,
+            *VIDEO_SIZE,
+        )
+        with open(path, "rb") as video_file:
+            return video_file.read()
+
+
+def build_cases(quick=False, weights=None):
+    """
+    Lists the benchmark cases to run.
+
+    Args:
+        quick (bool): Run fewer box counts and skip the video cases. The
+            real-time video cases are also skipped without Streamlit.
+        weights (str, optional): YOLO weights for the real-model cases.
+
+    Returns:
+        list[tuple]: ``(name, callable)`` pairs; each callable returns a
+            measurement dict.
+    """
+    repeat = 3 if quick else 5
+    box_counts = (10, 100) if quick else (10, 100, 500)
+    cases = []
+    for num_boxes in box_counts:
+        cases.append(
+            (
+                f"extract_image_data[boxes={num_boxes}]",
+                lambda n=num_boxes: bench_extract_image_data(n, repeat),
+            )
+        )
+        cases.append(
+            (
+                f"annotate_image[boxes={num_boxes}]",
+                lambda n=num_boxes: bench_annotate_image(n, repeat),
+            )
+        )
+    cases.append(
+        (
+            "process_frame[stub,boxes=10]",
+            lambda: bench_process_frame(StubModel(num_boxes=10), repeat),
+        )
+    )
+
+    if not quick:
+        video_bytes = _synthetic_video()
+        cases.append(
+            (
+                "process_video_offline[stub,per_frame]",
+                lambda: bench_process_video_offline(video_bytes),
+            )
+        )
+    if not quick and importlib.util.find_spec("streamlit") is not None:
+        for latency in (0.02, 0.05):
+            cases.append(
+                (
+                    f"process_video[stub,latency={latency * 1000:.0f}ms,processed]",
+                    lambda latency=latency: bench_process_video(video_bytes, latency),
+                )
+            )
+        cases.append(
+            (
+                "process_video[stub,latency=50ms,keyframe=5,processed]",
+                lambda: bench_process_video(video_bytes, 0.05, keyframe_interval=5),
+            )
+        )
+
+    if weights is not None:
+        from src.detect.model_loader import load_yolo_model
+
+        model = load_yolo_model(weights, device="cpu")
+        cases.append(
+            (
+                f"process_frame[{os.path.basename(weights)}]",
+                lambda: bench_process_frame(model, repeat),
+            )
+        )
+    return cases
+
+
+def environment():
+    """
+    Describes the machine and library versions the results came from.
+
+    Returns:
+        dict: Environment metadata.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "torch": torch.__version__ if torch is not None else None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run_suite(quick=False, weights=None, pattern=None):
+    """
+    Runs the benchmark cases and prints one line per case.
+
+    Args:
+        quick (bool): Run the reduced suite.
+        weights (str, optional): YOLO weights for the real-model cases.
+        pattern (str, optional): Only run cases whose name contains this text.
+
+    Returns:
+        dict: ``{"environment": ..., "results": {name: measurement}}``.
+    """
+    cv2.setNumThreads(1)
+    results = {}
+    for name, case in build_cases(quick, weights):
+        if pattern and pattern not in name:
+            continue
+        measurement = case()
+        results[name] = measurement
+        print(f"{name:<52} {measurement['value']:>10.3f} {measurement['unit']}")
+    return {"environment": environment(), "results": results}
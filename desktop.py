@@ -1,31 +1,217 @@
 """
 Desktop module.
+
+Starts the Streamlit server in the background and shows it in a pywebview
+window. A splash page is shown until the server answers its health check,
+the server preloads the detection model while the user logs in, a crashed
+server is restarted and the server is stopped when the window closes.
 """
 
+import os
+import socket
 import subprocess
+import sys
+import threading
+import time
+import urllib.request
 
 import webview
 
 PORT = 8500
+HOST = "127.0.0.1"
+STARTUP_TIMEOUT = 120
+HEALTH_INTERVAL = 0.2
+SHUTDOWN_TIMEOUT = 5
+MAX_RESTARTS = 5
+RESTART_WINDOW = 300
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SPLASH_HTML = """
+<html>
+<body style="font-family: sans-serif; display: flex; align-items: center;
+             justify-content: center; height: 100vh; margin: 0;">
+  <div style="text-align: center;">
+    <h2>Steel Defect Detection</h2>
+    <p>{message}</p>
+  </div>
+</body>
+</html>
+"""
+
+
+def find_free_port(preferred=PORT, host=HOST):
+    """
+    Returns ``preferred`` if it is free, otherwise a port chosen by the OS.
+
+    Args:
+        preferred (int): Port to try first.
+        host (str): Interface the server will listen on.
+
+    Returns:
+        int: Free port.
+    """
+    for port in (preferred, 0):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind((host, port))
+            except OSError:
+                continue
+            return sock.getsockname()[1]
+    raise OSError("No free port available")
+
+
+def is_healthy(port, host=HOST, timeout=1.0):
+    """Returns whether the Streamlit server on ``port`` answers its health check."""
+    try:
+        with urllib.request.urlopen(
+            f"http://{host}:{port}/_stcore/health", timeout=timeout
+        ) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+class StreamlitServer:
+    """
+    Runs ``main.py`` under Streamlit as a supervised child process.
+
+    Args:
+        port (int): Port the server listens on.
+        host (str): Interface the server listens on.
+    """
+
+    def __init__(self, port, host=HOST):
+        self.port = port
+        self.host = host
+        self.process = None
+        self.restarts = []
+
+    @property
+    def url(self):
+        """Address of the app."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Starts the server process without waiting for it to be ready."""
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "streamlit",
+                "run",
+                "main.py",
+                "--server.headless=true",
+                f"--server.address={self.host}",
+                f"--server.port={self.port}",
+                "--browser.gatherUsageStats=false",
+            ],
+            cwd=APP_DIR,
+            env={**os.environ, "DETECT_PRELOAD": "1"},
+        )
+
+    def running(self):
+        """Returns whether the server process is alive."""
+        return self.process is not None and self.process.poll() is None
 
+    def wait_ready(self, timeout=STARTUP_TIMEOUT, stop_event=None):
+        """
+        Polls the health endpoint until the server answers.
 
-def start_streamlit_app():
-    """Run Streamlit in headless mode using subprocess"""
-    subprocess.Popen(
-        [
-            "streamlit",
-            "run",
-            "main.py",
-            "--server.headless=true",
-            f"--server.port={PORT}",
-        ]
+        Args:
+            timeout (float): Seconds to wait.
+            stop_event (threading.Event, optional): Aborts the wait when set.
+
+        Returns:
+            bool: True once healthy; False on timeout, abort or process exit.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.running() or (stop_event and stop_event.is_set()):
+                return False
+            if is_healthy(self.port, self.host):
+                return True
+            time.sleep(HEALTH_INTERVAL)
+        return False
+
+    def can_restart(self):
+        """Returns whether fewer than ``MAX_RESTARTS`` happened in ``RESTART_WINDOW``."""
+        now = time.monotonic()
+        self.restarts = [t for t in self.restarts if now - t < RESTART_WINDOW]
+        return len(self.restarts) < MAX_RESTARTS
+
+    def restart(self):
+        """Stops the old process if needed and starts a new one."""
+        self.stop()
+        self.restarts.append(time.monotonic())
+        self.start()
+
+    def stop(self):
+        """Terminates the server, killing it if it does not exit in time."""
+        if not self.running():
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def supervise(window, server, closing):
+    """
+    Shows the app once ready and restarts the server if it dies.
+
+    Runs on the pywebview worker thread until the window closes.
+
+    Args:
+        window (webview.Window): Window showing the splash page.
+        server (StreamlitServer): Started server.
+        closing (threading.Event): Set when the window is closing.
+    """
+
+    def show(message):
+        window.load_html(SPLASH_HTML.format(message=message))
+
+    while not closing.is_set():
+        if server.wait_ready(stop_event=closing):
+            window.load_url(server.url)
+            while server.running() and not closing.wait(1.0):
+                pass
+            if closing.is_set():
+                return
+            message = "The server stopped unexpectedly. Restarting..."
+        else:
+            if closing.is_set():
+                return
+            message = "The server did not start. Retrying..."
+
+        if not server.can_restart():
+            show(
+                "The server keeps failing. Please close the window and contact support."
+            )
+            return
+        show(message)
+        server.restart()
+
+
+def main():
+    """Starts the server, shows the window and cleans up on close."""
+    server = StreamlitServer(find_free_port())
+    # Start the server first so it boots while the window is created.
+    server.start()
+    closing = threading.Event()
+
+    window = webview.create_window(
+        "Steel Defect Detection",
+        html=SPLASH_HTML.format(message="Starting..."),
     )
+    window.events.closed += closing.set
+    try:
+        webview.start(supervise, (window, server, closing))
+    finally:
+        closing.set()
+        server.stop()
 
 
 if __name__ == "__main__":
-    # Start the Streamlit app
-    start_streamlit_app()
-
-    # Create a pywebview window to display the Streamlit app
-    webview.create_window("Streamlit App", f"http://127.0.0.1:{PORT}")
-    webview.start()
+    main()
@@ -4,7 +4,7 @@ Main streamlit module.
 
 import streamlit as st
 
-import src.menu_page as menu_page
+from src.detect import preload
 from src.login.ui import render_login_ui
 
 st.set_page_config(page_title="APPS", page_icon=":key:")
@@ -13,8 +13,15 @@ st.set_page_config(page_title="APPS", page_icon=":key:")
 def main():
     """Initialize the Streamlit app and handle authentication."""
     if not st.session_state.get("logged_in", False):
+        if preload.enabled():
+            preload.start_preload()
         render_login_ui()
     else:
+        # Imported after login so the login page paints without loading it.
+        import src.menu_page as menu_page
+        from src import migrate
+
+        migrate.start_partition_maintenance()
         menu_page.main()
 
 
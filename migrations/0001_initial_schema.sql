@@ -1,4 +1,6 @@
-BEGIN;
+-- Baseline schema (formerly create_table.txt).
+-- Existing databases created from that file should be marked as applied with:
+--     python -m src.migrate baseline 0001
 
 CREATE TABLE IF NOT EXISTS public.user_admin
 (
@@ -117,5 +119,3 @@ ALTER TABLE IF EXISTS public.training
     REFERENCES public.user_admin (id_user)
     ON UPDATE CASCADE
     ON DELETE CASCADE;
-
-END;
\ No newline at end of file
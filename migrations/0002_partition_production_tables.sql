@@ -0,0 +1,116 @@
+-- Range-partition production_anomaly and production_defect by created_at month.
+--
+-- A primary key on a partitioned table must include the partition key, so
+-- the keys become (id, created_at) and the final_defect foreign keys to
+-- these tables are dropped; id_anomaly/id_defect stay unique through their
+-- sequences.
+
+CREATE OR REPLACE FUNCTION public.create_monthly_partitions(
+    parent text,
+    from_month timestamp with time zone,
+    months_ahead integer
+) RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start timestamp with time zone := date_trunc('month', from_month);
+    last_month timestamp with time zone :=
+        date_trunc('month', now()) + make_interval(months => months_ahead);
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.%I
+             FOR VALUES FROM (%L) TO (%L)',
+            parent || '_' || to_char(month_start, '"y"YYYY"m"MM'),
+            parent,
+            month_start,
+            month_start + interval '1 month'
+        );
+        month_start := month_start + interval '1 month';
+    END LOOP;
+END;
+$$;
+
+ALTER TABLE IF EXISTS public.final_defect
+    DROP CONSTRAINT IF EXISTS foreign_anomaly_final_defect;
+
+ALTER TABLE IF EXISTS public.final_defect
+    DROP CONSTRAINT IF EXISTS foreign_defect_final_defect;
+
+-- production_anomaly
+
+ALTER TABLE public.production_anomaly RENAME TO production_anomaly_unpartitioned;
+ALTER TABLE public.production_anomaly_unpartitioned
+    RENAME CONSTRAINT anomaly_pkey TO anomaly_unpartitioned_pkey;
+
+CREATE TABLE public.production_anomaly
+(
+    id_anomaly integer NOT NULL
+        DEFAULT nextval('public.production_anomaly_id_anomaly_seq'::regclass),
+    path_gambar character varying COLLATE pg_catalog."default" NOT NULL,
+    conf_level numeric(5,2) NOT NULL,
+    x0 integer NOT NULL,
+    y0 integer NOT NULL,
+    x1 integer NOT NULL,
+    y1 integer NOT NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT now(),
+    CONSTRAINT anomaly_pkey PRIMARY KEY (id_anomaly, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE public.production_anomaly_id_anomaly_seq
+    OWNED BY public.production_anomaly.id_anomaly;
+
+CREATE TABLE public.production_anomaly_default
+    PARTITION OF public.production_anomaly DEFAULT;
+
+SELECT public.create_monthly_partitions(
+    'production_anomaly',
+    COALESCE((SELECT MIN(created_at) FROM public.production_anomaly_unpartitioned), now()),
+    3
+);
+
+INSERT INTO public.production_anomaly
+    (id_anomaly, path_gambar, conf_level, x0, y0, x1, y1, created_at)
+SELECT id_anomaly, path_gambar, conf_level, x0, y0, x1, y1, COALESCE(created_at, now())
+FROM public.production_anomaly_unpartitioned;
+
+DROP TABLE public.production_anomaly_unpartitioned;
+
+-- production_defect
+
+ALTER TABLE public.production_defect RENAME TO production_defect_unpartitioned;
+ALTER TABLE public.production_defect_unpartitioned
+    RENAME CONSTRAINT defect_pkey TO defect_unpartitioned_pkey;
+
+CREATE TABLE public.production_defect
+(
+    id_defect integer NOT NULL
+        DEFAULT nextval('public.production_defect_id_defect_seq'::regclass),
+    path_gambar character varying COLLATE pg_catalog."default" NOT NULL,
+    class character varying COLLATE pg_catalog."default" NOT NULL,
+    conf_level numeric(5,2) NOT NULL,
+    x0 integer NOT NULL,
+    y0 integer NOT NULL,
+    x1 integer NOT NULL,
+    y1 integer NOT NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT now(),
+    CONSTRAINT defect_pkey PRIMARY KEY (id_defect, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE public.production_defect_id_defect_seq
+    OWNED BY public.production_defect.id_defect;
+
+CREATE TABLE public.production_defect_default
+    PARTITION OF public.production_defect DEFAULT;
+
+SELECT public.create_monthly_partitions(
+    'production_defect',
+    COALESCE((SELECT MIN(created_at) FROM public.production_defect_unpartitioned), now()),
+    3
+);
+
+INSERT INTO public.production_defect
+    (id_defect, path_gambar, class, conf_level, x0, y0, x1, y1, created_at)
+SELECT id_defect, path_gambar, class, conf_level, x0, y0, x1, y1, created_at
+FROM public.production_defect_unpartitioned;
+
+DROP TABLE public.production_defect_unpartitioned;
@@ -0,0 +1,21 @@
+-- Indexes for the label page, login and session queries. Indexes created on
+-- the partitioned parents are created on every partition, including ones
+-- added later by create_monthly_partitions.
+
+CREATE INDEX IF NOT EXISTS production_anomaly_created_at_idx
+    ON public.production_anomaly (created_at);
+
+CREATE INDEX IF NOT EXISTS production_anomaly_path_gambar_idx
+    ON public.production_anomaly (path_gambar);
+
+CREATE INDEX IF NOT EXISTS production_defect_created_at_idx
+    ON public.production_defect (created_at);
+
+CREATE INDEX IF NOT EXISTS production_defect_path_gambar_idx
+    ON public.production_defect (path_gambar);
+
+CREATE INDEX IF NOT EXISTS operation_id_user_start_time_idx
+    ON public.operation (id_user, start_time);
+
+CREATE UNIQUE INDEX IF NOT EXISTS user_admin_username_idx
+    ON public.user_admin (username);
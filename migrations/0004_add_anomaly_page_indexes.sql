@@ -0,0 +1,14 @@
+-- Composite indexes for the label page's keyset pagination: the page query
+-- walks (created_at, path_gambar) from the cursor, and checks each row is
+-- its image's first of the week through (path_gambar, created_at). They
+-- cover every query the single-column indexes served, which are dropped.
+
+CREATE INDEX IF NOT EXISTS production_anomaly_created_at_path_gambar_idx
+    ON public.production_anomaly (created_at, path_gambar);
+
+CREATE INDEX IF NOT EXISTS production_anomaly_path_gambar_created_at_idx
+    ON public.production_anomaly (path_gambar, created_at);
+
+DROP INDEX IF EXISTS public.production_anomaly_created_at_idx;
+
+DROP INDEX IF EXISTS public.production_anomaly_path_gambar_idx;
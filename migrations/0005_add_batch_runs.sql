@@ -0,0 +1,17 @@
+-- Batch detection runs. Each run of src.detect.batch (one per set of weights
+-- by default) tags its production_defect rows with batch_run, so re-scoring
+-- the archive after a retrain keeps earlier runs' results. batch_manifest
+-- records each completed file in the same transaction as its rows, so a
+-- resumed run skips exactly the files already stored.
+
+ALTER TABLE public.production_defect
+    ADD COLUMN IF NOT EXISTS batch_run character varying COLLATE pg_catalog."default";
+
+CREATE TABLE IF NOT EXISTS public.batch_manifest
+(
+    batch_run character varying COLLATE pg_catalog."default" NOT NULL,
+    path character varying COLLATE pg_catalog."default" NOT NULL,
+    detections integer NOT NULL,
+    completed_at timestamp with time zone NOT NULL DEFAULT now(),
+    CONSTRAINT batch_manifest_pkey PRIMARY KEY (batch_run, path)
+);
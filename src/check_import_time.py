@@ -0,0 +1,118 @@
+"""
+Cold-start import check for the login page.
+
+Imports ``main`` in a fresh interpreter under ``-X importtime`` and fails
+if it pulls in a heavy module that only the pages behind the login need,
+or if the app's own imports exceed the time budget. Streamlit is imported
+first, so its own cost is not counted against the app.
+
+Usage (from the repository root):
+
+    python -m src.check_import_time
+    python -m src.check_import_time --budget-ms 300 --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ENTRY_MODULE = "main"
+DEFAULT_BUDGET_MS = 500
+# Modules the login page must not import; they belong to the detect,
+# label and admin pages or to the database layer used after submit.
+HEAVY_MODULES = ("torch", "ultralytics", "cv2", "pandas", "sqlalchemy")
+
+
+def profile_imports(module=ENTRY_MODULE, cwd=None):
+    """
+    Imports ``module`` in a fresh interpreter and parses the import profile.
+
+    Args:
+        module (str): Module to import after ``streamlit``.
+        cwd (str, optional): Working directory, the repository root by default.
+
+    Returns:
+        list[tuple[str, int, int]]: ``(name, self_us, cumulative_us)`` for
+            every module imported by ``module``, in import order.
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import streamlit; import {module}",
+        ],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        entries.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+
+    # Entries are printed children first, so the entry module's imports are
+    # the ones listed after streamlit's top-level line up to its own line.
+    top_level = [index for index, entry in enumerate(entries) if entry[0] == module]
+    streamlit_end = max(
+        index for index, entry in enumerate(entries) if entry[0] == "streamlit"
+    )
+    return entries[streamlit_end + 1 : top_level[-1] + 1]
+
+
+def check(entries, module=ENTRY_MODULE, budget_ms=DEFAULT_BUDGET_MS):
+    """
+    Returns the problems found in an import profile.
+
+    Args:
+        entries (list[tuple[str, int, int]]): Output of ``profile_imports``.
+        module (str): Entry module whose cumulative time is budgeted.
+        budget_ms (float): Maximum cumulative import time of ``module``.
+
+    Returns:
+        list[str]: Problem descriptions; empty when the check passes.
+    """
+    problems = []
+    for name, _, cumulative_us in entries:
+        name = name.strip()
+        if name in HEAVY_MODULES:
+            problems.append(f"{module} imports {name} ({cumulative_us / 1000:.0f} ms)")
+    total_ms = entries[-1][2] / 1000 if entries else 0
+    if total_ms > budget_ms:
+        problems.append(
+            f"{module} takes {total_ms:.0f} ms to import (budget {budget_ms} ms)"
+        )
+    return problems
+
+
+def main(argv=None):
+    """Profiles the login page imports and returns a process exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default=ENTRY_MODULE)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules shown")
+    args = parser.parse_args(argv)
+
+    entries = profile_imports(args.module)
+    total_ms = entries[-1][2] / 1000 if entries else 0
+    print(f"{args.module}: {total_ms:.0f} ms, {len(entries)} modules")
+    for name, self_us, _ in sorted(entries, key=lambda entry: -entry[1])[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name.strip()}")
+
+    problems = check(entries, args.module, args.budget_ms)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
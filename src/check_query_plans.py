@@ -0,0 +1,135 @@
+"""
+Query-plan check for the application's hot queries.
+
+Runs ``EXPLAIN (FORMAT JSON)`` for each query with sequential scans
+discouraged and fails if any plan still scans a checked table
+sequentially, which means no usable index exists. Time-windowed queries on
+partitioned tables must also prune down to a few partitions.
+
+Usage (from the repository root, after ``python -m src.migrate``):
+
+    python -m src.check_query_plans
+"""
+
+import sys
+
+from sqlalchemy import bindparam, text
+
+from src.database import connect
+from src.label.queries import ANOMALY_BOXES_QUERY, PAGE_SIZE, anomaly_page_query
+
+MAX_PARTITIONS_SCANNED = 3
+
+# (name, SQL, parameters, tables that must not be sequentially scanned,
+#  whether partition pruning is required)
+CHECKS = [
+    (
+        "label: first page of anomaly images",
+        anomaly_page_query(after_cursor=False),
+        {"page_size": PAGE_SIZE},
+        ("production_anomaly",),
+        True,
+    ),
+    (
+        "label: page of anomaly images after a cursor",
+        anomaly_page_query(after_cursor=True),
+        {
+            "after_created_at": "2000-01-01T00:00:00+00:00",
+            "after_path": "",
+            "page_size": PAGE_SIZE,
+        },
+        ("production_anomaly",),
+        True,
+    ),
+    (
+        "label: boxes of one page",
+        ANOMALY_BOXES_QUERY,
+        {"paths": ["check-1.jpg", "check-2.jpg"]},
+        ("production_anomaly",),
+        True,
+    ),
+    (
+        "login: user by username",
+        "SELECT id_user, role FROM user_admin WHERE username = :username",
+        {"username": "admin"},
+        ("user_admin",),
+        False,
+    ),
+    (
+        "logout: close operation",
+        "UPDATE operation SET end_time = NOW() WHERE id_operation = :id",
+        {"id": 1},
+        ("operation",),
+        False,
+    ),
+]
+
+
+def _walk(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _walk(child)
+
+
+def check_plan(conn, name, sql, params, tables, needs_pruning):
+    """
+    Explains one query and returns a list of problems found.
+
+    Args:
+        conn (sqlalchemy.Connection): Connection inside a transaction.
+        name (str): Human-readable query name.
+        sql (str): Query text.
+        params (dict): Query parameters; lists are bound as expanding ``IN`` lists.
+        tables (tuple[str]): Tables (and their partitions) that must use an index.
+        needs_pruning (bool): Whether partition pruning is required.
+
+    Returns:
+        list[str]: Problems; empty when the plan is acceptable.
+    """
+    query = text("EXPLAIN (FORMAT JSON) " + sql).bindparams(
+        *(
+            bindparam(name, expanding=True)
+            for name, value in params.items()
+            if isinstance(value, list)
+        )
+    )
+    explain = conn.execute(query, params).scalar()
+    nodes = list(_walk(explain[0]["Plan"]))
+    problems = []
+
+    for node in nodes:
+        relation = node.get("Relation Name", "")
+        if node["Node Type"] == "Seq Scan" and relation.startswith(tables):
+            problems.append(f"{name}: sequential scan on {relation}")
+
+    if needs_pruning:
+        scanned = {
+            node["Relation Name"]
+            for node in nodes
+            if node.get("Relation Name", "").startswith(tables)
+        }
+        removed = any("Subplans Removed" in node for node in nodes)
+        if len(scanned) > MAX_PARTITIONS_SCANNED and not removed:
+            problems.append(f"{name}: no partition pruning ({len(scanned)} scanned)")
+    return problems
+
+
+def main():
+    """Checks every query plan and returns a process exit code."""
+    problems = []
+    # The connection is closed without committing, so SET LOCAL and the
+    # explained statements never outlive this transaction.
+    with connect() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for check in CHECKS:
+            check_problems = check_plan(conn, *check)
+            print(f"{'FAIL' if check_problems else 'ok  '} {check[0]}")
+            problems.extend(check_problems)
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,19 @@
 Streamlit app for image and video detection.
 """
 
+import os
+from multiprocessing import AuthenticationError
+
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-from .model_loader import load_yolo_model
+from .inference_server import RemoteModel, parse_address
+from .instrumentation import start_exporters_from_env
+from .model_loader import get_model_stats, load_yolo_model
 from .ui import setup_ui
 
+WEIGHTS_PATH = "weights/weight-merged.pt"
+
 
 def main():
     """
@@ -14,9 +22,73 @@ def main():
     """
     st.session_state.setdefault("initialized", True)
     st.session_state.setdefault("uploaded_file", None)
-    model = load_yolo_model("weights/weight-merged.pt")
+    start_exporters_from_env()
+    address = os.environ.get("DETECT_INFERENCE_SERVER")
+    if address:
+        try:
+            model = get_session_model(address)
+            show_server_stats(model)
+        except (OSError, EOFError, AuthenticationError) as error:
+            st.session_state.pop("remote_model", None)
+            st.error(f"Cannot reach the inference server at {address}: {error}")
+            return
+    else:
+        model = load_yolo_model(WEIGHTS_PATH)
+        show_model_stats()
     setup_ui(model)
 
 
+def get_session_model(address):
+    """
+    Returns this session's client of the inference server.
+
+    The client lives in the session state, so reruns reuse its connection
+    and shared-memory segment, and the server schedules the session as one
+    client however many threads it runs inference from.
+
+    Args:
+        address (str): Server address.
+
+    Returns:
+        RemoteModel: Client labelled with the session id.
+    """
+    model = st.session_state.get("remote_model")
+    if model is None or model.address != parse_address(address):
+        if model is not None:
+            model.close()
+        ctx = get_script_run_ctx()
+        label = f"session {ctx.session_id[:8]}" if ctx else None
+        model = st.session_state.remote_model = RemoteModel(address, label=label)
+    return model
+
+
+def show_model_stats():
+    """
+    Displays load and warm-up times of the resident models in the sidebar.
+    """
+    for stats in get_model_stats():
+        st.sidebar.caption(
+            f"{stats['path'].rsplit('/', 1)[-1]} ({stats['device']}): "
+            f"load {stats['load_time']:.2f} s, "
+            f"warm-up {stats['warmup_time']:.2f} s, "
+            f"{stats['bytes'] / 1024**2:.0f} MB"
+        )
+
+
+def show_server_stats(model):
+    """
+    Displays the shared inference server's queue and batching statistics.
+
+    Args:
+        model (RemoteModel): Client of the inference server.
+    """
+    stats = model.stats()
+    st.sidebar.caption(
+        f"Inference server: {len(stats['clients'])} clients, "
+        f"queue depth {stats['queue_depth']}, "
+        f"mean batch {stats['mean_batch_size']:.1f}"
+    )
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,472 @@
+"""
+CPU inference backends for the YOLO weights.
+
+The PyTorch weights can be exported once to ONNX Runtime or OpenVINO, with
+optional INT8 static quantization calibrated on a folder of line images.
+Exported artifacts are cached next to the weights and re-exported when the
+weights file is newer or, for INT8 artifacts, the calibration folder has
+changed. Ultralytics loads every artifact behind the same ``YOLO``
+interface, so results keep the ``boxes``/``names`` shape that
+``extract_detections`` consumes.
+
+The backend is selected with environment variables:
+
+    DETECT_BACKEND          "torch" (default), "onnx" or "openvino"
+    DETECT_INT8             "1" to use the INT8-quantized artifact
+    DETECT_CALIBRATION_DIR  Image folder used for INT8 calibration
+
+ONNX export and quantization need the ``onnx`` and ``onnxruntime`` packages,
+OpenVINO export needs ``openvino``; none are required for the torch backend.
+
+Usage (from the repository root):
+
+    python -m src.detect.backends export --backend openvino --int8 --calibration images/
+    python -m src.detect.backends compare --images images/ --output report.md
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "openvino")
+IMAGE_EXTENSIONS = (".bmp", ".jpeg", ".jpg", ".png", ".tif", ".tiff")
+EXPORT_IMAGE_SIZE = 640
+CALIBRATION_IMAGES = 300
+
+BACKEND = os.environ.get("DETECT_BACKEND", "torch")
+INT8 = os.environ.get("DETECT_INT8", "0") == "1"
+CALIBRATION_DIR = os.environ.get("DETECT_CALIBRATION_DIR")
+
+_export_lock = threading.RLock()
+
+
+def artifact_path(weights, backend, int8=False):
+    """
+    Returns where the exported artifact of ``weights`` is cached.
+
+    The names match what Ultralytics writes next to the weights.
+
+    Args:
+        weights (str): Path to the PyTorch weights.
+        backend (str): One of ``BACKENDS``.
+        int8 (bool): Whether the artifact is INT8-quantized.
+
+    Returns:
+        str: Artifact path (a directory for OpenVINO).
+    """
+    stem = os.path.splitext(weights)[0]
+    if backend == "torch":
+        return weights
+    if backend == "onnx":
+        return f"{stem}-int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def _calibration_key(calibration_dir):
+    # The folder's mtime changes whenever images are added, removed or renamed.
+    directory = os.path.abspath(calibration_dir)
+    return f"{directory}\n{os.stat(directory).st_mtime_ns}"
+
+
+def _stamp_path(path):
+    return path + ".calibration"
+
+
+def _is_fresh(path, weights, calibration_dir=None):
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(weights):
+        return False
+    if calibration_dir is None:
+        return True
+    try:
+        with open(_stamp_path(path), encoding="utf-8") as stamp:
+            return stamp.read() == _calibration_key(calibration_dir)
+    except FileNotFoundError:
+        return False
+
+
+def image_files(directory, limit=None):
+    """Lists image files in ``directory`` in name order."""
+    paths = sorted(
+        path
+        for path in glob.glob(os.path.join(directory, "*"))
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def letterbox(image, size=EXPORT_IMAGE_SIZE):
+    """
+    Resizes and pads a BGR image to the square model input, as Ultralytics does.
+
+    Args:
+        image (np.ndarray): BGR image.
+        size (int): Model input side length.
+
+    Returns:
+        np.ndarray: ``float32`` NCHW RGB tensor scaled to [0, 1].
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    resized_w, resized_h = round(width * scale), round(height * scale)
+    resized = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    padded = np.full((size, size, 3), 114, np.uint8)
+    top, left = (size - resized_h) // 2, (size - resized_w) // 2
+    padded[top : top + resized_h, left : left + resized_w] = resized
+    rgb = padded[..., ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(rgb, dtype=np.float32)[None] / 255
+
+
+def quantize_onnx(onnx_path, output_path, calibration_dir, imgsz=EXPORT_IMAGE_SIZE):
+    """
+    Statically quantizes an ONNX model to INT8 with ONNX Runtime.
+
+    Args:
+        onnx_path (str): FP32 ONNX model exported by Ultralytics.
+        output_path (str): Quantized model path.
+        calibration_dir (str): Folder of representative images.
+        imgsz (int): Model input side length.
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    source = onnx.load(onnx_path)
+    input_name = source.graph.input[0].name
+    paths = image_files(calibration_dir, CALIBRATION_IMAGES)
+    if not paths:
+        raise ValueError(f"No calibration images in {calibration_dir}")
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {input_name: letterbox(image, imgsz)}
+            return None
+
+    quantize_static(
+        onnx_path,
+        output_path,
+        Reader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    # Ultralytics reads class names, stride and image size from the metadata.
+    quantized = onnx.load(output_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, output_path)
+
+
+def _calibration_yaml(calibration_dir, names, directory):
+    path = os.path.join(directory, "calibration.yaml")
+    with open(path, "w", encoding="utf-8") as yaml_file:
+        yaml_file.write(f"path: {os.path.abspath(calibration_dir)}\n")
+        yaml_file.write("train: .\nval: .\nnames:\n")
+        for class_id, name in sorted(names.items()):
+            yaml_file.write(f"  {class_id}: {name}\n")
+    return path
+
+
+def export_backend(
+    weights, backend, int8=False, calibration_dir=None, imgsz=EXPORT_IMAGE_SIZE
+):
+    """
+    Exports ``weights`` for a backend unless a fresh artifact is cached.
+
+    Args:
+        weights (str): Path to the PyTorch weights.
+        backend (str): One of ``BACKENDS``.
+        int8 (bool): Quantize to INT8; requires ``calibration_dir``.
+        calibration_dir (str, optional): Folder of representative images.
+        imgsz (int): Fixed model input side length.
+
+    Returns:
+        str: Path of the artifact to load.
+    """
+    path = artifact_path(weights, backend, int8)
+    if backend == "torch":
+        return path
+    if int8 and not calibration_dir:
+        raise ValueError("INT8 export needs a calibration image folder")
+    calibration_dir = calibration_dir if int8 else None
+    if _is_fresh(path, weights, calibration_dir):
+        return path
+    # Sessions starting together must not export the same artifact twice.
+    with _export_lock:
+        if _is_fresh(path, weights, calibration_dir):
+            return path
+        return _export(weights, backend, int8, calibration_dir, imgsz, path)
+
+
+def _export(weights, backend, int8, calibration_dir, imgsz, path):
+    from ultralytics import YOLO
+
+    # Other processes may export the same artifact concurrently, so each one
+    # exports into its own folder next to the artifact and moves the result
+    # into place; a loader never sees a partly written artifact.
+    with tempfile.TemporaryDirectory(
+        prefix=".export-", dir=os.path.dirname(os.path.abspath(path))
+    ) as directory:
+        if backend == "onnx" and int8:
+            onnx_path = export_backend(weights, "onnx", imgsz=imgsz)
+            exported = os.path.join(directory, os.path.basename(path))
+            quantize_onnx(onnx_path, exported, calibration_dir, imgsz)
+        else:
+            model = YOLO(shutil.copy2(weights, directory))
+            if backend == "onnx":
+                exported = model.export(format="onnx", imgsz=imgsz, dynamic=False)
+            else:
+                data = (
+                    _calibration_yaml(calibration_dir, model.names, directory)
+                    if int8
+                    else None
+                )
+                exported = model.export(
+                    format="openvino", imgsz=imgsz, int8=int8, data=data
+                )
+        _publish(exported, path)
+        if calibration_dir:
+            stamp = os.path.join(directory, "calibration")
+            with open(stamp, "w", encoding="utf-8") as stamp_file:
+                stamp_file.write(_calibration_key(calibration_dir))
+            os.replace(stamp, _stamp_path(path))
+    return path
+
+
+def _publish(exported, path):
+    """
+    Moves an exported artifact over ``path``.
+
+    Files are replaced atomically. A directory cannot be replaced while it
+    exists, so the previous one is renamed aside first and only deleted once
+    the new one is in place; a crash in between leaves it next to ``path``.
+    """
+    previous = None
+    if os.path.isdir(path):
+        previous = f"{path}.old-{os.getpid()}"
+        os.replace(path, previous)
+    try:
+        os.replace(exported, path)
+    except OSError:
+        # Another process published the directory in the meantime.
+        if not os.path.isdir(path):
+            if previous is not None:
+                os.replace(previous, path)
+            raise
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def resolve_weights(weights, backend=None, int8=None, calibration_dir=None):
+    """
+    Returns the artifact to load for the configured backend, exporting it if needed.
+
+    Args:
+        weights (str): Path to the PyTorch weights.
+        backend (str, optional): Defaults to ``DETECT_BACKEND``.
+        int8 (bool, optional): Defaults to ``DETECT_INT8``.
+        calibration_dir (str, optional): Defaults to ``DETECT_CALIBRATION_DIR``.
+
+    Returns:
+        str: Weights or artifact path.
+    """
+    backend = backend or BACKEND
+    int8 = INT8 if int8 is None else int8
+    return export_backend(weights, backend, int8, calibration_dir or CALIBRATION_DIR)
+
+
+def _detections(result):
+    boxes = result.boxes
+    return (
+        boxes.xyxy.cpu().numpy().reshape(-1, 4),
+        boxes.conf.cpu().numpy().reshape(-1),
+        boxes.cls.cpu().numpy().reshape(-1).astype(int),
+    )
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """
+    Matches candidate boxes against reference boxes of the same class.
+
+    Args:
+        reference (tuple): ``(xyxy, conf, cls)`` from the reference backend.
+        candidate (tuple): ``(xyxy, conf, cls)`` from the backend under test.
+        iou_threshold (float): Minimum IoU for a match.
+
+    Returns:
+        tuple[int, int, int, float]: Matches, reference count, candidate count
+            and the summed absolute confidence difference of the matches.
+    """
+    from .tracking import box_iou
+
+    ref_boxes, ref_conf, ref_cls = reference
+    boxes, conf, cls = candidate
+    matches, conf_error = 0, 0.0
+    if len(ref_boxes) and len(boxes):
+        iou = box_iou(ref_boxes, boxes)
+        iou[ref_cls[:, None] != cls[None, :]] = 0
+        used = set()
+        for ref_index in np.argsort(-ref_conf):
+            candidates = [
+                index
+                for index in np.argsort(-iou[ref_index])
+                if index not in used and iou[ref_index, index] >= iou_threshold
+            ]
+            if candidates:
+                used.add(candidates[0])
+                matches += 1
+                conf_error += abs(float(ref_conf[ref_index] - conf[candidates[0]]))
+    return matches, len(ref_boxes), len(boxes), conf_error
+
+
+def compare_backends(
+    weights, images_dir, variants, confidence=0.25, limit=100, calibration_dir=None
+):
+    """
+    Times each backend and measures its agreement with PyTorch.
+
+    Args:
+        weights (str): Path to the PyTorch weights.
+        images_dir (str): Folder of evaluation images.
+        variants (list[tuple[str, bool]]): ``(backend, int8)`` pairs to compare.
+        confidence (float): Confidence threshold from 0 to 1.
+        limit (int): Maximum number of images.
+        calibration_dir (str, optional): INT8 calibration folder; defaults to
+            ``images_dir``.
+
+    Returns:
+        list[dict]: One row per variant with latency and agreement figures.
+    """
+    from ultralytics import YOLO
+
+    images = [cv2.imread(path) for path in image_files(images_dir, limit)]
+    images = [image for image in images if image is not None]
+    if not images:
+        raise ValueError(f"No images in {images_dir}")
+
+    reference = None
+    rows = []
+    for backend, int8 in [("torch", False)] + [
+        variant for variant in variants if variant != ("torch", False)
+    ]:
+        path = export_backend(weights, backend, int8, calibration_dir or images_dir)
+        model = YOLO(path, task="detect")
+        model(images[0], conf=confidence, verbose=False)
+
+        outputs, start = [], time.perf_counter()
+        for image in images:
+            outputs.append(_detections(model(image, conf=confidence, verbose=False)[0]))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = outputs
+
+        totals = np.zeros(4)
+        for ref, out in zip(reference, outputs):
+            totals += agreement(ref, out)
+        matches, ref_count, count, conf_error = totals
+        rows.append(
+            {
+                "backend": backend + (" int8" if int8 else ""),
+                "ms_per_image": elapsed / len(images) * 1000,
+                "speedup": 0.0,
+                "recall": matches / ref_count if ref_count else 1.0,
+                "precision": matches / count if count else 1.0,
+                "conf_error": conf_error / matches if matches else 0.0,
+            }
+        )
+    for row in rows:
+        row["speedup"] = rows[0]["ms_per_image"] / row["ms_per_image"]
+    return rows
+
+
+def format_report(rows, images_dir):
+    """Formats comparison rows as a Markdown table."""
+    lines = [
+        f"Backend comparison on `{images_dir}` (agreement measured against torch)",
+        "",
+        "| backend | ms/image | speedup | recall | precision | mean abs conf diff |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for row in rows:
+        lines.append(
+            f"| {row['backend']} | {row['ms_per_image']:.1f} | {row['speedup']:.2f}x "
+            f"| {row['recall']:.3f} | {row['precision']:.3f} "
+            f"| {row['conf_error']:.4f} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    """Runs the backend command line and returns an exit code."""
+    parser = argparse.ArgumentParser(description="Export and compare CPU backends.")
+    parser.add_argument("--weights", default="weights/weight-merged.pt")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export the weights.")
+    export_parser.add_argument("--backend", choices=BACKENDS[1:], required=True)
+    export_parser.add_argument("--int8", action="store_true")
+    export_parser.add_argument("--calibration", help="Calibration image folder.")
+
+    compare_parser = commands.add_parser(
+        "compare", help="Report speed and agreement of each backend."
+    )
+    compare_parser.add_argument("--images", required=True)
+    compare_parser.add_argument(
+        "--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS)
+    )
+    compare_parser.add_argument(
+        "--int8", action="store_true", help="Also compare INT8 variants."
+    )
+    compare_parser.add_argument(
+        "--calibration", help="INT8 calibration folder; defaults to --images."
+    )
+    compare_parser.add_argument("--confidence", type=float, default=0.25)
+    compare_parser.add_argument("--limit", type=int, default=100)
+    compare_parser.add_argument("--output", help="Write the Markdown report here.")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(export_backend(args.weights, args.backend, args.int8, args.calibration))
+        return 0
+
+    variants = [(backend, False) for backend in args.backends]
+    if args.int8:
+        variants += [(backend, True) for backend in args.backends if backend != "torch"]
+    rows = compare_backends(
+        args.weights,
+        args.images,
+        variants,
+        args.confidence,
+        args.limit,
+        args.calibration,
+    )
+    report = format_report(rows, args.images)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as report_file:
+            report_file.write(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+Headless batch detection over image and video files.
+
+Usage (from the repository root):
+
+    python -m src.detect.batch archive/2025-01 --workers 4 --parquet-dir out/detections
+
+Each worker process holds one model instance with a fixed number of torch
+intra-op threads. Every run has an ID, by default the weights file name and
+a hash of its contents, so re-scoring the archive after a retrain starts a
+new run. Completed files are appended to a per-run manifest file and, with
+``--db``, recorded in ``batch_manifest`` in the same transaction as their
+rows, so an interrupted run can be resumed with the same command.
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+
+from sqlalchemy import column, table
+
+from .defect_writer import DEFECT_TABLE, TABLES, insert_rows
+from .image_processing import (
+    annotate_image,
+    detections_to_frame,
+    extract_detections,
+)
+from .model_loader import INFERENCE_CONFIDENCE
+from .offline_processing import DEFAULT_BATCH_SIZE, process_video_offline
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+DEFAULT_WEIGHTS = "weights/weight-merged.pt"
+MANIFEST_TABLE = "batch_manifest"
+
+BATCH_TABLES = {
+    DEFECT_TABLE: table(
+        DEFECT_TABLE,
+        *(column(defect_column.name) for defect_column in TABLES[DEFECT_TABLE].c),
+        column("batch_run"),
+    ),
+    MANIFEST_TABLE: table(
+        MANIFEST_TABLE, column("batch_run"), column("path"), column("detections")
+    ),
+}
+
+_worker = {}
+
+
+def collect_files(inputs):
+    """
+    Expands files and directory trees into a sorted list of media files.
+
+    Args:
+        inputs (list[str]): File and directory paths.
+
+    Returns:
+        list[str]: Absolute paths of supported image and video files.
+    """
+    extensions = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+    files = set()
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.update(
+                    os.path.join(root, name)
+                    for name in names
+                    if name.lower().endswith(extensions)
+                )
+        elif path.lower().endswith(extensions):
+            files.add(path)
+    return sorted(os.path.abspath(path) for path in files)
+
+
+def default_run_id(weights):
+    """
+    Identifies a run by the weights file name and a hash of its contents.
+
+    Args:
+        weights (str): Path to the YOLO weights file.
+
+    Returns:
+        str: Run ID such as ``weight-merged-3f2a9c0d1e4b``.
+    """
+    digest = hashlib.sha1()
+    with open(weights, "rb") as weights_file:
+        for chunk in iter(lambda: weights_file.read(1024**2), b""):
+            digest.update(chunk)
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return f"{stem}-{digest.hexdigest()[:12]}"
+
+
+def read_db_manifest(batch_run):
+    """
+    Reads the files a run has already stored in the database.
+
+    Args:
+        batch_run (str): Run ID.
+
+    Returns:
+        set[str]: Completed file paths.
+    """
+    from sqlalchemy import select
+
+    from src.database import connect
+
+    manifest = BATCH_TABLES[MANIFEST_TABLE]
+    query = select(manifest.c.path).where(manifest.c.batch_run == batch_run)
+    with connect() as conn:
+        return set(conn.execute(query).scalars())
+
+
+def read_manifest(manifest_path):
+    """
+    Reads the set of files already completed by a previous run.
+
+    Args:
+        manifest_path (str): Manifest file with one completed path per line.
+
+    Returns:
+        set[str]: Completed file paths.
+    """
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path, encoding="utf-8") as manifest:
+        return {line.rstrip("\n") for line in manifest if line.strip()}
+
+
+def init_worker(weights, threads, confidence_threshold, batch_size, annotate_dir):
+    """
+    Loads the model once per worker process and pins torch threads.
+
+    Args:
+        weights (str): Path to the YOLO weights file.
+        threads (int): Torch intra-op threads for this worker.
+        confidence_threshold (float): Minimum confidence percentage for detections.
+        batch_size (int): Frames per inference call for videos.
+        annotate_dir (str | None): Directory for annotated outputs.
+    """
+    import torch
+
+    from .model_loader import load_yolo_model
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    _worker.update(
+        model=load_yolo_model(weights),
+        confidence_threshold=confidence_threshold,
+        batch_size=batch_size,
+        annotate_dir=annotate_dir,
+    )
+
+
+def _annotated_path(path, suffix):
+    digest = hashlib.sha1(path.encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(_worker["annotate_dir"], f"{stem}-{digest}{suffix}")
+
+
+def detect_file(path):
+    """
+    Runs detection on one image or video inside a worker process.
+
+    Args:
+        path (str): Media file path.
+
+    Returns:
+        tuple: ``(path, detections_df, error)`` where ``error`` is None on success.
+    """
+    try:
+        model = _worker["model"]
+        confidence_threshold = _worker["confidence_threshold"]
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            output_path = None
+            if _worker["annotate_dir"]:
+                output_path = _annotated_path(path, ".mp4")
+            stats = process_video_offline(
+                path,
+                model,
+                confidence_threshold,
+                output_path,
+                None,
+                batch_size=_worker["batch_size"],
+            )
+            detections_df = stats["detections_df"].drop(columns="Time (sec)")
+        else:
+            image = cv2.imread(path)
+            if image is None:
+                raise ValueError("unreadable image")
+            result = model(image, conf=INFERENCE_CONFIDENCE, verbose=False)[0]
+            detections = extract_detections(result, confidence_threshold)
+            if _worker["annotate_dir"]:
+                cv2.imwrite(
+                    _annotated_path(path, ".jpg"), annotate_image(result, detections)
+                )
+            detections_df = detections_to_frame(detections, result.names)
+            detections_df.insert(0, "Frame", 0)
+        detections_df.insert(0, "Path", path)
+        return path, detections_df, None
+    except Exception as error:
+        return path, None, f"{type(error).__name__}: {error}"
+
+
+def write_parquet_part(detections_df, path, parquet_dir):
+    """
+    Writes one file's detections as a part of a Parquet dataset directory.
+
+    Args:
+        detections_df (pd.DataFrame): Detections for the file.
+        path (str): Source media path, used to name the part.
+        parquet_dir (str): Dataset directory readable with ``pd.read_parquet``.
+    """
+    os.makedirs(parquet_dir, exist_ok=True)
+    part = hashlib.sha1(path.encode()).hexdigest()
+    detections_df.to_parquet(
+        os.path.join(parquet_dir, f"part-{part}.parquet"), index=False
+    )
+
+
+def write_production_defects(detections_df, path, batch_run):
+    """
+    Bulk inserts detections into the ``production_defect`` table.
+
+    Video detections are stored with ``path_gambar`` set to ``<path>#<frame>``.
+    Rows are tagged with the run ID and the file is recorded in
+    ``batch_manifest`` in the same transaction, also when it has no
+    detections, so a resumed run never stores a file twice.
+
+    Args:
+        detections_df (pd.DataFrame): Detections for one file.
+        path (str): Source media path.
+        batch_run (str): Run ID.
+    """
+    from src.database import begin
+
+    is_video = detections_df["Path"].str.lower().str.endswith(VIDEO_EXTENSIONS)
+    paths = detections_df["Path"].where(
+        ~is_video, detections_df["Path"] + "#" + detections_df["Frame"].astype(str)
+    )
+    rows = [
+        {
+            "path_gambar": path_gambar,
+            "class": class_name,
+            "conf_level": round(float(confidence), 2),
+            "x0": int(x0),
+            "y0": int(y0),
+            "x1": int(x1),
+            "y1": int(y1),
+            "batch_run": batch_run,
+        }
+        for path_gambar, class_name, confidence, x0, y0, x1, y1 in zip(
+            paths,
+            detections_df["Class"],
+            detections_df["Confidence"],
+            detections_df["x0"],
+            detections_df["y0"],
+            detections_df["x1"],
+            detections_df["y1"],
+        )
+    ]
+    with begin() as conn:
+        insert_rows(conn, DEFECT_TABLE, rows, BATCH_TABLES)
+        insert_rows(
+            conn,
+            MANIFEST_TABLE,
+            [{"batch_run": batch_run, "path": path, "detections": len(rows)}],
+            BATCH_TABLES,
+        )
+
+
+def parse_args(argv=None):
+    """Parses command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run defect detection over image and video files."
+    )
+    parser.add_argument("inputs", nargs="+", help="Files or directories to scan.")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--confidence", type=float, default=25.0)
+    parser.add_argument("--workers", type=int, default=max(os.cpu_count() // 2, 1))
+    parser.add_argument("--threads", type=int, default=2, help="Torch threads/worker.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--run", help="Run ID; defaults to the weights name and content hash."
+    )
+    parser.add_argument(
+        "--manifest", help="Manifest file; defaults to batch_manifest-<run>.txt."
+    )
+    parser.add_argument("--parquet-dir", help="Write detections to this dataset.")
+    parser.add_argument(
+        "--db",
+        action="store_true",
+        help="Insert detections into production_defect (configured via DB_URL).",
+    )
+    parser.add_argument("--annotate-dir", help="Write annotated images/videos here.")
+    args = parser.parse_args(argv)
+    if not args.parquet_dir and not args.db:
+        parser.error("at least one of --parquet-dir or --db is required")
+    return args
+
+
+def main(argv=None):
+    """Runs batch detection and returns a process exit code."""
+    args = parse_args(argv)
+    batch_run = args.run or default_run_id(args.weights)
+    manifest_path = args.manifest or f"batch_manifest-{batch_run}.txt"
+    completed = read_manifest(manifest_path)
+    if args.db:
+        # Files stored in the database but missing from the manifest file
+        # when the run was interrupted between the two writes.
+        completed |= read_db_manifest(batch_run)
+    pending = [path for path in collect_files(args.inputs) if path not in completed]
+    print(
+        f"Run {batch_run}: {len(pending)} files to process, "
+        f"{len(completed)} already done"
+    )
+    if not pending:
+        return 0
+
+    if args.annotate_dir:
+        os.makedirs(args.annotate_dir, exist_ok=True)
+
+    failures, start_time = 0, time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        args.workers,
+        initializer=init_worker,
+        initargs=(
+            args.weights,
+            args.threads,
+            args.confidence,
+            args.batch_size,
+            args.annotate_dir,
+        ),
+    ) as pool, open(manifest_path, "a", encoding="utf-8") as manifest:
+        for done, (path, detections_df, error) in enumerate(
+            pool.imap_unordered(detect_file, pending), start=1
+        ):
+            if error:
+                failures += 1
+                print(
+                    f"[{done}/{len(pending)}] FAILED {path}: {error}", file=sys.stderr
+                )
+                continue
+            if args.parquet_dir:
+                write_parquet_part(detections_df, path, args.parquet_dir)
+            if args.db:
+                write_production_defects(detections_df, path, batch_run)
+            manifest.write(path + "\n")
+            manifest.flush()
+            print(f"[{done}/{len(pending)}] {path}: {len(detections_df)} detections")
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Processed {len(pending) - failures} files in {elapsed:.1f} sec")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
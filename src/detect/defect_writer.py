@@ -0,0 +1,290 @@
+"""
+Asynchronous, batched persistence of detections.
+
+Detection rows are handed to a background thread through a bounded queue
+and written with one multi-row INSERT per table and flush. When the queue is
+full, submissions are handed to the writer thread, which spills them to JSON
+files, as it does with batches the database rejects; spilled rows are
+replayed after the next successful flush. Submitting never touches the disk.
+Once the spill directory reaches ``SPILL_MAX_BYTES``, or more submissions
+than the queue holds wait to be spilled, further rows are dropped and
+counted.
+"""
+
+import atexit
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import column, insert, table
+
+from . import instrumentation
+
+DEFECT_TABLE = "production_defect"
+SPILL_DIR = os.path.join(tempfile.gettempdir(), "steel_defect_spill")
+SPILL_MAX_BYTES = 256 * 1024**2
+
+_BOX_COLUMNS = ("path_gambar", "conf_level", "x0", "y0", "x1", "y1")
+TABLES = {
+    DEFECT_TABLE: table(
+        DEFECT_TABLE, *(column(name) for name in _BOX_COLUMNS + ("class",))
+    ),
+}
+
+
+def detection_rows(detections, names, path_gambar):
+    """
+    Converts a detections array into rows for ``production_defect``.
+
+    Args:
+        detections (np.ndarray): Array returned by ``extract_detections``.
+        names (dict): Mapping from class ID to class name.
+        path_gambar (str): Image path (or ``<video>#<frame>``) stored with each row.
+
+    Returns:
+        dict: Lists of row dicts keyed by table name.
+    """
+    rows = []
+    for class_id, confidence, x0, y0, x1, y1 in zip(
+        detections["class_id"].tolist(),
+        detections["confidence"].tolist(),
+        detections["x0"].tolist(),
+        detections["y0"].tolist(),
+        detections["x1"].tolist(),
+        detections["y1"].tolist(),
+    ):
+        rows.append(
+            {
+                "path_gambar": path_gambar,
+                "conf_level": round(confidence, 2),
+                "x0": x0,
+                "y0": y0,
+                "x1": x1,
+                "y1": y1,
+                "class": names[class_id],
+            }
+        )
+    return {DEFECT_TABLE: rows}
+
+
+def insert_rows(conn, table_name, rows, tables=TABLES):
+    """
+    Inserts rows with a single multi-row INSERT statement.
+
+    Args:
+        conn (sqlalchemy.Connection): Connection inside a transaction.
+        table_name (str): Key of ``tables``.
+        rows (list[dict]): Rows to insert.
+        tables (dict): Table definitions by name.
+    """
+    if rows:
+        conn.execute(insert(tables[table_name]).values(rows))
+
+
+class DetectionWriter:
+    """
+    Background writer that buffers detection rows and flushes them in bulk.
+
+    Args:
+        batch_rows (int): Flush once this many rows are buffered.
+        flush_interval (float): Flush buffered rows at least this often, in seconds.
+        max_queue (int): Maximum number of pending submissions before spilling;
+            as many again may wait to be spilled before rows are dropped.
+        spill_dir (str | None): Directory for rows that cannot be written; rows
+            are dropped instead when None.
+        spill_max_bytes (int): Rows are dropped instead of spilled once the
+            spill files take this much space.
+    """
+
+    def __init__(
+        self,
+        batch_rows=500,
+        flush_interval=2.0,
+        max_queue=1000,
+        spill_dir=SPILL_DIR,
+        spill_max_bytes=SPILL_MAX_BYTES,
+    ):
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.rows_written = 0
+        self.rows_spilled = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.last_error = None
+        self._queue = queue.Queue(max_queue)
+        self._overflow = []
+        self._overflow_limit = max_queue
+        self._overflow_lock = threading.Lock()
+        self._spill_bytes = 0
+        self._buffer = {name: [] for name in TABLES}
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """
+        Queues rows for writing without blocking the caller.
+
+        Args:
+            rows (dict): Lists of row dicts keyed by table name, as returned
+                by ``detection_rows``.
+        """
+        if self._closed.is_set() or not any(rows.values()):
+            return
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            # The writer thread spills these; the caller never waits on disk I/O.
+            with self._overflow_lock:
+                if len(self._overflow) < self._overflow_limit:
+                    self._overflow.append(rows)
+                else:
+                    self.rows_dropped += sum(
+                        len(table_rows) for table_rows in rows.values()
+                    )
+
+    def _buffered(self):
+        return sum(len(rows) for rows in self._buffer.values())
+
+    def _take_overflow(self):
+        with self._overflow_lock:
+            overflow, self._overflow = self._overflow, []
+        return overflow
+
+    def _run(self):
+        self._spill_bytes = self._spill_size()
+        next_flush = time.monotonic() + self.flush_interval
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                rows = self._queue.get(timeout=max(next_flush - time.monotonic(), 0))
+                for table_name, table_rows in (rows or {}).items():
+                    self._buffer[table_name].extend(table_rows)
+            except queue.Empty:
+                pass
+            for rows in self._take_overflow():
+                self._spill(rows)
+            if self._buffered() >= self.batch_rows or time.monotonic() >= next_flush:
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+        # Rows still waiting to be spilled are written with the final flush.
+        for rows in self._take_overflow():
+            for table_name, table_rows in rows.items():
+                self._buffer[table_name].extend(table_rows)
+        self._flush()
+
+    def _flush(self):
+        if not self._buffered():
+            return
+        batch, self._buffer = self._buffer, {name: [] for name in TABLES}
+        try:
+            self._write(batch)
+        except Exception as error:
+            self.last_error = error
+            self._spill(batch)
+            return
+        self.rows_written += sum(len(rows) for rows in batch.values())
+        self.flushes += 1
+        self._replay_spill()
+
+    @staticmethod
+    def _write(batch):
+        from src.database import begin
+
+        with instrumentation.timer("db_write"), begin() as conn:
+            for table_name, rows in batch.items():
+                insert_rows(conn, table_name, rows)
+
+    def _spill(self, rows):
+        # Only called on the writer thread, which alone tracks _spill_bytes.
+        count = sum(len(table_rows) for table_rows in rows.values())
+        if self.spill_dir is None or self._spill_bytes >= self.spill_max_bytes:
+            with self._overflow_lock:
+                self.rows_dropped += count
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{time.time_ns()}-{uuid.uuid4().hex}")
+        with open(path + ".tmp", "w", encoding="utf-8") as spill_file:
+            json.dump(rows, spill_file)
+        os.replace(path + ".tmp", path + ".json")
+        self._spill_bytes += os.path.getsize(path + ".json")
+        self.rows_spilled += count
+
+    def _spill_size(self):
+        if self.spill_dir is None or not os.path.isdir(self.spill_dir):
+            return 0
+        return sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.spill_dir)
+            if entry.name.endswith(".json")
+        )
+
+    def _replay_spill(self):
+        if self.spill_dir is None or not os.path.isdir(self.spill_dir):
+            return
+        for name in sorted(os.listdir(self.spill_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            with open(path, encoding="utf-8") as spill_file:
+                rows = json.load(spill_file)
+            try:
+                self._write(rows)
+            except Exception as error:
+                self.last_error = error
+                return
+            self._spill_bytes -= os.path.getsize(path)
+            os.remove(path)
+            self.rows_written += sum(len(table_rows) for table_rows in rows.values())
+
+    def stats(self):
+        """
+        Returns writer counters.
+
+        Returns:
+            dict: Rows written, spilled and dropped, flush count and queue depth.
+        """
+        return {
+            "rows_written": self.rows_written,
+            "rows_spilled": self.rows_spilled,
+            "rows_dropped": self.rows_dropped,
+            "flushes": self.flushes,
+            "queue_depth": self._queue.qsize() + len(self._overflow),
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+    def close(self, timeout=None):
+        """Flushes everything still queued and stops the writer thread."""
+        self._closed.set()
+        try:
+            # Wakes the writer thread; a full queue means it is not waiting.
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """
+    Returns the process-wide writer, starting it on first use.
+
+    The writer is flushed and stopped at interpreter shutdown.
+
+    Returns:
+        DetectionWriter: Shared writer.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DetectionWriter()
+            atexit.register(_writer.close)
+    return _writer
@@ -0,0 +1,110 @@
+"""
+Sequential frame sources with cheap forward skipping.
+"""
+
+import time
+
+import cv2
+
+DEFAULT_GOP_SIZE = 250
+
+
+class VideoFileSource:
+    """
+    Wraps a ``cv2.VideoCapture`` and skips ahead without per-frame seeking.
+
+    Short skips use ``grab()`` (decode without retrieve); long skips fall back
+    to a ``CAP_PROP_POS_FRAMES`` seek, which re-decodes from the nearest
+    keyframe. The cheaper strategy is chosen from the measured average cost of
+    each, or from ``gop_size`` until both have been measured.
+
+    Args:
+        capture (cv2.VideoCapture): Opened video capture.
+        gop_size (int): Expected keyframe interval in frames.
+    """
+
+    def __init__(self, capture, gop_size=DEFAULT_GOP_SIZE):
+        self.capture = capture
+        self.gop_size = gop_size
+        self.position = 0
+        self.frames_skipped = 0
+        self.grabs, self.grab_time = 0, 0.0
+        self.seeks, self.seek_time = 0, 0.0
+
+    @property
+    def frame_rate(self):
+        """Frame rate reported by the container."""
+        return self.capture.get(cv2.CAP_PROP_FPS)
+
+    @property
+    def frame_count(self):
+        """Frame count reported by the container."""
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def read(self):
+        """
+        Decodes the next frame.
+
+        Returns:
+            tuple: ``(ret, frame)`` as returned by ``cv2.VideoCapture.read``.
+        """
+        ret, frame = self.capture.read()
+        if ret:
+            self.position += 1
+        return ret, frame
+
+    def _prefer_seek(self, distance):
+        if self.grabs and self.seeks:
+            grab_cost = self.grab_time / self.grabs
+            return distance * grab_cost > self.seek_time / self.seeks
+        return distance > self.gop_size
+
+    def skip_to(self, index):
+        """
+        Advances so that the next ``read`` returns frame ``index``.
+
+        Args:
+            index (int): Target frame index; ignored if not ahead of the position.
+
+        Returns:
+            int: Number of frames skipped.
+        """
+        distance = index - self.position
+        if distance <= 0:
+            return 0
+
+        start = time.perf_counter()
+        if self._prefer_seek(distance):
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.seeks += 1
+            self.seek_time += time.perf_counter() - start
+        else:
+            for grabbed in range(distance):
+                if not self.capture.grab():
+                    distance = grabbed
+                    break
+            self.grabs += distance
+            self.grab_time += time.perf_counter() - start
+
+        self.position += distance
+        self.frames_skipped += distance
+        return distance
+
+    def stats(self):
+        """
+        Returns skip counters.
+
+        Returns:
+            dict: Frames skipped plus grab and seek counts and total seconds.
+        """
+        return {
+            "frames_skipped": self.frames_skipped,
+            "grabs": self.grabs,
+            "grab_time": self.grab_time,
+            "seeks": self.seeks,
+            "seek_time": self.seek_time,
+        }
+
+    def release(self):
+        """Releases the underlying capture."""
+        self.capture.release()
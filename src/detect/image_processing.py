@@ -2,10 +2,153 @@
 Image processing functions for defect detection.
 """
 
+from collections import OrderedDict
+from types import SimpleNamespace
+
 import cv2
 import numpy as np
 import pandas as pd
 
+from .model_loader import INFERENCE_CONFIDENCE
+
+PIXELS_PER_CM = 4
+DEFAULT_BOX_COLOR = (0, 255, 0)
+# Labels carry ever-increasing track IDs on a live stream, so the glyph cache
+# keeps only the most recently drawn ones.
+MAX_CACHED_GLYPHS = 512
+
+DETECTION_DTYPE = np.dtype(
+    [
+        ("id", np.int32),
+        ("class_id", np.int32),
+        ("confidence", np.float32),
+        ("x0", np.int32),
+        ("y0", np.int32),
+        ("x1", np.int32),
+        ("y1", np.int32),
+        ("width_cm", np.float32),
+        ("height_cm", np.float32),
+    ]
+)
+
+DETECTION_COLUMNS = [
+    "ID",
+    "Class",
+    "Confidence",
+    "x0",
+    "x1",
+    "y0",
+    "y1",
+    "Width (cm)",
+    "Height (cm)",
+]
+
+
+class ArrayResult:
+    """
+    Detections held in NumPy arrays, shaped like a YOLO result.
+
+    Exposes ``boxes`` (with ``xyxy``, ``xywh``, ``conf`` and ``cls`` arrays),
+    ``names``, ``orig_img`` and ``speed``, so it can stand in for a YOLO result
+    anywhere detections are extracted or drawn.
+
+    Args:
+        xyxy (np.ndarray): Boxes of shape ``(n, 4)`` in pixel coordinates.
+        conf (np.ndarray): Confidences from 0 to 1.
+        cls (np.ndarray): Class IDs.
+        names (dict): Mapping from class ID to class name.
+        image (np.ndarray): BGR image the boxes belong to.
+        speed (dict, optional): Stage times in milliseconds.
+    """
+
+    __slots__ = ("boxes", "names", "orig_img", "speed")
+
+    def __init__(self, xyxy, conf, cls, names, image, speed=None):
+        xywh = np.empty_like(xyxy)
+        xywh[:, :2] = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        xywh[:, 2:] = xyxy[:, 2:] - xyxy[:, :2]
+        self.boxes = SimpleNamespace(xyxy=xyxy, xywh=xywh, conf=conf, cls=cls)
+        self.names = names
+        self.orig_img = image
+        self.speed = speed or {}
+
+
+def _to_numpy(values):
+    """Converts a torch tensor (on any device) or array-like to a NumPy array."""
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def extract_detections(result, confidence_threshold):
+    """
+    Extracts bounding boxes from a YOLO result as a numeric structured array.
+
+    The confidence filter, xywh to xyxy conversion and cm scaling are done as
+    whole-array operations.
+
+    Args:
+        result: YOLO detection result object.
+        confidence_threshold (float): Minimum confidence percentage to include a detection.
+
+    Returns:
+        np.ndarray: Structured array with ``DETECTION_DTYPE`` fields. IDs are the
+            1-based index of each box in the unfiltered result.
+    """
+    boxes = result.boxes
+    confidences = _to_numpy(boxes.conf).astype(np.float32).reshape(-1) * 100
+    keep = np.flatnonzero(confidences >= confidence_threshold)
+
+    detections = np.empty(len(keep), dtype=DETECTION_DTYPE)
+    if not len(keep):
+        return detections
+
+    xywh = _to_numpy(boxes.xywh).reshape(-1, 4)[keep]
+    half_wh = xywh[:, 2:] / 2
+    top_left = (xywh[:, :2] - half_wh).astype(np.int32)
+    bottom_right = (xywh[:, :2] + half_wh).astype(np.int32)
+
+    detections["id"] = keep + 1
+    detections["class_id"] = _to_numpy(boxes.cls).reshape(-1)[keep]
+    detections["confidence"] = confidences[keep]
+    detections["x0"], detections["y0"] = top_left[:, 0], top_left[:, 1]
+    detections["x1"], detections["y1"] = bottom_right[:, 0], bottom_right[:, 1]
+    detections["width_cm"] = xywh[:, 2] / PIXELS_PER_CM
+    detections["height_cm"] = xywh[:, 3] / PIXELS_PER_CM
+    return detections
+
+
+def detections_to_frame(detections, names):
+    """
+    Builds a numeric DataFrame from a detections structured array.
+
+    Args:
+        detections (np.ndarray): Array returned by ``extract_detections``.
+        names (dict): Mapping from class ID to class name.
+
+    Returns:
+        pd.DataFrame: Detection details with numeric confidence and size columns.
+    """
+    # Class IDs need not be contiguous; unknown IDs are shown as numbers.
+    class_names = [
+        names.get(class_id, str(class_id))
+        for class_id in detections["class_id"].tolist()
+    ]
+    return pd.DataFrame(
+        {
+            "ID": detections["id"],
+            "Class": class_names,
+            "Confidence": detections["confidence"],
+            "x0": detections["x0"],
+            "x1": detections["x1"],
+            "y0": detections["y0"],
+            "y1": detections["y1"],
+            "Width (cm)": detections["width_cm"],
+            "Height (cm)": detections["height_cm"],
+        },
+        columns=DETECTION_COLUMNS,
+    )
+
 
 def extract_image_data(result, confidence_threshold):
     """
@@ -16,75 +159,192 @@ def extract_image_data(result, confidence_threshold):
                     confidence_threshold (float): Minimum confidence percentage to include a detection.
 
     Returns:
-                    pd.DataFrame: DataFrame containing detected object details including ID, class, confidence, coordinates,
-                                                                            and width/height in centimeters.
+                    pd.DataFrame: Numeric DataFrame containing detected object details including ID, class,
+                                                                            confidence, coordinates, and width/height in centimeters.
     """
-    boxes = result.boxes
-    class_ids = boxes.cls
-    confidences = boxes.conf
-    xywh = boxes.xywh
-
-    data = []
-    for i in range(len(class_ids)):
-        confidence = confidences[i] * 100
-        if confidence >= confidence_threshold:
-            class_name = result.names[int(class_ids[i])]
-            x_center, y_center, width, height = xywh[i]
-            x0, y0 = int(x_center - width / 2), int(y_center - height / 2)
-            x1, y1 = int(x_center + width / 2), int(y_center + height / 2)
-            data.append(
-                [
-                    i + 1,
-                    class_name,
-                    f"{confidence:.2f} %",
-                    x0,
-                    x1,
-                    y0,
-                    y1,
-                    f"{width/4:.2f}",
-                    f"{height/4:.2f}",
-                ]
+    return detections_to_frame(
+        extract_detections(result, confidence_threshold), result.names
+    )
+
+
+def format_detections(df):
+    """
+    Formats a numeric detections DataFrame for display.
+
+    Args:
+        df (pd.DataFrame): DataFrame returned by ``extract_image_data``.
+
+    Returns:
+        pd.DataFrame: Copy with confidence as a percentage string and sizes rounded.
+    """
+    display_df = df.copy()
+    display_df["Confidence"] = display_df["Confidence"].map("{:.2f} %".format)
+    for column in ("Width (cm)", "Height (cm)"):
+        display_df[column] = display_df[column].map("{:.2f}".format)
+    return display_df
+
+
+class AnnotationRenderer:
+    """
+    Draws detection boxes and ID labels onto frames without per-frame allocation.
+
+    Frames are drawn into a reusable buffer (or in place when allowed) and the
+    rasterized label glyphs of the ``max_glyphs`` most recent label texts are
+    cached.
+
+    Args:
+        colors (dict | sequence, optional): BGR color per class ID. Sequences are
+            indexed modulo their length. Defaults to green for every class.
+        thickness (int): Box and label stroke thickness.
+        font_scale (float): Label font scale.
+        max_glyphs (int): Maximum number of cached label glyphs.
+    """
+
+    def __init__(
+        self, colors=None, thickness=2, font_scale=0.5, max_glyphs=MAX_CACHED_GLYPHS
+    ):
+        self.colors = colors
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self.max_glyphs = max_glyphs
+        self._buffer = None
+        self._glyphs = OrderedDict()
+
+    def color_for(self, class_id):
+        """Returns the BGR color used for a class ID."""
+        if not self.colors:
+            return DEFAULT_BOX_COLOR
+        if isinstance(self.colors, dict):
+            return self.colors.get(class_id, DEFAULT_BOX_COLOR)
+        return self.colors[class_id % len(self.colors)]
+
+    def _glyph(self, text):
+        """Returns the cached alpha mask of a label and its origin offsets."""
+        glyph = self._glyphs.get(text)
+        if glyph is not None:
+            self._glyphs.move_to_end(text)
+        else:
+            pad = self.thickness
+            (width, height), baseline = cv2.getTextSize(
+                text, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, self.thickness
+            )
+            mask = np.zeros((height + baseline + 2 * pad, width + 2 * pad), np.uint8)
+            cv2.putText(
+                mask,
+                text,
+                (pad, height + pad),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                self.font_scale,
+                255,
+                self.thickness,
             )
+            alpha = (mask.astype(np.float32) / 255)[..., None]
+            glyph = self._glyphs[text] = (alpha, height + pad, pad)
+            if len(self._glyphs) > self.max_glyphs:
+                self._glyphs.popitem(last=False)
+        return glyph
 
-    return pd.DataFrame(
-        data,
-        columns=[
-            "ID",
-            "Class",
-            "Confidence",
-            "x0",
-            "x1",
-            "y0",
-            "y1",
-            "Width (cm)",
-            "Height (cm)",
-        ],
-    )
+    def _blit(self, frame, text, origin, color):
+        alpha, ascent, pad = self._glyph(text)
+        top, left = origin[1] - ascent, origin[0] - pad
+        bottom, right = top + alpha.shape[0], left + alpha.shape[1]
+        frame_h, frame_w = frame.shape[:2]
+        clip_top, clip_left = max(top, 0), max(left, 0)
+        clip_bottom, clip_right = min(bottom, frame_h), min(right, frame_w)
+        if clip_top >= clip_bottom or clip_left >= clip_right:
+            return
+        region = frame[clip_top:clip_bottom, clip_left:clip_right]
+        alpha = alpha[
+            clip_top - top : clip_bottom - top, clip_left - left : clip_right - left
+        ]
+        region[:] = region + (np.asarray(color, np.float32) - region) * alpha + 0.5
+
+    def target(self, image, in_place=False):
+        """
+        Returns the frame to draw into: ``image`` itself or the reusable buffer.
+
+        Args:
+            image (np.ndarray): Source frame.
+            in_place (bool): Whether the caller allows drawing on ``image``.
+
+        Returns:
+            np.ndarray: Frame holding a copy of ``image`` unless drawing in place.
+        """
+        if in_place:
+            return image
+        if (
+            self._buffer is None
+            or self._buffer.shape != image.shape
+            or self._buffer.dtype != image.dtype
+        ):
+            self._buffer = np.empty_like(image)
+        np.copyto(self._buffer, image)
+        return self._buffer
 
+    def render(self, image, detections, in_place=False):
+        """
+        Draws boxes and ID labels for the detections.
 
-def annotate_image(result, df):
+        Args:
+            image (np.ndarray): BGR frame.
+            detections (np.ndarray): Array returned by ``extract_detections``.
+            in_place (bool): Draw directly on ``image`` instead of the reusable buffer.
+
+        Returns:
+            np.ndarray: Annotated frame. When not drawing in place this is the
+                renderer's buffer, which is overwritten by the next call.
+        """
+        frame = self.target(image, in_place)
+        rows = zip(
+            detections["id"].tolist(),
+            detections["class_id"].tolist(),
+            detections["x0"].tolist(),
+            detections["y0"].tolist(),
+            detections["x1"].tolist(),
+            detections["y1"].tolist(),
+        )
+        for id_label, class_id, x0, y0, x1, y1 in rows:
+            color = self.color_for(class_id)
+            cv2.rectangle(frame, (x0, y0), (x1, y1), color, self.thickness)
+            self._blit(frame, str(id_label), (x0 - 20, (y0 + y1) // 2), color)
+        return frame
+
+
+def annotate_image(result, detections, renderer=None, in_place=False):
     """
     Annotates detected objects on the original image by drawing bounding boxes and labeling IDs.
 
     Args:
                     result: YOLO detection result object containing the original image.
-                    df (pd.DataFrame): DataFrame containing detection details.
+                    detections (np.ndarray): Array returned by ``extract_detections``.
+                    renderer (AnnotationRenderer, optional): Renderer to reuse across frames.
+                    in_place (bool): Draw directly on ``result.orig_img``.
 
     Returns:
                     np.array: Annotated image as a NumPy array.
     """
-    result_img = np.array(result.orig_img)
-    for _, row in df.iterrows():
-        x0, y0, x1, y1, id_label = row["x0"], row["y0"], row["x1"], row["y1"], row["ID"]
-        label_x, label_y = x0 - 20, int(y0 + (y1 - y0) / 2)
-        cv2.rectangle(result_img, (x0, y0), (x1, y1), (0, 255, 0), 2)
-        cv2.putText(
-            result_img,
-            str(id_label),
-            (label_x, label_y),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.5,
-            (0, 255, 0),
-            2,
-        )
-    return result_img
+    if renderer is None:
+        return AnnotationRenderer().render(np.asarray(result.orig_img), detections)
+    return renderer.render(np.asarray(result.orig_img), detections, in_place)
+
+
+def process_frame(frame, model, confidence_threshold, renderer=None):
+    """
+    Runs YOLO inference on a single video frame and annotates the detections.
+
+    Args:
+        frame (np.array): Video frame image.
+        model: YOLO object detection model.
+        confidence_threshold (float): Minimum confidence level for detections.
+        renderer (AnnotationRenderer, optional): Renderer reused across frames.
+            When given, the frame is annotated in place.
+
+    Returns:
+        tuple: Annotated frame and extracted detection data as a DataFrame.
+    """
+    results = model(frame, conf=INFERENCE_CONFIDENCE, verbose=False)
+    detections = extract_detections(results[0], confidence_threshold)
+    result_img = annotate_image(
+        results[0], detections, renderer, in_place=renderer is not None
+    )
+    return result_img, detections_to_frame(detections, results[0].names)
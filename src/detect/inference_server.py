@@ -0,0 +1,606 @@
+"""
+Shared local inference server with dynamic batching.
+
+One server process holds the model; every Streamlit session connects as
+one client, whatever number of threads it runs inference from. Frames are passed through
+a per-client shared-memory segment, so only a small header crosses the
+socket. The server gathers frames from all clients into batches, taking
+one frame per client in turn so a client sending many frames cannot starve
+the others, and runs a batch once it is full or its oldest frame has waited
+``max_latency``. Results come back as ``ArrayResult`` objects, which
+``extract_detections``, ``extract_image_data`` and ``annotate_image``
+accept like YOLO results.
+
+Usage (from the repository root):
+
+    python -m src.detect.inference_server serve --address /tmp/steel-detect.sock
+    python -m src.detect.inference_server stats --address /tmp/steel-detect.sock
+
+The app uses the server when ``DETECT_INFERENCE_SERVER`` is set to its
+address. The default is a Unix socket that only the owner can open;
+``host:port`` listens on TCP instead. Messages are pickled, so every
+connection must authenticate with a shared key: ``DETECT_INFERENCE_AUTHKEY``
+if set, otherwise the key in ``DETECT_INFERENCE_KEYFILE``
+(``~/.steel_detect_inference.key``), which ``serve`` creates with mode 0600
+on first start.
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+from . import instrumentation
+from .image_processing import ArrayResult, _to_numpy
+
+DEFAULT_ADDRESS = os.environ.get(
+    "DETECT_INFERENCE_SERVER",
+    (
+        os.path.expanduser("~/.steel_detect_inference.sock")
+        if os.name == "posix"
+        else r"\\.\pipe\steel_detect_inference"
+    ),
+)
+KEY_FILE = os.environ.get(
+    "DETECT_INFERENCE_KEYFILE", os.path.expanduser("~/.steel_detect_inference.key")
+)
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_LATENCY = 0.010
+# Ultralytics' default confidence threshold, used when a call passes none.
+DEFAULT_CONFIDENCE = 0.25
+SHM_ALIGNMENT = 64
+
+
+def parse_address(address):
+    """
+    Converts ``host:port`` to a TCP address tuple; other strings are socket paths.
+
+    Args:
+        address (str): Server address.
+
+    Returns:
+        str | tuple[str, int]: Address for ``multiprocessing.connection``.
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit() and os.sep not in address:
+        return host, int(port)
+    return address
+
+
+def load_authkey(create=False, key_file=KEY_FILE):
+    """
+    Returns the shared key connections authenticate with.
+
+    Args:
+        create (bool): Generate a random key into ``key_file`` if there is none.
+        key_file (str): Key file used when ``DETECT_INFERENCE_AUTHKEY`` is unset.
+
+    Returns:
+        bytes: Authentication key.
+
+    Raises:
+        PermissionError: If the key file is readable by other users.
+        FileNotFoundError: If there is no key and ``create`` is False.
+    """
+    key = os.environ.get("DETECT_INFERENCE_AUTHKEY")
+    if key:
+        return key.encode()
+    if create and not os.path.exists(key_file):
+        descriptor = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as handle:
+            handle.write(secrets.token_hex(32))
+    if os.name == "posix" and os.stat(key_file).st_mode & 0o077:
+        raise PermissionError(f"{key_file} must only be readable by its owner")
+    with open(key_file, encoding="utf-8") as handle:
+        return handle.read().strip().encode()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 always registers the segment
+        segment = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+
+            # The client owns the segment; the server must not unlink it on exit.
+            resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+def _unlink_segment(segment):
+    segment.close()
+    segment.unlink()
+
+
+def _close_segment(segment):
+    try:
+        segment.close()
+    except BufferError:
+        # A batch still holds views into it; it is unmapped once they are freed.
+        pass
+
+
+def _result_arrays(result, confidence):
+    """Returns ``(xyxy, conf, cls)`` arrays of a result above ``confidence``."""
+    boxes = result.boxes
+    conf = _to_numpy(boxes.conf).reshape(-1).astype(np.float32)
+    keep = conf >= confidence
+    # extract_detections reads xywh, so that is what every result provides.
+    xywh = _to_numpy(boxes.xywh).reshape(-1, 4).astype(np.float32)[keep]
+    xyxy = np.concatenate(
+        [xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], 1
+    )
+    return xyxy, conf[keep], _to_numpy(boxes.cls).reshape(-1).astype(np.float32)[keep]
+
+
+class _Client:
+    def __init__(self, client_id, conn, label):
+        self.id = client_id
+        self.conn = conn
+        self.label = label
+        self.pending = deque()
+        self.segment = None
+        self.served = 0
+        self.wait_total = 0.0
+        self.closed = False
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        with self.send_lock:
+            try:
+                self.conn.send(message)
+            except OSError:
+                self.closed = True
+
+
+class _Request:
+    def __init__(self, client, request_id, count, confidence):
+        self.client = client
+        self.id = request_id
+        self.results = [None] * count
+        self.remaining = count
+        self.confidence = confidence
+        self.inference_ms = 0.0
+
+
+class InferenceServer:
+    """
+    Serves batched inference for one model to many local clients.
+
+    Args:
+        model (YOLO): Loaded model.
+        address (str | tuple): Socket path or ``(host, port)`` to listen on.
+        max_batch (int): Maximum frames per model call.
+        max_latency (float): Seconds the oldest queued frame may wait for a
+            batch to fill.
+        authkey (bytes, optional): Shared secret clients must present;
+            defaults to ``load_authkey(create=True)``.
+    """
+
+    def __init__(
+        self,
+        model,
+        address,
+        max_batch=DEFAULT_MAX_BATCH,
+        max_latency=DEFAULT_MAX_LATENCY,
+        authkey=None,
+    ):
+        self.model = model
+        self.address = address
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.authkey = authkey or load_authkey(create=True)
+        self.batches = 0
+        self.frames = 0
+        self._clients = {}
+        self._next_id = 1
+        self._turn = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def serve_forever(self):
+        """Accepts clients and runs batches until ``stop`` is called."""
+        unix_socket = isinstance(self.address, str) and os.name == "posix"
+        if unix_socket and os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        # The socket is created owner-only, so other users cannot connect at all.
+        umask = os.umask(0o177) if unix_socket else None
+        try:
+            listener = connection.Listener(self.address, authkey=self.authkey)
+        finally:
+            if umask is not None:
+                os.umask(umask)
+        if unix_socket:
+            os.chmod(self.address, 0o600)
+        with listener:
+            threading.Thread(target=self._batch_loop, daemon=True).start()
+            while not self._stop.is_set():
+                try:
+                    conn = listener.accept()
+                except (OSError, connection.AuthenticationError):
+                    continue
+                threading.Thread(
+                    target=self._client_loop, args=(conn,), daemon=True
+                ).start()
+
+    def stop(self):
+        """Stops the batch loop; ``serve_forever`` returns after the next accept."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _client_loop(self, conn):
+        with self._cond:
+            client = _Client(self._next_id, conn, str(self._next_id))
+            self._next_id += 1
+            self._clients[client.id] = client
+        client.send(("hello", dict(self.model.names), self._weights()))
+        try:
+            while not self._stop.is_set():
+                message = conn.recv()
+                if message[0] == "infer":
+                    self._enqueue(client, *message[1:])
+                elif message[0] == "label":
+                    client.label = message[1]
+                elif message[0] == "stats":
+                    client.send(("stats", self.stats()))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._cond:
+                client.closed = True
+                client.pending.clear()
+                self._clients.pop(client.id, None)
+            if client.segment is not None:
+                _close_segment(client.segment)
+            conn.close()
+
+    def _weights(self):
+        return getattr(self.model, "ckpt_path", None) or getattr(
+            self.model, "model_name", None
+        )
+
+    def _frames(self, client, frames):
+        views = []
+        for frame in frames:
+            if isinstance(frame, np.ndarray):
+                views.append(frame)
+                continue
+            _, name, shape, dtype, offset = frame
+            if client.segment is None or client.segment.name != name:
+                if client.segment is not None:
+                    _close_segment(client.segment)
+                client.segment = _attach(name)
+            views.append(
+                np.ndarray(shape, dtype, buffer=client.segment.buf, offset=offset)
+            )
+        return views
+
+    def _enqueue(self, client, request_id, frames, confidence):
+        views = self._frames(client, frames)
+        request = _Request(client, request_id, len(views), confidence)
+        now = time.monotonic()
+        with self._cond:
+            for index, view in enumerate(views):
+                client.pending.append((request, index, view, now))
+            self._cond.notify_all()
+
+    def _queue_depth(self):
+        return sum(len(client.pending) for client in self._clients.values())
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._stop.is_set():
+                waiting = [
+                    client for client in self._clients.values() if client.pending
+                ]
+                if not waiting:
+                    self._cond.wait(0.5)
+                    continue
+                oldest = min(client.pending[0][3] for client in waiting)
+                remaining = oldest + self.max_latency - time.monotonic()
+                if self._queue_depth() >= self.max_batch or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            else:
+                return []
+
+            # Round-robin, one frame per client per pass, starting after the
+            # client served first last time.
+            batch, clients = [], sorted(self._clients.values(), key=lambda c: c.id)
+            start = next(
+                (i for i, client in enumerate(clients) if client.id > self._turn), 0
+            )
+            clients = clients[start:] + clients[:start]
+            while len(batch) < self.max_batch and any(c.pending for c in clients):
+                for client in clients:
+                    if client.pending and len(batch) < self.max_batch:
+                        batch.append(client.pending.popleft())
+            self._turn = batch[0][0].client.id
+            return batch
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        now = time.monotonic()
+        for request, _, _, enqueued in batch:
+            request.client.wait_total += now - enqueued
+            instrumentation.record("queue_wait", now - enqueued)
+        requests = {id(request): request for request, _, _, _ in batch}.values()
+        try:
+            start = time.perf_counter()
+            results = self.model(
+                [view for _, _, view, _ in batch],
+                conf=min(request.confidence for request in requests),
+                verbose=False,
+            )
+            inference = time.perf_counter() - start
+            instrumentation.record("inference", inference)
+            self.batches += 1
+            self.frames += len(batch)
+            for (request, index, _, _), result in zip(batch, results):
+                request.results[index] = _result_arrays(result, request.confidence)
+                request.inference_ms += inference * 1000 / len(batch)
+                request.client.served += 1
+                request.remaining -= 1
+        except Exception as error:
+            # One bad batch must not stop the loop serving every client.
+            for request in requests:
+                request.client.send(("error", request.id, repr(error)))
+            return
+        for request in requests:
+            if request.remaining == 0:
+                request.client.send(
+                    (
+                        "result",
+                        request.id,
+                        request.results,
+                        {"inference": request.inference_ms},
+                    )
+                )
+
+    def stats(self):
+        """
+        Returns queue and batching statistics.
+
+        Returns:
+            dict: Per-client queue depth, frames served and mean queue wait,
+                plus total queue depth, batches, frames and mean batch size.
+        """
+        with self._cond:
+            clients = [
+                {
+                    "id": client.id,
+                    "label": client.label,
+                    "queued": len(client.pending),
+                    "served": client.served,
+                    "mean_wait_ms": (
+                        client.wait_total / client.served * 1000
+                        if client.served
+                        else 0.0
+                    ),
+                }
+                for client in self._clients.values()
+            ]
+            queue_depth = self._queue_depth()
+        return {
+            "clients": clients,
+            "queue_depth": queue_depth,
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+
+class _Connection:
+    """One client connection with its own shared-memory segment."""
+
+    def __init__(self, address, authkey, label, use_shared_memory):
+        self.conn = connection.Client(address, authkey=authkey)
+        _, self.names, self.weights = self.conn.recv()
+        self.conn.send(("label", label))
+        self.use_shared_memory = use_shared_memory
+        self.segment = None
+        self._finalizer = None
+        self.request_id = 0
+
+    def _pack(self, frames):
+        offsets, total = [], 0
+        for frame in frames:
+            offsets.append(total)
+            total += -(-frame.nbytes // SHM_ALIGNMENT) * SHM_ALIGNMENT
+        if self.segment is None or self.segment.size < total:
+            self._release_segment()
+            self.segment = shared_memory.SharedMemory(create=True, size=max(total, 1))
+            # Unlinks the segment when the connection is collected or at exit.
+            self._finalizer = weakref.finalize(self, _unlink_segment, self.segment)
+        headers = []
+        for frame, offset in zip(frames, offsets):
+            view = np.ndarray(frame.shape, frame.dtype, self.segment.buf, offset)
+            view[...] = frame
+            del view
+            headers.append(
+                ("shm", self.segment.name, frame.shape, frame.dtype.str, offset)
+            )
+        return headers
+
+    def infer(self, frames, confidence):
+        self.request_id += 1
+        headers = (
+            self._pack(frames)
+            if self.use_shared_memory
+            else [np.ascontiguousarray(frame) for frame in frames]
+        )
+        self.conn.send(("infer", self.request_id, headers, confidence))
+        while True:
+            kind, request_id, *payload = self.conn.recv()
+            if request_id != self.request_id:
+                continue
+            if kind == "error":
+                raise RuntimeError(f"Inference server error: {payload[0]}")
+            return payload
+
+    def stats(self):
+        self.conn.send(("stats",))
+        while True:
+            message = self.conn.recv()
+            if message[0] == "stats":
+                return message[1]
+
+    def _release_segment(self):
+        if self._finalizer is not None:
+            self._finalizer()
+        self.segment = self._finalizer = None
+
+    def close(self):
+        self.conn.close()
+        self._release_segment()
+
+
+class RemoteModel:
+    """
+    Callable stand-in for a YOLO model that runs inference on the server.
+
+    All calls share one connection, so the threads of a session (pipeline,
+    tiling workers) count as a single client in the server's fair
+    scheduling. Calls are serialized; a broken connection is reopened on
+    the next call.
+
+    Args:
+        address (str): Server address, see ``parse_address``.
+        authkey (bytes, optional): Shared secret of the server; defaults to
+            ``load_authkey()``.
+        label (str, optional): Client name shown in the server statistics.
+        use_shared_memory (bool): Pass pixels through shared memory instead of
+            pickling them over the socket.
+
+    Raises:
+        OSError: If the server is unreachable.
+        multiprocessing.AuthenticationError: If the server rejects the key.
+    """
+
+    def __init__(
+        self,
+        address=DEFAULT_ADDRESS,
+        authkey=None,
+        label=None,
+        use_shared_memory=True,
+    ):
+        self.address = parse_address(address)
+        self.authkey = authkey or load_authkey()
+        self.label = label or str(os.getpid())
+        self.use_shared_memory = use_shared_memory
+        self._lock = threading.Lock()
+        self._conn = None
+        with self._lock:
+            first = self._connection()
+        self.names = first.names
+        self.model_name = first.weights
+        self.ckpt_path = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = _Connection(
+                self.address, self.authkey, self.label, self.use_shared_memory
+            )
+        return self._conn
+
+    def _request(self, method, *args):
+        with self._lock:
+            try:
+                return getattr(self._connection(), method)(*args)
+            except (EOFError, OSError) as error:
+                self._close()
+                raise ConnectionError(f"Inference server unavailable: {error}")
+
+    def __call__(self, source, conf=None, verbose=False, **kwargs):
+        """
+        Runs inference on one BGR frame or a list of frames.
+
+        Args:
+            source (np.ndarray | list[np.ndarray]): BGR frames.
+            conf (float, optional): Minimum confidence from 0 to 1.
+            verbose (bool): Ignored; accepted for YOLO compatibility.
+
+        Returns:
+            list[ArrayResult]: One result per frame.
+        """
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        frames = [np.asarray(frame) for frame in frames]
+        arrays, speed = self._request(
+            "infer", frames, DEFAULT_CONFIDENCE if conf is None else conf
+        )
+        return [
+            ArrayResult(xyxy, scores, classes, self.names, frame, speed)
+            for frame, (xyxy, scores, classes) in zip(frames, arrays)
+        ]
+
+    def stats(self):
+        """Returns the server's queue and batching statistics."""
+        return self._request("stats")
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self):
+        """Closes the connection and frees its shared-memory segment."""
+        with self._lock:
+            self._close()
+
+
+def main(argv=None):
+    """Runs the server or prints its statistics; returns a process exit code."""
+    parser = argparse.ArgumentParser(description="Shared YOLO inference server.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Load the model and serve clients.")
+    serve.add_argument("--address", default=DEFAULT_ADDRESS)
+    serve.add_argument("--weights", default="weights/weight-merged.pt")
+    serve.add_argument("--device")
+    serve.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    serve.add_argument(
+        "--max-latency-ms", type=float, default=DEFAULT_MAX_LATENCY * 1000
+    )
+    stats = subparsers.add_parser("stats", help="Print queue and batch statistics.")
+    stats.add_argument("--address", default=DEFAULT_ADDRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print(json.dumps(RemoteModel(args.address).stats(), indent=2))
+        return 0
+
+    from .model_loader import load_yolo_model
+
+    instrumentation.start_exporters_from_env()
+    server = InferenceServer(
+        load_yolo_model(args.weights, args.device),
+        parse_address(args.address),
+        args.max_batch,
+        args.max_latency_ms / 1000,
+    )
+    print(f"Serving {args.weights} on {args.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Per-stage timing histograms for the detection path.
+
+Timers are no-ops until instrumentation is enabled, either with the
+``DETECT_METRICS=1`` environment variable or from scripts with ``enable()``.
+Histograms are shared by every session of the process, so the app exposes
+no per-session switch.
+Collected histograms can be exported as Prometheus text over HTTP
+(``DETECT_METRICS_PORT``) or appended periodically as JSON lines
+(``DETECT_METRICS_JSONL``).
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = (
+    "decode",
+    "preprocess",
+    "inference",
+    "extract",
+    "track",
+    "annotate",
+    "ui_push",
+    "db_write",
+    "stream_lag",
+    "queue_wait",
+)
+
+# Bucket upper bounds in seconds, roughly logarithmic from 0.1 ms to 10 s.
+BUCKETS = tuple(
+    round(base * 10**exponent, 6)
+    for exponent in range(-4, 1)
+    for base in (1, 1.5, 2, 3, 5, 7)
+) + (10.0,)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with approximate quantiles.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Records one duration in seconds."""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by interpolating inside its bucket.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            float: Estimated duration in seconds, or 0 when empty.
+        """
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank, seen = q * count, 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def summary(self):
+        """Returns count, mean and p50/p95/p99 in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.quantile(0.50) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+        }
+
+
+_enabled = os.environ.get("DETECT_METRICS", "0") == "1"
+_histograms = {stage: Histogram() for stage in STAGES}
+_histograms_lock = threading.Lock()
+_NOOP = nullcontext()
+
+
+def enabled():
+    """Returns whether timers are currently recording."""
+    return _enabled
+
+
+def enable(on=True):
+    """Turns stage timing on or off for the whole process."""
+    global _enabled
+    _enabled = on
+
+
+def reset():
+    """Clears every histogram."""
+    with _histograms_lock:
+        for stage in list(_histograms):
+            _histograms[stage] = Histogram()
+
+
+def record(stage, seconds):
+    """
+    Records a duration measured elsewhere.
+
+    Args:
+        stage (str): Stage name.
+        seconds (float): Duration in seconds.
+    """
+    if _enabled:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            with _histograms_lock:
+                histogram = _histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+
+def record_speed(result):
+    """
+    Records the preprocess and inference times an Ultralytics result reports.
+
+    Ultralytics times its own stages in milliseconds per image; postprocess
+    (NMS) is counted as part of inference.
+
+    Args:
+        result: A single Ultralytics result with a ``speed`` dict.
+    """
+    speed = getattr(result, "speed", None)
+    # Cached and propagated results carry no timings.
+    if not _enabled or not speed:
+        return
+    record("preprocess", (speed.get("preprocess") or 0) / 1000)
+    record(
+        "inference",
+        ((speed.get("inference") or 0) + (speed.get("postprocess") or 0)) / 1000,
+    )
+
+
+@contextmanager
+def _timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timer(stage):
+    """
+    Returns a context manager timing its block under ``stage``.
+
+    Args:
+        stage (str): Stage name.
+
+    Returns:
+        contextmanager: A no-op when instrumentation is disabled.
+    """
+    return _timed(stage) if _enabled else _NOOP
+
+
+def summary():
+    """
+    Returns per-stage statistics for stages with at least one sample.
+
+    Returns:
+        dict: Stage name to count, mean and p50/p95/p99 in milliseconds.
+    """
+    return {
+        stage: histogram.summary()
+        for stage, histogram in list(_histograms.items())
+        if histogram.count
+    }
+
+
+def format_summary():
+    """
+    Formats per-stage percentiles as one text line per stage.
+
+    Returns:
+        str: Lines like ``inference: p50 12.1 / p95 15.3 / p99 20.8 ms (n=240)``.
+    """
+    return "\n".join(
+        f"{stage}: p50 {stats['p50_ms']:.1f} / p95 {stats['p95_ms']:.1f} / "
+        f"p99 {stats['p99_ms']:.1f} ms (n={stats['count']})"
+        for stage, stats in summary().items()
+    )
+
+
+def prometheus_text():
+    """
+    Renders every histogram in the Prometheus text exposition format.
+
+    Returns:
+        str: Exposition text.
+    """
+    name = "detect_stage_duration_seconds"
+    lines = [
+        f"# HELP {name} Duration of detection pipeline stages.",
+        f"# TYPE {name} histogram",
+    ]
+    for stage, histogram in list(_histograms.items()):
+        with histogram._lock:
+            counts, count, total = (
+                list(histogram.counts),
+                histogram.count,
+                histogram.total,
+            )
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """
+    Serves ``/metrics`` in Prometheus text format on a daemon thread.
+
+    Args:
+        port (int): Port to listen on.
+        host (str): Interface to bind.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_json_exporter(path, interval=10.0):
+    """
+    Appends a JSON line with the per-stage summary every ``interval`` seconds.
+
+    Args:
+        path (str): JSON-lines output file.
+        interval (float): Seconds between lines.
+
+    Returns:
+        threading.Thread: The exporter thread.
+    """
+
+    def export():
+        while True:
+            time.sleep(interval)
+            stages = summary()
+            if stages:
+                with open(path, "a", encoding="utf-8") as output:
+                    output.write(json.dumps({"time": time.time(), "stages": stages}))
+                    output.write("\n")
+
+    thread = threading.Thread(target=export, daemon=True)
+    thread.start()
+    return thread
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters_from_env():
+    """Starts the exporters configured by environment variables, once per process."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if os.environ.get("DETECT_METRICS_PORT"):
+        start_http_server(int(os.environ["DETECT_METRICS_PORT"]))
+    if os.environ.get("DETECT_METRICS_JSONL"):
+        start_json_exporter(os.environ["DETECT_METRICS_JSONL"])
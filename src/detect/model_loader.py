@@ -1,11 +1,294 @@
-from ultralytics import YOLO
+"""
+Process-wide YOLO model registry.
 
+Loaded models are shared across Streamlit sessions and reruns. Each entry is
+keyed by the resolved weights path, the file's mtime/size and the target
+device, so replacing a weights file on disk transparently loads the new one.
+Extra instances of a model and objects built from it (such as tiled
+predictors) are stored with its entry, so they count toward the memory cap
+and are unloaded together with the model.
 
-def load_yolo_model(model):
+Every call on a shared model passes ``conf=INFERENCE_CONFIDENCE``.
+Ultralytics copies call arguments into the model's predictor outside its
+predict lock, so sessions calling with different values would change each
+other's threshold mid-call; callers filter by their own threshold instead.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from .backends import resolve_weights
+
+MAX_RESIDENT_MODELS = 3
+MAX_RESIDENT_BYTES = 2 * 1024**3
+WARMUP_IMAGE_SIZE = 640
+INFERENCE_CONFIDENCE = 0.01
+
+
+class ModelRegistry:
+    """
+    LRU cache of loaded YOLO models bounded by count and estimated memory.
+
+    Args:
+        max_models (int): Maximum number of models kept resident.
+        max_bytes (int): Maximum total estimated parameter memory in bytes.
+        warmup_size (int): Side length of the dummy frame used for warm-up.
+    """
+
+    def __init__(
+        self,
+        max_models=MAX_RESIDENT_MODELS,
+        max_bytes=MAX_RESIDENT_BYTES,
+        warmup_size=WARMUP_IMAGE_SIZE,
+    ):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.warmup_size = warmup_size
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(weights_path, device):
+        path = os.path.abspath(weights_path)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size, device or "auto"
+
+    def get(self, weights_path, device=None):
+        """
+        Returns a loaded model for the weights file, loading it on first use.
+
+        The registry lock is only held for dictionary access. Concurrent
+        requests for a model being loaded wait for that load, while other
+        models stay available.
+
+        Args:
+            weights_path (str): Path to the YOLO weights file.
+            device (str, optional): Torch device such as "cpu" or "cuda:0".
+
+        Returns:
+            YOLO: The shared model instance.
+        """
+        key = self._key(weights_path, device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry["hits"] += 1
+                return entry["model"]
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            # Raises the loader's exception if its load failed.
+            return loading.result()
+
+        try:
+            entry = self._load(key)
+        except BaseException as error:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(error)
+            raise
+        with self._lock:
+            self._drop_stale(key)
+            self._entries[key] = entry
+            self._evict()
+            del self._loading[key]
+        loading.set_result(entry["model"])
+        return entry["model"]
+
+    def _load(self, key):
+        # Imported on first load: torch alone takes seconds to import.
+        from ultralytics import YOLO
+
+        path, _, _, device = key
+        start = time.perf_counter()
+        model = YOLO(path, task="detect")
+        if device != "auto" and path.endswith(".pt"):
+            model.to(device)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dummy = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+        model(dummy, conf=INFERENCE_CONFIDENCE, verbose=False)
+        warmup_time = time.perf_counter() - start
+
+        return {
+            "model": model,
+            "bytes": _model_nbytes(model) or _disk_nbytes(path),
+            "load_time": load_time,
+            "warmup_time": warmup_time,
+            "loaded_at": time.time(),
+            "hits": 0,
+            "replicas": [],
+            "derived": {},
+        }
+
+    def _entry_of(self, model):
+        for key, entry in self._entries.items():
+            if entry["model"] is model:
+                return key, entry
+        return None, None
+
+    def replicas(self, model, count):
+        """
+        Returns ``count`` independent instances of a resident model.
+
+        The first is ``model`` itself; the others are loaded from the same
+        weights on first request and kept with its entry. Models the
+        registry does not hold are returned alone.
+
+        Args:
+            model (YOLO): Model returned by ``get``.
+            count (int): Number of instances wanted.
+
+        Returns:
+            list: ``model`` followed by up to ``count - 1`` replicas.
+        """
+        with self._lock:
+            key, entry = self._entry_of(model)
+            if entry is None:
+                return [model]
+            missing = count - 1 - len(entry["replicas"])
+        # Loaded without the lock, like ``get``; a concurrent call may load
+        # the same replicas, and the surplus is discarded.
+        loaded = [self._load(key) for _ in range(max(missing, 0))]
+        with self._lock:
+            for replica in loaded:
+                if len(entry["replicas"]) < count - 1:
+                    entry["replicas"].append(replica["model"])
+                    entry["bytes"] += replica["bytes"]
+            self._evict()
+            return [model] + entry["replicas"][: count - 1]
+
+    def derived(self, model, name, factory):
+        """
+        Returns an object built from a resident model, creating it on first use.
+
+        The object is dropped when the model is evicted. Models the registry
+        does not hold get a new object on every call.
+
+        Args:
+            model (YOLO): Model returned by ``get``.
+            name (hashable): Identifies the object among those of the model.
+            factory (callable): Builds the object; called without the lock held.
+
+        Returns:
+            object: Cached or newly built object.
+        """
+        with self._lock:
+            _, entry = self._entry_of(model)
+            if entry is not None and name in entry["derived"]:
+                return entry["derived"][name]
+        value = factory()
+        with self._lock:
+            _, entry = self._entry_of(model)
+            if entry is not None:
+                value = entry["derived"].setdefault(name, value)
+        return value
+
+    def _drop_stale(self, key):
+        """Removes entries for the same path/device whose file has changed."""
+        path, _, _, device = key
+        for other in list(self._entries):
+            if other[0] == path and other[3] == device:
+                del self._entries[other]
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models
+            or self.resident_bytes() > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+
+    def resident_bytes(self):
+        """Returns the total estimated memory of resident models in bytes."""
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def stats(self):
+        """
+        Returns load statistics for every resident model, most recent last.
+
+        Returns:
+            list[dict]: One dict per model with path, device, memory and timings.
+        """
+        with self._lock:
+            return [
+                {
+                    "path": key[0],
+                    "device": key[3],
+                    "bytes": entry["bytes"],
+                    "load_time": entry["load_time"],
+                    "warmup_time": entry["warmup_time"],
+                    "loaded_at": entry["loaded_at"],
+                    "hits": entry["hits"],
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def clear(self):
+        """Unloads every resident model."""
+        with self._lock:
+            self._entries.clear()
+
+
+def _model_nbytes(model):
+    """Estimates the memory held by a model's parameters and buffers."""
+    try:
+        module = model.model
+        tensors = list(module.parameters()) + list(module.buffers())
+    except AttributeError:
+        return 0
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _disk_nbytes(path):
+    """Returns the size of an exported model file or directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+registry = ModelRegistry()
+
+
+def load_yolo_model(model, device=None, backend=None):
     """
     Loads the YOLO object detection model with pre-trained weights.
 
+    The model is loaded and warmed up once per process and shared through
+    the module-level registry. For the ONNX and OpenVINO backends, the weights
+    are exported on first use and the cached artifact is loaded instead.
+
+    Args:
+        model (str): Path to the YOLO weights file.
+        device (str, optional): Torch device to place the model on.
+        backend (str, optional): Inference backend; defaults to ``DETECT_BACKEND``.
+
     Returns:
         YOLO: An instance of the YOLO model.
     """
-    return YOLO(model)
+    return registry.get(resolve_weights(model, backend), device)
+
+
+def get_model_stats():
+    """
+    Returns load and warm-up statistics for resident models.
+
+    Returns:
+        list[dict]: Registry statistics, see ``ModelRegistry.stats``.
+    """
+    return registry.stats()
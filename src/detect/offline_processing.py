@@ -0,0 +1,172 @@
+"""
+Offline (every-frame) video processing with batched inference.
+"""
+
+import threading
+import time
+
+import cv2
+import pandas as pd
+
+from . import instrumentation
+from .image_processing import (
+    DETECTION_COLUMNS,
+    AnnotationRenderer,
+    annotate_image,
+    detections_to_frame,
+    extract_detections,
+)
+from .model_loader import INFERENCE_CONFIDENCE
+from .pipeline import BLOCK, FrameQueue, QueueClosed
+
+DEFAULT_BATCH_SIZE = 8
+
+
+def read_batches(video_capture, batch_size, output, stop_event):
+    """
+    Decodes frames sequentially and enqueues them in lists of ``batch_size``.
+
+    Args:
+        video_capture (cv2.VideoCapture): Opened video capture.
+        batch_size (int): Number of frames per batch.
+        output (FrameQueue): Queue receiving ``(first_frame_index, frames)`` tuples.
+        stop_event (threading.Event): Stops decoding when set.
+    """
+    frame_index = 0
+    try:
+        while not stop_event.is_set():
+            frames = []
+            while len(frames) < batch_size:
+                with instrumentation.timer("decode"):
+                    ret, frame = video_capture.read()
+                if not ret:
+                    break
+                frames.append(frame)
+            if not frames:
+                break
+            if not output.put((frame_index, frames), stop_event):
+                break
+            frame_index += len(frames)
+    finally:
+        output.close()
+
+
+def write_detections(detections_df, sidecar_path):
+    """
+    Writes per-frame detections to Parquet or CSV depending on the extension.
+
+    Args:
+        detections_df (pd.DataFrame): Detections with frame index columns.
+        sidecar_path (str): Output path ending in ``.parquet`` or ``.csv``.
+    """
+    if sidecar_path.endswith(".parquet"):
+        detections_df.to_parquet(sidecar_path, index=False)
+    else:
+        detections_df.to_csv(sidecar_path, index=False)
+
+
+def process_video_offline(
+    video_path,
+    model,
+    confidence_threshold,
+    output_path,
+    sidecar_path,
+    batch_size=DEFAULT_BATCH_SIZE,
+    progress_callback=None,
+):
+    """
+    Runs YOLO inference on every frame of a video in batches.
+
+    Writes an annotated MP4 and a per-frame detections sidecar file. Nothing
+    is pushed to the UI per frame; only ``progress_callback`` is invoked once
+    per batch. Either output can be skipped by passing None for its path.
+
+    Args:
+        video_path (str): Path to the input video.
+        model: YOLO object detection model.
+        confidence_threshold (float): Minimum confidence percentage for detections.
+        output_path (str | None): Path of the annotated MP4 to write.
+        sidecar_path (str | None): Path of the detections file (``.parquet`` or ``.csv``).
+        batch_size (int): Number of frames passed to the model per call.
+        progress_callback (callable, optional): Called with
+            ``(frames_done, total_frames)`` after every batch.
+
+    Returns:
+        dict: Frame count, detection count, elapsed time, throughput in frames/sec
+            and the detections DataFrame under ``"detections_df"``.
+    """
+    video_capture = cv2.VideoCapture(video_path)
+    if not video_capture.isOpened():
+        raise ValueError(f"Unable to open video file: {video_path}")
+
+    frame_rate = video_capture.get(cv2.CAP_PROP_FPS) or 30
+    total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    writer = None
+    if output_path is not None:
+        writer = cv2.VideoWriter(
+            output_path, cv2.VideoWriter_fourcc(*"mp4v"), frame_rate, (width, height)
+        )
+
+    batches = FrameQueue(2, BLOCK)
+    stop_event = threading.Event()
+    decoder = threading.Thread(
+        target=read_batches,
+        args=(video_capture, batch_size, batches, stop_event),
+        daemon=True,
+    )
+    renderer = AnnotationRenderer()
+    frames_done, detection_frames = 0, []
+    start_time = time.perf_counter()
+
+    decoder.start()
+    try:
+        while True:
+            try:
+                first_index, frames = batches.get()
+            except QueueClosed:
+                break
+            results = model(frames, conf=INFERENCE_CONFIDENCE, verbose=False)
+            for offset, result in enumerate(results):
+                instrumentation.record_speed(result)
+                with instrumentation.timer("extract"):
+                    detections = extract_detections(result, confidence_threshold)
+                if writer is not None:
+                    with instrumentation.timer("annotate"):
+                        annotated = annotate_image(result, detections, renderer)
+                    writer.write(annotated)
+                if len(detections):
+                    frame_df = detections_to_frame(detections, result.names)
+                    frame_df.insert(0, "Frame", first_index + offset)
+                    frame_df.insert(
+                        1, "Time (sec)", (first_index + offset) / frame_rate
+                    )
+                    detection_frames.append(frame_df)
+            frames_done += len(frames)
+            if progress_callback is not None:
+                progress_callback(frames_done, total_frames)
+    finally:
+        stop_event.set()
+        decoder.join()
+        if writer is not None:
+            writer.release()
+        video_capture.release()
+
+    elapsed = time.perf_counter() - start_time
+    if detection_frames:
+        detections_df = pd.concat(detection_frames, ignore_index=True)
+    else:
+        detections_df = pd.DataFrame(
+            columns=["Frame", "Time (sec)", *DETECTION_COLUMNS]
+        )
+    if sidecar_path is not None:
+        write_detections(detections_df, sidecar_path)
+
+    return {
+        "frames": frames_done,
+        "detections": len(detections_df),
+        "elapsed": elapsed,
+        "fps": frames_done / elapsed if elapsed > 0 else 0,
+        "detections_df": detections_df,
+    }
@@ -0,0 +1,290 @@
+"""
+Staged, multi-threaded frame pipeline for video detection.
+
+Frames flow decoder thread -> inference worker -> caller through bounded
+queues. The caller (the Streamlit script thread) consumes finished frames
+and does annotation and UI updates, so decode and inference overlap with
+rendering.
+"""
+
+import threading
+import time
+from collections import deque
+
+from . import instrumentation
+from .image_processing import extract_detections
+from .model_loader import INFERENCE_CONFIDENCE
+from .tracking import BoxTracker, PropagatedResult, SceneChangeDetector
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+
+
+class QueueClosed(Exception):
+    """Raised by ``FrameQueue.get`` once the queue is closed and drained."""
+
+
+class FrameQueue:
+    """
+    Bounded FIFO with an explicit overflow policy.
+
+    Args:
+        maxsize (int): Maximum number of queued items.
+        policy (str): ``BLOCK`` to apply backpressure to the producer or
+            ``DROP_OLDEST`` to discard the oldest item when full.
+    """
+
+    def __init__(self, maxsize, policy=BLOCK):
+        if policy not in (BLOCK, DROP_OLDEST):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, item, stop_event=None):
+        """
+        Adds an item, blocking or dropping the oldest item when full.
+
+        Args:
+            item: Item to enqueue.
+            stop_event (threading.Event, optional): Aborts a blocking put when set.
+
+        Returns:
+            bool: False if the put was aborted by ``stop_event``.
+        """
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._cond.wait(0.1)
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Removes and returns the oldest item.
+
+        Args:
+            timeout (float, optional): Seconds to wait before raising ``TimeoutError``.
+
+        Returns:
+            The oldest queued item.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    raise QueueClosed
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError
+                self._cond.wait(remaining)
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Marks the end of the stream; consumers drain and then stop."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class VideoPipeline:
+    """
+    Runs decoding and inference on background threads.
+
+    Iterating the pipeline yields ``(frame_index, frame, result, detections,
+    inference_time)`` tuples in decode order. On frames between keyframes,
+    ``result`` is a ``PropagatedResult`` and the detections are the tracked
+    boxes propagated to that frame. With ``heartbeat`` set, None is yielded
+    whenever no frame has arrived for that long, so the caller can refresh
+    its status while a live source is down.
+
+    Args:
+        source (VideoFileSource | StreamFrameSource): Frame source to decode from.
+        model: YOLO object detection model.
+        confidence_threshold (float): Minimum confidence percentage for detections.
+        frame_rate (float): Source frame rate used for real-time pacing.
+        realtime (bool): Pace decoding to wall-clock time. When inference falls
+            behind, the decoder skips ahead to the current wall-clock frame with
+            the source's cheap forward skip and finished frames not yet displayed
+            are dropped oldest-first. When False every frame is processed and the
+            decoder is throttled by backpressure.
+        queue_size (int): Capacity of each inter-stage queue.
+        keyframe_interval (int): Run the detector on every Nth processed frame
+            and propagate tracked boxes on the frames in between.
+        scene_threshold (float, optional): Also run the detector when the mean
+            grayscale difference to the last keyframe exceeds this fraction.
+        tracker (BoxTracker, optional): Tracker assigning stable IDs. Created
+            automatically when keyframes are sparser than every frame.
+        heartbeat (float, optional): Seconds without a frame after which
+            iteration yields None.
+    """
+
+    def __init__(
+        self,
+        source,
+        model,
+        confidence_threshold,
+        frame_rate,
+        realtime=True,
+        queue_size=2,
+        keyframe_interval=1,
+        scene_threshold=None,
+        tracker=None,
+        heartbeat=None,
+    ):
+        self.source = source
+        self.model = model
+        self.confidence_threshold = confidence_threshold
+        self.frame_rate = frame_rate or 30
+        self.realtime = realtime
+        self.keyframe_interval = keyframe_interval
+        self.scene = SceneChangeDetector() if scene_threshold is not None else None
+        self.scene_threshold = scene_threshold
+        if tracker is None and (keyframe_interval > 1 or scene_threshold is not None):
+            tracker = BoxTracker()
+        self.tracker = tracker
+        self.heartbeat = heartbeat
+        self.keyframes = 0
+        self.frames_inferred = 0
+        self.decoded = FrameQueue(1 if realtime else queue_size, BLOCK)
+        self.inferred = FrameQueue(queue_size, DROP_OLDEST if realtime else BLOCK)
+        self._stop = threading.Event()
+        self._errors = []
+        self._threads = [
+            threading.Thread(
+                target=self._guard, args=(self._decode, self.decoded), daemon=True
+            ),
+            threading.Thread(
+                target=self._guard, args=(self._infer, self.inferred), daemon=True
+            ),
+        ]
+
+    @property
+    def frames_dropped(self):
+        """Number of frames skipped by the decoder or dropped before display."""
+        return self.source.frames_skipped + self.decoded.dropped + self.inferred.dropped
+
+    def _guard(self, stage, output):
+        try:
+            stage()
+        except Exception as error:  # re-raised on the consumer thread
+            self._errors.append(error)
+            self._stop.set()
+        finally:
+            output.close()
+
+    def _decode(self):
+        start = time.monotonic()
+        while not self._stop.is_set():
+            if self.realtime:
+                elapsed = time.monotonic() - start
+                self.source.skip_to(int(elapsed * self.frame_rate))
+                delay = (
+                    start + self.source.position / self.frame_rate - time.monotonic()
+                )
+                if delay > 0:
+                    time.sleep(delay)
+            with instrumentation.timer("decode"):
+                ret, frame = self.source.read()
+            if not ret:
+                break
+            if frame is None:
+                continue  # a live source had no new frame yet
+            # Read after decoding: live sources jump to the newest frame.
+            index = self.source.position - 1
+            if not self.decoded.put((index, frame), self._stop):
+                break
+
+    def _is_keyframe(self, frame, since_keyframe):
+        scene_changed = (
+            self.scene is not None and self.scene.score(frame) > self.scene_threshold
+        )
+        return (
+            self.tracker is None
+            or since_keyframe is None
+            or since_keyframe >= self.keyframe_interval
+            or scene_changed
+        )
+
+    def _infer(self):
+        # Counted in inferred frames, not source indices: frames the decoder
+        # skipped must not bring the next keyframe forward.
+        since_keyframe, names = None, getattr(self.model, "names", {})
+        while not self._stop.is_set():
+            try:
+                index, frame = self.decoded.get(timeout=0.1)
+            except TimeoutError:
+                continue
+            except QueueClosed:
+                break
+            inference_start = time.perf_counter()
+            if self._is_keyframe(frame, since_keyframe):
+                result = self.model(frame, conf=INFERENCE_CONFIDENCE, verbose=False)[0]
+                instrumentation.record_speed(result)
+                with instrumentation.timer("extract"):
+                    detections = extract_detections(result, self.confidence_threshold)
+                if self.tracker is not None:
+                    detections = self.tracker.update(detections, index, frame.shape)
+                if self.scene is not None:
+                    self.scene.mark_keyframe()
+                since_keyframe, names = 0, result.names
+                self.keyframes += 1
+            else:
+                with instrumentation.timer("track"):
+                    detections = self.tracker.predict(index, frame.shape)
+                result = PropagatedResult(frame, names)
+            if since_keyframe is not None:
+                since_keyframe += 1
+            self.frames_inferred += 1
+            inference_time = time.perf_counter() - inference_start
+            if not self.inferred.put(
+                (index, frame, result, detections, inference_time), self._stop
+            ):
+                break
+
+    def __iter__(self):
+        for thread in self._threads:
+            thread.start()
+        last_item = time.monotonic()
+        try:
+            while True:
+                try:
+                    yield self.inferred.get(timeout=0.1)
+                    last_item = time.monotonic()
+                except TimeoutError:
+                    if self._errors:
+                        break
+                    if (
+                        self.heartbeat
+                        and time.monotonic() - last_item >= self.heartbeat
+                    ):
+                        last_item = time.monotonic()
+                        yield None
+                except QueueClosed:
+                    break
+        finally:
+            self.stop()
+        if self._errors:
+            raise self._errors[0]
+
+    def stop(self):
+        """Stops the background stages and waits for them to exit."""
+        self._stop.set()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
@@ -0,0 +1,59 @@
+"""
+Background warm-up of the detect page while the user logs in.
+
+The first visit to the detect page pays for importing torch, ultralytics
+and OpenCV and for loading and warming up the model. ``start_preload`` does
+all of that on a daemon thread as soon as the login page is shown, so the
+registry already holds the model when the user opens the page. This module
+imports nothing heavy itself, so calling it does not slow the login page.
+
+Enabled with ``DETECT_PRELOAD=1``; the desktop launcher sets it.
+"""
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_lock = threading.Lock()
+
+
+def enabled():
+    """
+    Returns whether preloading is requested through ``DETECT_PRELOAD``.
+
+    Nothing is preloaded when a shared inference server holds the model.
+    """
+    return os.environ.get("DETECT_PRELOAD", "0") == "1" and not os.environ.get(
+        "DETECT_INFERENCE_SERVER"
+    )
+
+
+def _preload():
+    try:
+        from .app import WEIGHTS_PATH
+        from .model_loader import load_yolo_model
+
+        load_yolo_model(WEIGHTS_PATH)
+    except Exception:
+        # The registry keeps no failed entry, so the detect page retries the
+        # load and shows the error to the user.
+        logger.exception("Preloading the detection model failed")
+
+
+def start_preload():
+    """
+    Starts loading the detection model on a background thread, once per process.
+
+    Returns:
+        bool: True if this call started the preload.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_preload, name="model-preload", daemon=True).start()
+    return True
@@ -0,0 +1,141 @@
+"""
+Rate-limited, compressed delivery of annotated frames to the browser.
+
+The detection loop hands every annotated frame to a ``FramePresenter`` and
+returns immediately. A presenter thread keeps only the latest frame,
+downsizes it to the display width, encodes it as JPEG and pushes it to the
+Streamlit placeholder at most ``max_fps`` times per second. Frames that
+arrive in between replace the pending one and are never encoded.
+"""
+
+import threading
+import time
+
+import cv2
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from . import instrumentation
+
+DEFAULT_DISPLAY_WIDTH = 960
+DEFAULT_JPEG_QUALITY = 80
+DEFAULT_UI_FPS = 15
+
+
+def encode_preview(
+    frame, display_width=DEFAULT_DISPLAY_WIDTH, quality=DEFAULT_JPEG_QUALITY
+):
+    """
+    Downsizes a BGR frame to ``display_width`` and encodes it as JPEG.
+
+    Args:
+        frame (np.ndarray): BGR frame.
+        display_width (int): Maximum width in pixels; smaller frames keep their size.
+        quality (int): JPEG quality from 1 to 100.
+
+    Returns:
+        bytes: JPEG data with correct colors for the browser.
+    """
+    height, width = frame.shape[:2]
+    if width > display_width:
+        frame = cv2.resize(
+            frame,
+            (display_width, round(height * display_width / width)),
+            interpolation=cv2.INTER_AREA,
+        )
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+class FramePresenter:
+    """
+    Pushes the latest frame to a Streamlit placeholder from its own thread.
+
+    Args:
+        placeholder: Streamlit placeholder receiving the preview images.
+        display_width (int): Maximum preview width in pixels.
+        quality (int): JPEG quality from 1 to 100.
+        max_fps (float): Maximum number of previews sent per second.
+    """
+
+    def __init__(
+        self,
+        placeholder,
+        display_width=DEFAULT_DISPLAY_WIDTH,
+        quality=DEFAULT_JPEG_QUALITY,
+        max_fps=DEFAULT_UI_FPS,
+    ):
+        self.placeholder = placeholder
+        self.display_width = display_width
+        self.quality = quality
+        self.interval = 1 / max_fps
+        self.frames_sent = 0
+        self.frames_replaced = 0
+        self.bytes_sent = 0
+        self._frame = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._started_at = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        # Lets the thread update elements of the current script run.
+        add_script_run_ctx(self._thread, get_script_run_ctx(suppress_warning=True))
+
+    def start(self):
+        """Starts the presenter thread."""
+        self._started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def show(self, frame):
+        """
+        Offers a frame for display without blocking.
+
+        The presenter keeps a reference, so the caller must not draw on the
+        frame afterwards.
+
+        Args:
+            frame (np.ndarray): Annotated BGR frame.
+        """
+        with self._cond:
+            if self._frame is not None:
+                self.frames_replaced += 1
+            self._frame = frame
+            self._cond.notify()
+
+    def _run(self):
+        next_push = 0.0
+        while True:
+            with self._cond:
+                while self._frame is None and not self._closed:
+                    self._cond.wait()
+                if self._frame is None:
+                    return
+            delay = next_push - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._cond:
+                frame, self._frame = self._frame, None
+            start = time.perf_counter()
+            data = encode_preview(frame, self.display_width, self.quality)
+            self.placeholder.image(data, output_format="JPEG")
+            instrumentation.record("ui_push", time.perf_counter() - start)
+            self.frames_sent += 1
+            self.bytes_sent += len(data)
+            next_push = time.monotonic() + self.interval
+
+    @property
+    def fps(self):
+        """Average number of previews sent per second since the start."""
+        if self._started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        return self.frames_sent / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        """Sends the last pending frame and stops the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join()
@@ -0,0 +1,139 @@
+"""
+Process-wide cache of raw detections per image.
+
+Inference runs once per image at ``FLOOR_CONFIDENCE`` and the unfiltered
+boxes are cached under the image content hash, the model version and the
+inference mode. Changing the confidence threshold then only filters the
+cached arrays in memory. Entries are shared across Streamlit sessions and
+evicted least recently used once the cache exceeds its entry or byte limit.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .image_processing import ArrayResult, _to_numpy
+from .model_loader import INFERENCE_CONFIDENCE
+
+FLOOR_CONFIDENCE = INFERENCE_CONFIDENCE * 100
+MAX_CACHE_ENTRIES = 256
+MAX_CACHE_BYTES = 64 * 1024**2
+
+
+def model_version(model):
+    """
+    Identifies the weights a model was loaded from.
+
+    Args:
+        model (YOLO): Loaded model.
+
+    Returns:
+        str: Weights path with its mtime and size, so replacing the weights
+            invalidates cached results.
+    """
+    path = getattr(model, "ckpt_path", None) or getattr(model, "model_name", None)
+    if path and os.path.exists(path):
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return f"{type(model).__name__}:{id(model)}"
+
+
+class DetectionCache:
+    """
+    LRU cache of unfiltered detection arrays bounded by count and memory.
+
+    Args:
+        max_entries (int): Maximum number of cached images.
+        max_bytes (int): Maximum total size of the cached arrays in bytes.
+    """
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES, max_bytes=MAX_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached ``(xyxy, conf, cls, names)`` tuple or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """Stores an ``(xyxy, conf, cls, names)`` tuple and evicts old entries."""
+        size = sum(array.nbytes for array in entry[:3])
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= sum(array.nbytes for array in self._entries[key][:3])
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._bytes += size
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(array.nbytes for array in evicted[:3])
+
+    def stats(self):
+        """Returns entry count, memory, hits and misses."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+detection_cache = DetectionCache()
+
+
+def cached_predict(model, image_bytes, frame, predict, variant=()):
+    """
+    Returns all detections above ``FLOOR_CONFIDENCE`` for an image, inferring once.
+
+    Args:
+        model (YOLO): Loaded model, used for the cache key.
+        image_bytes (bytes): Encoded image, hashed for the cache key.
+        frame (np.ndarray): Decoded BGR image the result refers to.
+        predict (callable): Called with ``(frame, floor_confidence_percent)`` on
+            a cache miss; returns a YOLO-like result.
+        variant (tuple): Inference settings that change the boxes, such as
+            tiling parameters.
+
+    Returns:
+        ArrayResult: Unfiltered detections; filter them with ``extract_detections``.
+    """
+    key = (hashlib.sha256(image_bytes).hexdigest(), model_version(model), variant)
+    entry = detection_cache.get(key)
+    speed = {}
+    if entry is None:
+        result = predict(frame, FLOOR_CONFIDENCE)
+        boxes = result.boxes
+        entry = (
+            _to_numpy(boxes.xyxy).reshape(-1, 4).astype(np.float32),
+            _to_numpy(boxes.conf).reshape(-1).astype(np.float32),
+            _to_numpy(boxes.cls).reshape(-1).astype(np.float32),
+            dict(result.names),
+        )
+        detection_cache.put(key, entry)
+        speed = dict(getattr(result, "speed", None) or {})
+    xyxy, conf, cls, names = entry
+    return ArrayResult(xyxy, conf, cls, names, frame, speed)
@@ -0,0 +1,157 @@
+"""
+Managed on-disk spool for uploaded videos.
+
+Uploads are streamed to disk in chunks and named by content hash, so
+uploading the same clip again reuses the spooled file. The spool directory
+is kept under a size cap by evicting least recently used files that are not
+currently in use.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "steel_defect_spool")
+MAX_SPOOL_BYTES = 4 * 1024**3
+CHUNK_SIZE = 8 * 1024**2
+
+_leases = Counter()
+_lock = threading.Lock()
+
+
+def _chunks(uploaded_file):
+    uploaded_file.seek(0)
+    while chunk := uploaded_file.read(CHUNK_SIZE):
+        yield chunk
+
+
+def hash_upload(uploaded_file):
+    """
+    Computes the SHA-256 of an uploaded file without loading it whole.
+
+    Args:
+        uploaded_file: File-like object such as a Streamlit ``UploadedFile``.
+
+    Returns:
+        str: Hex digest of the content.
+    """
+    digest = hashlib.sha256()
+    for chunk in _chunks(uploaded_file):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _spool_path(uploaded_file, spool_dir):
+    suffix = os.path.splitext(getattr(uploaded_file, "name", ""))[1] or ".mp4"
+    return os.path.join(spool_dir, hash_upload(uploaded_file) + suffix.lower())
+
+
+def _write_spool(uploaded_file, path):
+    if os.path.exists(path):
+        os.utime(path)
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as partial_file:
+            for chunk in _chunks(uploaded_file):
+                partial_file.write(chunk)
+        os.replace(partial_path, path)
+    except BaseException:
+        os.remove(partial_path)
+        raise
+
+
+def spool_upload(uploaded_file, spool_dir=SPOOL_DIR):
+    """
+    Streams an uploaded file into the spool and returns its path.
+
+    If a file with the same content is already spooled it is reused and its
+    access time refreshed instead of being rewritten.
+
+    Args:
+        uploaded_file: File-like object such as a Streamlit ``UploadedFile``.
+        spool_dir (str): Spool directory.
+
+    Returns:
+        str: Path of the spooled file.
+    """
+    path = _spool_path(uploaded_file, spool_dir)
+    _write_spool(uploaded_file, path)
+    return path
+
+
+def cleanup_spool(spool_dir=SPOOL_DIR, max_bytes=MAX_SPOOL_BYTES):
+    """
+    Evicts least recently used spooled files until the spool fits ``max_bytes``.
+
+    Files currently leased through ``spooled_video`` are never removed.
+
+    Args:
+        spool_dir (str): Spool directory.
+        max_bytes (int): Maximum total size of the spool in bytes.
+
+    Returns:
+        int: Number of files removed.
+    """
+    if not os.path.isdir(spool_dir):
+        return 0
+
+    entries = []
+    for entry in os.scandir(spool_dir):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+
+    removed = 0
+    with _lock:
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if _leases[path] or path.endswith(".part"):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+    return removed
+
+
+@contextmanager
+def spooled_video(uploaded_file, retain=True, spool_dir=SPOOL_DIR):
+    """
+    Spools an upload for the duration of a ``with`` block.
+
+    The file is protected from eviction while the block runs. On exit the
+    spool is trimmed to its size cap, or the file is removed right away when
+    ``retain`` is False and no other session is using it.
+
+    Args:
+        uploaded_file: File-like object such as a Streamlit ``UploadedFile``.
+        retain (bool): Keep the file for reuse by later uploads of the same clip.
+        spool_dir (str): Spool directory.
+
+    Yields:
+        str: Path of the spooled file.
+    """
+    path = _spool_path(uploaded_file, spool_dir)
+    with _lock:
+        _leases[path] += 1
+    try:
+        _write_spool(uploaded_file, path)
+        yield path
+    finally:
+        with _lock:
+            _leases[path] -= 1
+            if not _leases[path]:
+                del _leases[path]
+                if not retain and os.path.exists(path):
+                    os.remove(path)
+        cleanup_spool(spool_dir)
@@ -0,0 +1,411 @@
+"""
+Continuous ingestion from cameras and network streams.
+
+An ingest thread reads frames from a live source into a fixed-size ring
+buffer and never waits for the consumer. The detection pipeline always takes
+the newest frame, so a slow model drops frames instead of falling behind,
+and memory stays bounded by the ring capacity however long the stream runs.
+When the source fails, the ingest thread reconnects with exponential backoff.
+
+Supported sources:
+
+    rtsp://host/stream, http://...   network stream through FFmpeg
+    /dev/video0 or 0                 V4L2 camera
+    gst:<pipeline> or "a ! b ! ..."  GStreamer pipeline ending in appsink
+    path/to/clip.mp4, path/to/dir/   replayed in a loop at a fixed frame rate
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from .backends import image_files
+
+DEFAULT_RING_SIZE = 4
+DEFAULT_REPLAY_FPS = 25
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+# A thread blocked in a stalled capture read is abandoned after this long;
+# it is a daemon and exits once the read returns.
+STOP_TIMEOUT = 2.0
+
+
+class LiveCapture:
+    """
+    Opens a camera or network stream with ``cv2.VideoCapture``.
+
+    Args:
+        url (str): Stream URL, device path or index, or GStreamer pipeline.
+
+    Raises:
+        ConnectionError: If the stream cannot be opened.
+    """
+
+    def __init__(self, url):
+        target, api = _capture_target(url)
+        self.capture = cv2.VideoCapture(target, api)
+        if not self.capture.isOpened():
+            raise ConnectionError(f"Unable to open stream: {url}")
+        # Keep the driver from queueing stale frames ahead of the ring.
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    @property
+    def frame_rate(self):
+        """Frame rate reported by the stream, or 0 when unknown."""
+        return self.capture.get(cv2.CAP_PROP_FPS)
+
+    def read(self):
+        """Blocks until the next frame arrives; returns ``(ret, frame)``."""
+        return self.capture.read()
+
+    def release(self):
+        """Closes the stream."""
+        self.capture.release()
+
+
+class ReplaySource:
+    """
+    Replays a video file or an image directory in a loop as a fake camera.
+
+    Frames are emitted at a fixed rate, so the ingest path behaves as it
+    would on the line.
+
+    Args:
+        path (str): Video file or directory of images.
+        fps (float, optional): Emission rate; defaults to the video frame rate
+            or ``DEFAULT_REPLAY_FPS`` for images.
+        loop (bool): Restart at the end instead of reporting end of stream.
+
+    Raises:
+        ConnectionError: If the file cannot be opened or the directory is empty.
+    """
+
+    def __init__(self, path, fps=None, loop=True):
+        self.loop = loop
+        self.capture, self.images, self._position = None, None, 0
+        if os.path.isdir(path):
+            self.images = image_files(path)
+            if not self.images:
+                raise ConnectionError(f"No images to replay in {path}")
+            native_fps = 0
+        else:
+            self.capture = cv2.VideoCapture(path)
+            if not self.capture.isOpened():
+                raise ConnectionError(f"Unable to open video file: {path}")
+            native_fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.frame_rate = fps or native_fps or DEFAULT_REPLAY_FPS
+        self._next_frame = time.monotonic()
+
+    def _read_frame(self):
+        if self.images is not None:
+            if self._position >= len(self.images):
+                if not self.loop:
+                    return False, None
+                self._position = 0
+            frame = cv2.imread(self.images[self._position])
+            self._position += 1
+            return frame is not None, frame
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return ret, frame
+
+    def read(self):
+        """Waits for the next frame slot and returns ``(ret, frame)``."""
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # A late reader does not get a burst of catch-up frames.
+        self._next_frame = max(self._next_frame, time.monotonic()) + 1 / self.frame_rate
+        return self._read_frame()
+
+    def release(self):
+        """Closes the video file."""
+        if self.capture is not None:
+            self.capture.release()
+
+
+def _capture_target(url):
+    if url.startswith("gst:"):
+        return url[len("gst:") :], cv2.CAP_GSTREAMER
+    if " ! " in url:
+        return url, cv2.CAP_GSTREAMER
+    if url.isdigit():
+        return int(url), cv2.CAP_V4L2
+    if url.startswith("/dev/video"):
+        return url, cv2.CAP_V4L2
+    return url, cv2.CAP_FFMPEG
+
+
+def open_stream(url, fps=None):
+    """
+    Opens a live source or, for local files and directories, a replay.
+
+    Args:
+        url (str): Stream URL, device, GStreamer pipeline, file or directory.
+        fps (float, optional): Replay rate for local files and directories.
+
+    Returns:
+        LiveCapture | ReplaySource: Source with ``read`` and ``release``.
+    """
+    if os.path.exists(url) and not url.startswith("/dev/"):
+        return ReplaySource(url, fps)
+    return LiveCapture(url)
+
+
+class FrameRing:
+    """
+    Fixed-size ring of the most recent frames.
+
+    The writer never blocks: each frame overwrites the oldest slot. Readers
+    ask for the newest frame after the one they last took, so frames they
+    were too slow for are skipped.
+
+    Args:
+        capacity (int): Number of frames kept.
+    """
+
+    def __init__(self, capacity=DEFAULT_RING_SIZE):
+        self.capacity = capacity
+        self.written = 0
+        self._slots = [None] * capacity
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, frame, timestamp):
+        """
+        Stores a frame, overwriting the oldest one.
+
+        Args:
+            frame (np.ndarray): Decoded frame.
+            timestamp (float): ``time.monotonic()`` at capture.
+
+        Returns:
+            int: Sequence number of the frame.
+        """
+        with self._cond:
+            sequence = self.written
+            self._slots[sequence % self.capacity] = (sequence, timestamp, frame)
+            self.written += 1
+            self._cond.notify_all()
+            return sequence
+
+    def latest(self, after=-1, timeout=None):
+        """
+        Returns the newest frame with a sequence number above ``after``.
+
+        Args:
+            after (int): Sequence number of the last frame taken.
+            timeout (float, optional): Seconds to wait before raising ``TimeoutError``.
+
+        Returns:
+            tuple: ``(sequence, timestamp, frame)``, or None once closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.written - 1 <= after:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError
+                self._cond.wait(remaining)
+            return self._slots[(self.written - 1) % self.capacity]
+
+    def close(self):
+        """Wakes waiting readers; ``latest`` returns None once drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StreamIngestor:
+    """
+    Reads a source into a ``FrameRing`` on a background thread, reconnecting on failure.
+
+    Args:
+        opener (callable): Returns a new opened source; called on every
+            (re)connect and may raise ``ConnectionError``.
+        capacity (int): Ring buffer size in frames.
+        backoff_initial (float): First reconnect delay in seconds.
+        backoff_max (float): Upper bound of the reconnect delay.
+        max_reconnects (int, optional): Give up after this many consecutive
+            failed attempts; retries forever when None.
+    """
+
+    def __init__(
+        self,
+        opener,
+        capacity=DEFAULT_RING_SIZE,
+        backoff_initial=BACKOFF_INITIAL,
+        backoff_max=BACKOFF_MAX,
+        max_reconnects=None,
+    ):
+        self.opener = opener
+        self.ring = FrameRing(capacity)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.max_reconnects = max_reconnects
+        self.frame_rate = 0.0
+        self.connected = False
+        self.reconnects = 0
+        self.last_error = None
+        self._arrivals = deque(maxlen=64)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Starts the ingest thread."""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        delay, failures = self.backoff_initial, 0
+        try:
+            while not self._stop.is_set():
+                source = None
+                try:
+                    source = self.opener()
+                    self.frame_rate = source.frame_rate or self.frame_rate
+                    self.connected = True
+                    while not self._stop.is_set():
+                        ret, frame = source.read()
+                        if not ret:
+                            raise ConnectionError("Stream ended")
+                        now = time.monotonic()
+                        self.ring.put(frame, now)
+                        self._arrivals.append(now)
+                        delay, failures = self.backoff_initial, 0
+                except (ConnectionError, OSError, cv2.error) as error:
+                    self.last_error = str(error)
+                finally:
+                    self.connected = False
+                    if source is not None:
+                        source.release()
+                if self._stop.is_set():
+                    break
+                failures += 1
+                if self.max_reconnects is not None and failures > self.max_reconnects:
+                    break
+                self.reconnects += 1
+                # Jitter keeps several cameras from reconnecting in lockstep.
+                self._stop.wait(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, self.backoff_max)
+        finally:
+            self.ring.close()
+
+    @property
+    def ingest_fps(self):
+        """Frames received per second over the last few dozen frames."""
+        arrivals = list(self._arrivals)
+        if len(arrivals) < 2 or arrivals[-1] == arrivals[0]:
+            return 0.0
+        return (len(arrivals) - 1) / (arrivals[-1] - arrivals[0])
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stops ingesting and waits for the thread to exit.
+
+        Args:
+            timeout (float): Seconds to wait for a thread blocked in a read.
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.ring.close()
+
+
+class StreamFrameSource:
+    """
+    Adapts a running ``StreamIngestor`` to the frame-source interface of ``VideoPipeline``.
+
+    ``read`` returns the newest ingested frame, and ``position`` follows the
+    ingest sequence numbers, so frame indices (and tracker velocities) stay
+    correct across skipped frames.
+
+    Args:
+        ingestor (StreamIngestor): Started ingestor.
+        timeout (float): Seconds ``read`` waits for a frame before returning
+            without one.
+    """
+
+    def __init__(self, ingestor, timeout=0.5):
+        self.ingestor = ingestor
+        self.timeout = timeout
+        self.position = 0
+        self.frames_read = 0
+        self.frames_skipped = 0
+        self._timestamps = deque(maxlen=32)
+
+    @property
+    def frame_rate(self):
+        """Frame rate reported by the stream, or the measured ingest rate."""
+        return self.ingestor.frame_rate or self.ingestor.ingest_fps
+
+    def read(self):
+        """
+        Waits up to ``timeout`` for a frame newer than the last one read.
+
+        Returns:
+            tuple: ``(ret, frame)``; ``ret`` is False once the ingestor stopped,
+                and ``frame`` is None when no frame arrived in time, so the
+                caller can check for a stop and report the stream status.
+        """
+        try:
+            item = self.ingestor.ring.latest(self.position - 1, self.timeout)
+        except TimeoutError:
+            return True, None
+        if item is None:
+            return False, None
+        sequence, timestamp, frame = item
+        self.frames_skipped += sequence - self.position
+        self.frames_read += 1
+        self.position = sequence + 1
+        self._timestamps.append((sequence, timestamp))
+        return True, frame
+
+    def skip_to(self, index):
+        """Live sources always read the newest frame, so skipping is implicit."""
+        return 0
+
+    def lag(self, index):
+        """
+        Returns the seconds since frame ``index`` was captured.
+
+        Args:
+            index (int): Sequence number of a recently read frame.
+
+        Returns:
+            float | None: None if the frame is no longer tracked.
+        """
+        for sequence, timestamp in reversed(self._timestamps):
+            if sequence == index:
+                return time.monotonic() - timestamp
+        return None
+
+    def stats(self):
+        """
+        Returns ingest counters.
+
+        Returns:
+            dict: Frames ingested and read, frames dropped, ingest FPS,
+                reconnects, connection state and last error.
+        """
+        return {
+            "frames_ingested": self.ingestor.ring.written,
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_skipped,
+            "ingest_fps": self.ingestor.ingest_fps,
+            "reconnects": self.ingestor.reconnects,
+            "connected": self.ingestor.connected,
+            "last_error": self.ingestor.last_error,
+        }
+
+    def release(self):
+        """Stops the ingestor."""
+        self.ingestor.stop()
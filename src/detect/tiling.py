@@ -0,0 +1,220 @@
+"""
+Sliced inference for images much larger than the model input.
+
+The image is cut into overlapping tiles, tiles are run through the model in
+small batches on a pool of worker threads, box coordinates are shifted back
+into the full image and duplicates across tile borders are merged with a
+class-wise NMS. The merged output is an ``ArrayResult``, so it feeds
+``extract_detections`` and ``annotate_image`` unchanged.
+"""
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .image_processing import ArrayResult, _to_numpy
+
+DEFAULT_TILE_SIZE = 640
+DEFAULT_OVERLAP = 0.2
+DEFAULT_TILE_BATCH = 4
+# Intersection over the smaller box: a box cut by a tile border lies mostly
+# inside the full box found by the neighbouring tile, although their IoU is low.
+DEFAULT_MERGE_THRESHOLD = 0.6
+
+
+def tile_grid(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """
+    Computes overlapping tile windows covering an image.
+
+    The last tile in each row and column is aligned to the image edge, so
+    every tile has the full tile size unless the image is smaller.
+
+    Args:
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        tile_size (int): Tile side length in pixels.
+        overlap (float): Fraction of the tile shared with its neighbour.
+
+    Returns:
+        list[tuple[int, int, int, int]]: ``(x0, y0, x1, y1)`` windows.
+    """
+    stride = max(int(tile_size * (1 - overlap)), 1)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        return positions + [length - tile_size]
+
+    return [
+        (x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+        for y0 in starts(height)
+        for x0 in starts(width)
+    ]
+
+
+def merge_boxes(xyxy, conf, cls, threshold=DEFAULT_MERGE_THRESHOLD):
+    """
+    Class-wise greedy NMS using intersection over the smaller box.
+
+    Each kept box is grown to the union of the duplicates it absorbs, so a
+    box truncated by a tile border cannot win over the full box.
+
+    Args:
+        xyxy (np.ndarray): Boxes of shape ``(n, 4)``.
+        conf (np.ndarray): Scores of shape ``(n,)``.
+        cls (np.ndarray): Class IDs of shape ``(n,)``.
+        threshold (float): Overlap above which the lower-scoring box is merged.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Merged boxes, scores and
+            class IDs, highest score first.
+    """
+    order = np.argsort(-conf, kind="stable")
+    areas = np.prod(np.clip(xyxy[:, 2:] - xyxy[:, :2], 0, None), axis=1)
+    merged, keep = [], []
+    while len(order):
+        best, rest = order[0], order[1:]
+        top_left = np.maximum(xyxy[best, :2], xyxy[rest, :2])
+        bottom_right = np.minimum(xyxy[best, 2:], xyxy[rest, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        smaller = np.maximum(np.minimum(areas[best], areas[rest]), 1e-9)
+        duplicate = (intersection / smaller > threshold) & (cls[rest] == cls[best])
+        group = xyxy[np.append(best, rest[duplicate])]
+        merged.append(
+            np.concatenate([group[:, :2].min(axis=0), group[:, 2:].max(axis=0)])
+        )
+        keep.append(best)
+        order = rest[~duplicate]
+    if not keep:
+        return xyxy[:0], conf[:0], cls[:0]
+    return np.array(merged, np.float32), conf[keep], cls[keep]
+
+
+class TiledPredictor:
+    """
+    Runs a YOLO model over overlapping tiles of large images.
+
+    Ultralytics serializes calls on one model instance, so each worker thread
+    takes its own instance from ``models``. At most one batch per worker is
+    in flight, which bounds memory to ``workers * batch_size`` preprocessed
+    tiles regardless of the image size; tiles themselves are views of the
+    image, not copies.
+
+    Args:
+        models (list[YOLO]): Instances of the same model, one per worker.
+    """
+
+    def __init__(self, models):
+        self.names = models[0].names
+        self.workers = len(models)
+        self._models = queue.Queue()
+        for model in models:
+            self._models.put(model)
+
+    def _run_batch(self, image, windows, conf):
+        model = self._models.get()
+        try:
+            tiles = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+            results = model(tiles, conf=conf, verbose=False)
+        finally:
+            self._models.put(model)
+
+        boxes, scores, classes = [], [], []
+        for (x0, y0, _, _), result in zip(windows, results):
+            xyxy = _to_numpy(result.boxes.xyxy).reshape(-1, 4).astype(np.float32)
+            boxes.append(xyxy + np.array([x0, y0, x0, y0], np.float32))
+            scores.append(_to_numpy(result.boxes.conf).reshape(-1))
+            classes.append(_to_numpy(result.boxes.cls).reshape(-1))
+        return boxes, scores, classes
+
+    def predict(
+        self,
+        image,
+        confidence_threshold,
+        tile_size=DEFAULT_TILE_SIZE,
+        overlap=DEFAULT_OVERLAP,
+        batch_size=DEFAULT_TILE_BATCH,
+        merge_threshold=DEFAULT_MERGE_THRESHOLD,
+        full_image=True,
+    ):
+        """
+        Detects objects tile by tile and merges the boxes.
+
+        Args:
+            image (np.ndarray): BGR image.
+            confidence_threshold (float): Minimum confidence percentage.
+            tile_size (int): Tile side length in pixels.
+            overlap (float): Fraction of each tile shared with its neighbour.
+            batch_size (int): Tiles per model call.
+            merge_threshold (float): Overlap above which cross-tile duplicates merge.
+            full_image (bool): Also run the whole, downscaled image so defects
+                larger than a tile are still found.
+
+        Returns:
+            ArrayResult: Merged detections in full-image coordinates.
+        """
+        start = time.perf_counter()
+        height, width = image.shape[:2]
+        windows = tile_grid(width, height, tile_size, overlap)
+        if full_image and len(windows) > 1:
+            windows.append((0, 0, width, height))
+        batches = [
+            windows[i : i + batch_size] for i in range(0, len(windows), batch_size)
+        ]
+
+        boxes, scores, classes = [], [], []
+        pending = []
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="tile") as pool:
+            for batch in batches:
+                if len(pending) >= self.workers:
+                    for collected, part in zip(
+                        (boxes, scores, classes), pending.pop(0).result()
+                    ):
+                        collected.extend(part)
+                pending.append(
+                    pool.submit(
+                        self._run_batch, image, batch, confidence_threshold / 100
+                    )
+                )
+            for future in pending:
+                for collected, part in zip((boxes, scores, classes), future.result()):
+                    collected.extend(part)
+        inference = time.perf_counter() - start
+
+        xyxy = np.concatenate(boxes) if boxes else np.empty((0, 4), np.float32)
+        conf = np.concatenate(scores).astype(np.float32) if scores else np.empty(0)
+        cls = np.concatenate(classes).astype(np.float32) if classes else np.empty(0)
+        xyxy, conf, cls = merge_boxes(xyxy, conf, cls, merge_threshold)
+        speed = {
+            "preprocess": 0.0,
+            "inference": inference * 1000,
+            "postprocess": (time.perf_counter() - start - inference) * 1000,
+        }
+        return ArrayResult(xyxy, conf, cls, self.names, image, speed)
+
+
+def get_tiled_predictor(model, workers=1):
+    """
+    Returns a shared tiled predictor for ``model`` and worker count.
+
+    Worker instances are loaded through the model registry and the
+    predictor is stored with the model's entry, so both count toward the
+    registry's memory cap and are unloaded when the model is evicted.
+
+    Args:
+        model (YOLO): Loaded model.
+        workers (int): Number of worker threads.
+
+    Returns:
+        TiledPredictor: Shared predictor.
+    """
+    from .model_loader import registry
+
+    return registry.derived(
+        model,
+        ("tiled", workers),
+        lambda: TiledPredictor(registry.replicas(model, workers)),
+    )
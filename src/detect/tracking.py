@@ -0,0 +1,280 @@
+"""
+Keyframe scheduling and box propagation between detector runs.
+
+The detector runs only on keyframes; in between, each tracked defect's box
+is extrapolated with a constant-velocity alpha-beta filter (a steady-state
+Kalman filter), which suits a strip moving at constant speed. Keyframe
+detections are matched to tracks by IoU, so a defect keeps one ID for as
+long as it stays in view.
+"""
+
+import cv2
+import numpy as np
+
+from .image_processing import DETECTION_DTYPE, PIXELS_PER_CM
+
+SCENE_SAMPLE_SIZE = (64, 36)
+
+
+class PropagatedResult:
+    """
+    Stand-in for a YOLO result on frames where the detector did not run.
+
+    Exposes the attributes the display path reads: ``orig_img``, ``names``
+    and ``speed``.
+    """
+
+    __slots__ = ("orig_img", "names", "speed")
+
+    def __init__(self, frame, names):
+        self.orig_img = frame
+        self.names = names
+        self.speed = {}
+
+
+class SceneChangeDetector:
+    """
+    Scores how much a frame differs from the previous keyframe.
+
+    Frames are compared as small grayscale thumbnails, so scoring costs a
+    single downscale per frame.
+
+    Args:
+        sample_size (tuple[int, int]): Thumbnail size as ``(width, height)``.
+    """
+
+    def __init__(self, sample_size=SCENE_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._reference = None
+        self._sample = None
+
+    def score(self, frame):
+        """
+        Returns the mean absolute difference to the reference, from 0 to 1.
+
+        Args:
+            frame (np.ndarray): BGR frame.
+
+        Returns:
+            float: 1.0 when there is no reference yet.
+        """
+        small = cv2.resize(frame, self.sample_size, interpolation=cv2.INTER_AREA)
+        self._sample = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self._reference is None:
+            return 1.0
+        return float(cv2.absdiff(self._sample, self._reference).mean()) / 255
+
+    def mark_keyframe(self):
+        """Uses the last scored frame as the new reference."""
+        self._reference = self._sample
+
+
+class _Track:
+    __slots__ = ("id", "class_id", "confidence", "box", "velocity", "index", "missed")
+
+    def __init__(self, track_id, class_id, confidence, box, index):
+        self.id = track_id
+        self.class_id = class_id
+        self.confidence = confidence
+        self.box = box
+        self.velocity = None
+        self.index = index
+        self.missed = 0
+
+    def predict(self, index):
+        if self.velocity is None:
+            return self.box
+        return self.box + self.velocity * (index - self.index)
+
+
+def box_iou(boxes_a, boxes_b):
+    """
+    Computes the IoU between every pair of ``x0, y0, x1, y1`` boxes.
+
+    Args:
+        boxes_a (np.ndarray): Array of shape ``(n, 4)``.
+        boxes_b (np.ndarray): Array of shape ``(m, 4)``.
+
+    Returns:
+        np.ndarray: IoU matrix of shape ``(n, m)``.
+    """
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    )
+
+
+class BoxTracker:
+    """
+    Assigns stable IDs to detections and propagates boxes between keyframes.
+
+    Args:
+        iou_threshold (float): Minimum IoU between a predicted track box and a
+            detection of the same class for them to match.
+        max_missed (int): Keyframes a track may go unmatched before it is dropped.
+        alpha (float): Weight of the measured position against the prediction.
+        beta (float): Weight of the measured velocity correction.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=2, alpha=0.7, beta=0.3):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.alpha = alpha
+        self.beta = beta
+        self.tracks = []
+        self.next_id = 1
+
+    @property
+    def unique_defects(self):
+        """Number of distinct defects seen since the tracker was created."""
+        return self.next_id - 1
+
+    def update(self, detections, index, frame_shape=None):
+        """
+        Matches keyframe detections to tracks and corrects their motion.
+
+        Args:
+            detections (np.ndarray): Array returned by ``extract_detections``.
+            index (int): Frame index of the keyframe.
+            frame_shape (tuple, optional): Frame shape used to drop tracks that
+                left the image.
+
+        Returns:
+            np.ndarray: The detections with ``id`` replaced by track IDs.
+        """
+        measured = np.column_stack(
+            [detections[field] for field in ("x0", "y0", "x1", "y1")]
+        ).astype(np.float32)
+        predicted = np.array(
+            [track.predict(index) for track in self.tracks], np.float32
+        ).reshape(-1, 4)
+
+        assigned = np.zeros(len(detections), np.int32)
+        matched_tracks = set()
+        if len(self.tracks) and len(detections):
+            iou = box_iou(predicted, measured)
+            cold = np.array([track.velocity is None for track in self.tracks])
+            if cold.any():
+                # Tracks seen once have no velocity yet, so a fast-moving defect
+                # may not overlap its last box; score those by center distance.
+                iou[cold] = np.maximum(
+                    iou[cold], _center_similarity(predicted[cold], measured)
+                )
+            same_class = (
+                np.array([track.class_id for track in self.tracks])[:, None]
+                == detections["class_id"][None, :]
+            )
+            iou[~same_class] = 0
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                track_index, detection_index = np.unravel_index(flat, iou.shape)
+                if iou[track_index, detection_index] < self.iou_threshold:
+                    break
+                if track_index in matched_tracks or assigned[detection_index]:
+                    continue
+                track = self.tracks[track_index]
+                self._correct(
+                    track, measured[detection_index], predicted[track_index], index
+                )
+                track.confidence = float(detections["confidence"][detection_index])
+                matched_tracks.add(track_index)
+                assigned[detection_index] = track.id
+
+        for track_index, track in enumerate(self.tracks):
+            if track_index not in matched_tracks:
+                track.missed += 1
+        velocities = [
+            track.velocity for track in self.tracks if track.velocity is not None
+        ]
+        # New defects on a moving strip move like the ones already tracked.
+        prior = np.median(velocities, axis=0) if velocities else None
+        for detection_index in np.flatnonzero(assigned == 0):
+            track = _Track(
+                self.next_id,
+                int(detections["class_id"][detection_index]),
+                float(detections["confidence"][detection_index]),
+                measured[detection_index],
+                index,
+            )
+            track.velocity = prior
+            self.tracks.append(track)
+            assigned[detection_index] = track.id
+            self.next_id += 1
+
+        self.tracks = [
+            track
+            for track in self.tracks
+            if track.missed <= self.max_missed
+            and not _outside(track.predict(index), frame_shape)
+        ]
+        tracked = detections.copy()
+        tracked["id"] = assigned
+        return tracked
+
+    def _correct(self, track, measurement, prediction, index):
+        elapsed = max(index - track.index, 1)
+        if track.velocity is None:
+            track.velocity = (measurement - track.box) / elapsed
+            track.box = measurement
+        else:
+            residual = measurement - prediction
+            track.box = prediction + self.alpha * residual
+            track.velocity = track.velocity + self.beta * residual / elapsed
+        track.index = index
+        track.missed = 0
+
+    def predict(self, index, frame_shape=None):
+        """
+        Returns the propagated boxes of the tracks seen on the last keyframe.
+
+        Args:
+            index (int): Frame index to propagate to.
+            frame_shape (tuple, optional): Frame shape used to hide boxes that
+                left the image.
+
+        Returns:
+            np.ndarray: Structured array with ``DETECTION_DTYPE`` fields.
+        """
+        visible = []
+        for track in self.tracks:
+            if track.missed:
+                continue
+            box = track.predict(index)
+            if not _outside(box, frame_shape):
+                visible.append((track, box))
+
+        detections = np.empty(len(visible), dtype=DETECTION_DTYPE)
+        for row, (track, box) in enumerate(visible):
+            x0, y0, x1, y1 = box.astype(np.int32).tolist()
+            detections[row] = (
+                track.id,
+                track.class_id,
+                track.confidence,
+                x0,
+                y0,
+                x1,
+                y1,
+                (box[2] - box[0]) / PIXELS_PER_CM,
+                (box[3] - box[1]) / PIXELS_PER_CM,
+            )
+        return detections
+
+
+def _center_similarity(boxes_a, boxes_b):
+    """Returns ``1 - center distance / diagonal of the box in boxes_a``, floored at 0."""
+    centers_a = (boxes_a[:, :2] + boxes_a[:, 2:]) / 2
+    centers_b = (boxes_b[:, :2] + boxes_b[:, 2:]) / 2
+    distance = np.linalg.norm(centers_a[:, None] - centers_b[None], axis=2)
+    diagonal = np.linalg.norm(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    return np.clip(1 - distance / np.maximum(diagonal, 1)[:, None], 0, None)
+
+
+def _outside(box, frame_shape):
+    if frame_shape is None:
+        return False
+    height, width = frame_shape[:2]
+    return box[2] <= 0 or box[3] <= 0 or box[0] >= width or box[1] >= height
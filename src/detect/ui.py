@@ -2,11 +2,36 @@
 UI functions for image and video detection.
 """
 
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import cv2
+import numpy as np
 import streamlit as st
 from PIL import Image
 
-from .image_processing import annotate_image, extract_image_data
-from .video_processing import process_video
+from . import instrumentation
+from .defect_writer import detection_rows, get_writer
+from .image_processing import (
+    annotate_image,
+    detections_to_frame,
+    extract_detections,
+    format_detections,
+)
+from .offline_processing import DEFAULT_BATCH_SIZE, process_video_offline
+from .presenter import DEFAULT_DISPLAY_WIDTH, DEFAULT_JPEG_QUALITY, DEFAULT_UI_FPS
+from .result_cache import cached_predict, detection_cache
+from .spool import spooled_video
+from .tiling import DEFAULT_OVERLAP, DEFAULT_TILE_SIZE, get_tiled_predictor
+from .video_processing import play_stream, process_video
+
+OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "steel_defect_outputs")
+OUTPUT_MAX_AGE = 24 * 3600
+# Larger outputs are left on disk instead of being loaded into a download button.
+MAX_DOWNLOAD_BYTES = 200 * 1024**2
 
 
 def setup_ui(model):
@@ -19,50 +44,334 @@ def setup_ui(model):
     Returns:
         None
     """
-    file_type = st.sidebar.selectbox("Select file type", ["Image", "Video"], index=1)
-    uploaded_file = st.sidebar.file_uploader(
-        "Upload a file", type=["png", "jpg", "jpeg", "mp4", "mov", "avi"]
+    file_type = st.sidebar.selectbox(
+        "Select file type", ["Image", "Video", "Stream"], index=1
+    )
+    uploaded_file = (
+        st.sidebar.file_uploader(
+            "Upload a file", type=["png", "jpg", "jpeg", "mp4", "mov", "avi"]
+        )
+        if file_type != "Stream"
+        else None
     )
     confidence_level = st.sidebar.slider(
         "Confidence Level", min_value=0, max_value=100, step=10
     )
+    save_detections = st.sidebar.checkbox("Save detections to database", value=False)
 
-    if uploaded_file:
+    if file_type == "Stream":
+        render_stream(model, confidence_level, save_detections)
+    elif uploaded_file:
         if file_type == "Image":
             st.header("Image Detection")
             image = Image.open(uploaded_file)
-            result = model(image, conf=confidence_level / 100)[0]
-            data = extract_image_data(result, confidence_level)
-            result_img = annotate_image(result, data)
+            tiled = st.sidebar.checkbox(
+                "Tiled inference",
+                help="Slice large images into overlapping tiles so small "
+                "defects are not lost when the image is downscaled.",
+            )
+            if tiled:
+                tile_size = st.sidebar.number_input(
+                    "Tile size",
+                    min_value=320,
+                    max_value=1280,
+                    value=DEFAULT_TILE_SIZE,
+                    step=32,
+                )
+                overlap = st.sidebar.slider(
+                    "Tile overlap",
+                    min_value=0.0,
+                    max_value=0.5,
+                    value=DEFAULT_OVERLAP,
+                    step=0.05,
+                )
+                workers = st.sidebar.number_input(
+                    "Tile workers", min_value=1, max_value=os.cpu_count() or 1, value=1
+                )
+                predictor = get_tiled_predictor(model, workers)
+                variant = ("tiled", tile_size, overlap)
+
+                def predict(frame, floor):
+                    return predictor.predict(frame, floor, tile_size, overlap)
+
+            else:
+                variant = ("full",)
+
+                def predict(frame, floor):
+                    return model(frame, conf=floor / 100, verbose=False)[0]
+
+            frame = cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+            # Inference runs once per image at the floor confidence; moving the
+            # slider only filters the cached boxes.
+            result = cached_predict(
+                model, uploaded_file.getvalue(), frame, predict, variant
+            )
+            stats = detection_cache.stats()
+            st.sidebar.caption(
+                f"Detection cache: {stats['entries']} images, "
+                f"{stats['hits']} hits, {stats['misses']} misses"
+            )
+            instrumentation.record_speed(result)
+            with instrumentation.timer("extract"):
+                detections = extract_detections(result, confidence_level)
+            data = detections_to_frame(detections, result.names)
+            with instrumentation.timer("annotate"):
+                result_img = annotate_image(result, detections)
 
             col1, col2 = st.columns(2)
             with col1:
                 st.image(image, caption="Upload")
             with col2:
-                st.image(result_img, caption="Result")
+                st.image(result_img, caption="Result", channels="BGR")
             st.write("Detection Details")
-            st.dataframe(data)
+            st.dataframe(format_detections(data))
+            if save_detections and st.button("Save Detections"):
+                get_writer().submit(
+                    detection_rows(detections, result.names, uploaded_file.name)
+                )
+                st.success(f"Queued {len(detections)} detections for saving.")
 
         elif file_type == "Video":
             st.header("Video Detection")
-            if st.button("Start Video"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.video(uploaded_file)
-                with col2:
-                    result_video_placeholder = st.empty()
-
-                duration_placeholder, metrics_placeholder, defects_placeholder = (
-                    st.empty(),
-                    st.empty(),
-                    st.empty(),
-                )
-                process_video(
-                    uploaded_file,
-                    model,
-                    result_video_placeholder,
-                    metrics_placeholder,
-                    defects_placeholder,
-                    duration_placeholder,
-                    confidence_level,
+            video_mode = st.sidebar.radio("Video mode", ["Real-time", "All frames"])
+            if video_mode == "All frames":
+                batch_size = st.sidebar.number_input(
+                    "Batch size", min_value=1, max_value=64, value=DEFAULT_BATCH_SIZE
                 )
+                if st.button("Process Video"):
+                    render_offline_video(
+                        uploaded_file, model, confidence_level, batch_size
+                    )
+                show_offline_outputs(uploaded_file)
+            else:
+                keyframe_interval, scene_threshold, preview = realtime_settings()
+                if st.button("Start Video"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.video(uploaded_file)
+                    with col2:
+                        result_video_placeholder = st.empty()
+
+                    duration_placeholder, metrics_placeholder, defects_placeholder = (
+                        st.empty(),
+                        st.empty(),
+                        st.empty(),
+                    )
+                    process_video(
+                        uploaded_file,
+                        model,
+                        result_video_placeholder,
+                        metrics_placeholder,
+                        defects_placeholder,
+                        duration_placeholder,
+                        confidence_level,
+                        save_detections,
+                        keyframe_interval,
+                        scene_threshold,
+                        *preview,
+                    )
+
+
+def realtime_settings():
+    """
+    Adds the sidebar controls shared by real-time video and live streams.
+
+    Returns:
+        tuple: Keyframe interval, scene change threshold (None when disabled)
+            and the ``(display_width, jpeg_quality, max_ui_fps)`` preview settings.
+    """
+    keyframe_interval = st.sidebar.number_input(
+        "Detect every N frames", min_value=1, max_value=30, value=1
+    )
+    scene_threshold = st.sidebar.slider(
+        "Scene change threshold",
+        min_value=0.0,
+        max_value=0.5,
+        value=0.0,
+        step=0.01,
+        help="Also detect when the frame changes by more than this "
+        "fraction since the last detection. 0 disables it.",
+    )
+    with st.sidebar.expander("Preview"):
+        display_width = st.number_input(
+            "Width (px)",
+            min_value=320,
+            max_value=1920,
+            value=DEFAULT_DISPLAY_WIDTH,
+            step=64,
+        )
+        jpeg_quality = st.slider(
+            "JPEG quality",
+            min_value=30,
+            max_value=95,
+            value=DEFAULT_JPEG_QUALITY,
+        )
+        max_ui_fps = st.slider(
+            "Refresh rate (fps)",
+            min_value=1,
+            max_value=30,
+            value=DEFAULT_UI_FPS,
+        )
+    return (
+        keyframe_interval,
+        scene_threshold or None,
+        (display_width, jpeg_quality, max_ui_fps),
+    )
+
+
+def render_stream(model, confidence_level, save_detections):
+    """
+    Runs live detection on a camera or network stream.
+
+    Args:
+        model (YOLO): Loaded YOLO model.
+        confidence_level (float): Minimum confidence percentage for detections.
+        save_detections (bool): Persist keyframe detections through the background writer.
+
+    Returns:
+        None
+    """
+    st.header("Live Detection")
+    url = st.sidebar.text_input(
+        "Stream URL",
+        value=os.environ.get("DETECT_STREAM_URL", ""),
+        help="rtsp:// or http:// URL, /dev/video0, a GStreamer pipeline, or a "
+        "local video file or image folder to replay.",
+    )
+    replay_fps = st.sidebar.number_input(
+        "Replay FPS",
+        min_value=0,
+        max_value=120,
+        value=0,
+        help="Frame rate for replayed files and folders. 0 uses the file's own rate.",
+    )
+    keyframe_interval, scene_threshold, preview = realtime_settings()
+    if url and st.button("Start Stream"):
+        result_video_placeholder = st.empty()
+        duration_placeholder, metrics_placeholder, defects_placeholder = (
+            st.empty(),
+            st.empty(),
+            st.empty(),
+        )
+        play_stream(
+            url,
+            model,
+            result_video_placeholder,
+            metrics_placeholder,
+            defects_placeholder,
+            duration_placeholder,
+            confidence_level,
+            save_detections,
+            keyframe_interval,
+            scene_threshold,
+            *preview,
+            replay_fps=replay_fps or None,
+        )
+
+
+def _upload_key(uploaded_file):
+    return getattr(uploaded_file, "file_id", None) or uploaded_file.name
+
+
+def _cleanup_outputs(keep=None):
+    if not os.path.isdir(OUTPUT_DIR):
+        return
+    for entry in os.scandir(OUTPUT_DIR):
+        if entry.path != keep and time.time() - entry.stat().st_mtime > OUTPUT_MAX_AGE:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def render_offline_video(uploaded_file, model, confidence_level, batch_size):
+    """
+    Processes every frame of the uploaded video into a per-session output directory.
+
+    The outputs and statistics are kept in the session state, so
+    ``show_offline_outputs`` still shows them after the reruns triggered by
+    the download buttons.
+
+    Args:
+        uploaded_file: Streamlit file uploader object for video.
+        model (YOLO): Loaded YOLO model.
+        confidence_level (float): Minimum confidence percentage for detections.
+        batch_size (int): Number of frames per inference call.
+
+    Returns:
+        None
+    """
+    progress_bar = st.progress(0.0, text="Processing frames...")
+
+    def update_progress(frames_done, total_frames):
+        progress_bar.progress(
+            min(frames_done / total_frames, 1.0) if total_frames else 0.0,
+            text=f"Processed {frames_done}/{total_frames} frames",
+        )
+
+    previous = st.session_state.pop("offline_output", None)
+    if previous:
+        shutil.rmtree(previous["dir"], ignore_errors=True)
+    output_dir = os.path.join(OUTPUT_DIR, uuid.uuid4().hex)
+    os.makedirs(output_dir)
+    _cleanup_outputs(keep=output_dir)
+
+    output_path = os.path.join(output_dir, "annotated.mp4")
+    sidecar_path = os.path.join(output_dir, "detections.parquet")
+    with spooled_video(uploaded_file) as video_path:
+        stats = process_video_offline(
+            video_path,
+            model,
+            confidence_level,
+            output_path,
+            sidecar_path,
+            batch_size=batch_size,
+            progress_callback=update_progress,
+        )
+    progress_bar.empty()
+    st.session_state.offline_output = {
+        "upload": _upload_key(uploaded_file),
+        "dir": output_dir,
+        "files": [
+            ("Download annotated video", output_path),
+            ("Download detections", sidecar_path),
+        ],
+        "summary": (
+            f"Frames Processed: {stats['frames']}\n"
+            f"Detections: {stats['detections']}\n"
+            f"Elapsed: {stats['elapsed']:.2f} sec\n"
+            f"Throughput: {stats['fps']:.2f} frames/sec\n"
+            + (instrumentation.format_summary() if instrumentation.enabled() else "")
+        ),
+    }
+
+
+def show_offline_outputs(uploaded_file):
+    """
+    Shows the statistics and downloads of the last processed video.
+
+    Nothing is shown if the outputs belong to a different upload or were
+    removed from disk. Files above ``MAX_DOWNLOAD_BYTES`` are not offered for
+    download; their path on the server is shown instead.
+
+    Args:
+        uploaded_file: Streamlit file uploader object for video.
+
+    Returns:
+        None
+    """
+    output = st.session_state.get("offline_output")
+    if (
+        not output
+        or output["upload"] != _upload_key(uploaded_file)
+        or not os.path.isdir(output["dir"])
+    ):
+        return
+
+    st.text(output["summary"])
+    for label, path in output["files"]:
+        size = os.path.getsize(path)
+        if size > MAX_DOWNLOAD_BYTES:
+            st.info(
+                f"{os.path.basename(path)} ({size / 1024**2:.0f} MB) saved to {path}"
+            )
+            continue
+        with open(path, "rb") as output_file:
+            st.download_button(label, output_file, os.path.basename(path), key=path)
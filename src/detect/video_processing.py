@@ -2,129 +2,387 @@
 Video processing functions for defect detection.
 """
 
-import os
-import tempfile
 import time
 
 import cv2
 import streamlit as st
 
-from .image_processing import annotate_image, extract_image_data
+from . import instrumentation
+from .defect_writer import detection_rows, get_writer
+from .frame_source import VideoFileSource
+from .image_processing import (
+    AnnotationRenderer,
+    annotate_image,
+    detections_to_frame,
+    format_detections,
+)
+from .pipeline import VideoPipeline
+from .presenter import (
+    DEFAULT_DISPLAY_WIDTH,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_UI_FPS,
+    FramePresenter,
+)
+from .spool import spooled_video
+from .streaming import (
+    DEFAULT_RING_SIZE,
+    StreamFrameSource,
+    StreamIngestor,
+    open_stream,
+)
+from .tracking import BoxTracker, PropagatedResult
 
 
-def load_video(uploaded_file):
+def process_video(
+    uploaded_file,
+    model,
+    result_video_placeholder,
+    metrics_placeholder,
+    defects_placeholder,
+    duration_placeholder,
+    confidence_threshold,
+    save_detections=False,
+    keyframe_interval=1,
+    scene_threshold=None,
+    display_width=DEFAULT_DISPLAY_WIDTH,
+    jpeg_quality=DEFAULT_JPEG_QUALITY,
+    max_ui_fps=DEFAULT_UI_FPS,
+):
     """
-    Saves an uploaded video file temporarily to disk.
+    Processes an uploaded video file, performing YOLO inference on each frame while maintaining real-time performance.
 
     Args:
         uploaded_file: Streamlit file uploader object for video.
+        model: YOLO object detection model.
+        result_video_placeholder: Streamlit placeholder for displaying processed video frames.
+        metrics_placeholder: Streamlit placeholder for displaying FPS and performance metrics.
+        defects_placeholder: Streamlit placeholder for displaying defect data.
+        duration_placeholder: Streamlit placeholder for displaying video processing duration.
+        confidence_threshold (float): Minimum confidence level for detections.
+        save_detections (bool): Persist processed detections through the background writer.
+        keyframe_interval (int): Run the detector on every Nth frame and track boxes in between.
+        scene_threshold (float, optional): Also run the detector when the scene changes by more
+            than this fraction.
+        display_width (int): Maximum width of the preview sent to the browser.
+        jpeg_quality (int): JPEG quality of the preview.
+        max_ui_fps (float): Maximum preview and panel refresh rate.
 
     Returns:
-        str: Path to the saved temporary video file.
+        dict: Frames processed, displayed and skipped, and unique defects.
     """
-    video_bytes = uploaded_file.read()
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    temp_file.write(video_bytes)
-    temp_file.flush()
-    return temp_file.name
+    with spooled_video(uploaded_file) as video_path:
+        return play_video(
+            video_path,
+            model,
+            result_video_placeholder,
+            metrics_placeholder,
+            defects_placeholder,
+            duration_placeholder,
+            confidence_threshold,
+            uploaded_file.name if save_detections else None,
+            keyframe_interval,
+            scene_threshold,
+            display_width,
+            jpeg_quality,
+            max_ui_fps,
+        )
 
 
-def process_frame(frame, model, confidence_threshold):
+def play_video(
+    video_path,
+    model,
+    result_video_placeholder,
+    metrics_placeholder,
+    defects_placeholder,
+    duration_placeholder,
+    confidence_threshold,
+    save_as=None,
+    keyframe_interval=1,
+    scene_threshold=None,
+    display_width=DEFAULT_DISPLAY_WIDTH,
+    jpeg_quality=DEFAULT_JPEG_QUALITY,
+    max_ui_fps=DEFAULT_UI_FPS,
+):
     """
-    Processes a single video frame by performing YOLO inference and annotating detected objects.
+    Runs real-time detection on a video file on disk, updating the placeholders per displayed frame.
 
     Args:
-                    frame (np.array): Video frame image.
-                    model: YOLO object detection model.
-                    confidence_threshold (float): Minimum confidence level for detections.
+        video_path (str): Path to the video file.
+        model: YOLO object detection model.
+        result_video_placeholder: Streamlit placeholder for displaying processed video frames.
+        metrics_placeholder: Streamlit placeholder for displaying FPS and performance metrics.
+        defects_placeholder: Streamlit placeholder for displaying defect data.
+        duration_placeholder: Streamlit placeholder for displaying video processing duration.
+        confidence_threshold (float): Minimum confidence level for detections.
+        save_as (str, optional): Name under which displayed detections are persisted
+            as ``<save_as>#<frame>``; nothing is saved when None. Only keyframe
+            detections are saved, so propagated boxes are not stored twice.
+        keyframe_interval (int): Run the detector on every Nth frame and track boxes in between.
+        scene_threshold (float, optional): Also run the detector when the scene changes by more
+            than this fraction.
+        display_width (int): Maximum width of the preview sent to the browser.
+        jpeg_quality (int): JPEG quality of the preview.
+        max_ui_fps (float): Maximum preview and panel refresh rate.
 
     Returns:
-                    tuple: Annotated frame and extracted detection data as a DataFrame.
+        dict: Frames processed, displayed and skipped, and unique defects.
     """
-    results = model(frame)
-    defects_data = extract_image_data(results[0], confidence_threshold)
-    return annotate_image(results[0], defects_data), defects_data
+    video_capture = cv2.VideoCapture(video_path)
 
+    if not video_capture.isOpened():
+        st.error("Error: Unable to open video file.")
+        return
 
-def process_video(
-    uploaded_file,
+    source = VideoFileSource(video_capture)
+    return _run_display_loop(
+        source,
+        int(source.frame_rate),
+        model,
+        result_video_placeholder,
+        metrics_placeholder,
+        defects_placeholder,
+        duration_placeholder,
+        confidence_threshold,
+        save_as,
+        keyframe_interval,
+        scene_threshold,
+        display_width,
+        jpeg_quality,
+        max_ui_fps,
+    )
+
+
+def play_stream(
+    url,
     model,
     result_video_placeholder,
     metrics_placeholder,
     defects_placeholder,
     duration_placeholder,
     confidence_threshold,
+    save_detections=False,
+    keyframe_interval=1,
+    scene_threshold=None,
+    display_width=DEFAULT_DISPLAY_WIDTH,
+    jpeg_quality=DEFAULT_JPEG_QUALITY,
+    max_ui_fps=DEFAULT_UI_FPS,
+    replay_fps=None,
+    ring_size=DEFAULT_RING_SIZE,
 ):
     """
-    Processes an uploaded video file, performing YOLO inference on each frame while maintaining real-time performance.
+    Runs live detection on a camera or stream until it is stopped.
+
+    Frames are ingested into a fixed-size ring buffer on a background thread
+    and the detector always takes the newest one, so the display stays close
+    to live however slow inference is. A lost stream is reconnected with
+    exponential backoff.
 
     Args:
-        uploaded_file: Streamlit file uploader object for video.
+        url (str): RTSP/HTTP URL, V4L2 device, GStreamer pipeline, or a local
+            video file or image directory to replay as a fake camera.
         model: YOLO object detection model.
         result_video_placeholder: Streamlit placeholder for displaying processed video frames.
         metrics_placeholder: Streamlit placeholder for displaying FPS and performance metrics.
         defects_placeholder: Streamlit placeholder for displaying defect data.
-        duration_placeholder: Streamlit placeholder for displaying video processing duration.
+        duration_placeholder: Streamlit placeholder for displaying the stream uptime.
         confidence_threshold (float): Minimum confidence level for detections.
+        save_detections (bool): Persist keyframe detections as ``<url>#<frame>``.
+        keyframe_interval (int): Run the detector on every Nth frame and track boxes in between.
+        scene_threshold (float, optional): Also run the detector when the scene changes by more
+            than this fraction.
+        display_width (int): Maximum width of the preview sent to the browser.
+        jpeg_quality (int): JPEG quality of the preview.
+        max_ui_fps (float): Maximum preview and panel refresh rate.
+        replay_fps (float, optional): Emission rate when replaying a local file or directory.
+        ring_size (int): Ring buffer capacity in frames.
+
+    Returns:
+        dict: Frames processed, displayed and skipped, and unique defects.
     """
-    temp_file_path = load_video(uploaded_file)
-    video_capture = cv2.VideoCapture(temp_file_path)
+    ingestor = StreamIngestor(
+        lambda: open_stream(url, replay_fps), capacity=ring_size
+    ).start()
+    source = StreamFrameSource(ingestor)
+    return _run_display_loop(
+        source,
+        None,
+        model,
+        result_video_placeholder,
+        metrics_placeholder,
+        defects_placeholder,
+        duration_placeholder,
+        confidence_threshold,
+        url if save_detections else None,
+        keyframe_interval,
+        scene_threshold,
+        display_width,
+        jpeg_quality,
+        max_ui_fps,
+    )
 
-    if not video_capture.isOpened():
-        st.error("Error: Unable to open video file.")
-        return
 
-    frame_rate = int(video_capture.get(cv2.CAP_PROP_FPS))
-    total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-    start_time, frame_index = time.time(), 0
-    frames_skipped, frames_displayed = 0, 0
-    prev_frame_time = start_time
+def _source_metrics(source, frame_index):
+    stats = source.stats()
+    if isinstance(source, StreamFrameSource):
+        lag = source.lag(frame_index)
+        if lag is not None:
+            instrumentation.record("stream_lag", lag)
+        return (
+            f"Stream: {'connected' if stats['connected'] else 'reconnecting'} "
+            f"({stats['reconnects']} reconnects)\n"
+            f"Ingest FPS: {stats['ingest_fps']:.2f}\n"
+            f"Frames Ingested: {stats['frames_ingested']} "
+            f"({stats['frames_dropped']} dropped before inference)\n"
+            f"Inference Lag: {lag or 0:.3f} sec\n"
+            + (
+                f"Last Error: {stats['last_error']}\n"
+                if stats["last_error"] and not stats["connected"]
+                else ""
+            )
+        )
+    return (
+        f"Frames Grabbed: {stats['grabs']} ({stats['grab_time']:.3f} sec)\n"
+        f"Seeks: {stats['seeks']} ({stats['seek_time']:.3f} sec)\n"
+    )
 
-    while video_capture.isOpened():
-        ret, frame = video_capture.read()
-        if not ret or frame_index >= total_frames:
-            break
 
-        frame_processing_start = time.time()
-        result_img, defects_data_frame = process_frame(
-            frame, model, confidence_threshold
-        )
-        frame_processing_time = time.time() - frame_processing_start
+def _run_display_loop(
+    source,
+    frame_rate,
+    model,
+    result_video_placeholder,
+    metrics_placeholder,
+    defects_placeholder,
+    duration_placeholder,
+    confidence_threshold,
+    save_as,
+    keyframe_interval,
+    scene_threshold,
+    display_width,
+    jpeg_quality,
+    max_ui_fps,
+):
+    live = isinstance(source, StreamFrameSource)
+    writer = get_writer() if save_as else None
+    start_time = time.time()
+    frames_processed = 0
+    prev_frame_time = start_time
+    renderer = AnnotationRenderer()
+    tracker = BoxTracker()
+    pipeline = VideoPipeline(
+        source,
+        model,
+        confidence_threshold,
+        frame_rate,
+        # A live source is paced by the camera and always yields its newest frame.
+        realtime=not live,
+        queue_size=1 if live else 2,
+        keyframe_interval=keyframe_interval,
+        scene_threshold=scene_threshold,
+        tracker=tracker,
+        # While a stream is down, wake up to show its status and let
+        # Streamlit stop the script.
+        heartbeat=1.0 if live else None,
+    )
 
-        time_since_last_frame = time.time() - prev_frame_time
-        display_fps = 1 / time_since_last_frame if time_since_last_frame > 0 else 0
-        prev_frame_time = time.time()
+    presenter = FramePresenter(
+        result_video_placeholder, display_width, jpeg_quality, max_ui_fps
+    ).start()
+    next_panel_update = 0.0
 
-        result_video_placeholder.image(result_img, channels="RGB")
+    def push_panels(
+        frame_index, result, detections, processing_fps, frame_processing_time
+    ):
+        push_start = time.perf_counter()
 
-        # Calculate total frames passed (skipped + displayed)
-        total_frames_passed = frames_skipped + frames_displayed
+        # Frames dropped by the pipeline so far count as skipped; of the frames
+        # processed, only those the presenter sent reached the browser.
+        frames_skipped = pipeline.frames_dropped
+        frames_displayed = presenter.frames_sent
+        total_frames_passed = frames_skipped + frames_processed
 
-        # Avoid division by zero
-        if total_frames_passed > 0:
-            frames_skipped_percentage = (frames_skipped * 100) / total_frames_passed
-            frames_displayed_percentage = (frames_displayed * 100) / total_frames_passed
-        else:
-            frames_skipped_percentage = 0
-            frames_displayed_percentage = 0
+        def share(count):
+            # Avoid division by zero
+            return count * 100 / total_frames_passed if total_frames_passed else 0
 
         duration_placeholder.text(f"Video Duration: {time.time() - start_time:.2f} sec")
         metrics_placeholder.text(
-            f"Original FPS: {frame_rate}\n"
-            f"Display FPS: {display_fps:.2f}\n"
+            f"Original FPS: {frame_rate or source.frame_rate:.0f}\n"
+            f"Display FPS: {presenter.fps:.2f}\n"
+            f"Processing FPS: {processing_fps:.2f}\n"
             f"Processing Time per Frame: {frame_processing_time:.3f} sec\n"
-            f"Frames Skipped: {frames_skipped}/{total_frames_passed} ({frames_skipped_percentage:.2f}%)\n"
-            f"Frames Displayed: {frames_displayed}/{total_frames_passed} ({frames_displayed_percentage:.2f}%)\n"
+            f"Frames Skipped: {frames_skipped}/{total_frames_passed} ({share(frames_skipped):.2f}%)\n"
+            f"Frames Processed: {frames_processed}/{total_frames_passed} ({share(frames_processed):.2f}%)\n"
+            f"Frames Displayed: {frames_displayed}/{total_frames_passed} ({share(frames_displayed):.2f}%, "
+            f"{presenter.frames_replaced} stale dropped, {presenter.bytes_sent / 1024:.0f} KB)\n"
+            + _source_metrics(source, frame_index)
+            + f"Keyframes: {pipeline.keyframes}/{pipeline.frames_inferred}\n"
+            f"Unique Defects: {tracker.unique_defects}\n"
+            + (instrumentation.format_summary() if instrumentation.enabled() else "")
         )
-        defects_placeholder.dataframe(defects_data_frame)
-
-        elapsed_real_time = time.time() - start_time
-        expected_frame_index = int(elapsed_real_time * frame_rate)
-        if expected_frame_index > frame_index:
-            frames_skipped += expected_frame_index - frame_index - 1
-            frame_index = expected_frame_index
-        frames_displayed += 1
-        video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-
-    video_capture.release()
-    os.remove(temp_file_path)
+        defects_placeholder.dataframe(
+            format_detections(detections_to_frame(detections, result.names))
+        )
+        instrumentation.record("ui_push", time.perf_counter() - push_start)
+
+    last_panels = None
+    try:
+        for item in pipeline:
+            if item is None:
+                duration_placeholder.text(
+                    f"Video Duration: {time.time() - start_time:.2f} sec"
+                )
+                metrics_placeholder.text(
+                    "Waiting for frames...\n" + _source_metrics(source, None)
+                )
+                continue
+            frame_index, _, result, detections, inference_time = item
+            render_start = time.time()
+            with instrumentation.timer("annotate"):
+                result_img = annotate_image(result, detections, renderer, in_place=True)
+            frame_processing_time = inference_time + time.time() - render_start
+
+            time_since_last_frame = time.time() - prev_frame_time
+            processing_fps = (
+                1 / time_since_last_frame if time_since_last_frame > 0 else 0
+            )
+            prev_frame_time = time.time()
+
+            presenter.show(result_img)
+            frames_processed += 1
+
+            if writer is not None and not isinstance(result, PropagatedResult):
+                writer.submit(
+                    detection_rows(detections, result.names, f"{save_as}#{frame_index}")
+                )
+
+            last_panels = (
+                frame_index,
+                result,
+                detections,
+                processing_fps,
+                frame_processing_time,
+            )
+            # Text panels are refreshed at the preview rate, not per frame
+            if time.monotonic() < next_panel_update:
+                continue
+            next_panel_update = time.monotonic() + presenter.interval
+            push_panels(*last_panels)
+    finally:
+        presenter.close()
+        if live:
+            # Closing the ring wakes a decoder waiting for the next frame.
+            source.release()
+        pipeline.stop()
+        source.release()
+
+    # The last frames usually fall inside the rate limit; show the final counts.
+    if last_panels is not None:
+        push_panels(*last_panels)
+
+    return {
+        "frames_processed": frames_processed,
+        "frames_displayed": presenter.frames_sent,
+        "frames_skipped": pipeline.frames_dropped,
+        "unique_defects": tracker.unique_defects,
+    }
@@ -0,0 +1,186 @@
+"""
+On-disk cache of downscaled previews for labeling images.
+
+Previews are keyed by source path, mtime, size and encoding settings, so an
+image replaced on disk gets a fresh preview. The cache directory is kept
+under a size cap by evicting least recently used files, and upcoming images
+can be rendered ahead of time on a background thread, which works on the
+most recent request of every session in turn.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "steel_defect_previews")
+MAX_CACHE_BYTES = 1024**3
+THUMBNAIL_SIZE = 200
+PREVIEW_SIZE = 1280
+PREVIEW_FORMAT = "JPEG"
+PREVIEW_QUALITY = 85
+# Files used this recently may still be about to be sent to a browser.
+MIN_CACHE_AGE = 10
+
+_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+# Paths still to render, keyed by session, in round-robin order.
+_prefetch_pending = OrderedDict()
+_prefetch_thread = None
+_prefetch_cond = threading.Condition()
+
+
+def _cache_path(path, max_side, image_format, quality, cache_dir):
+    stat = os.stat(path)
+    key = (
+        f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}:"
+        f"{max_side}:{quality}"
+    )
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(cache_dir, digest + _EXTENSIONS[image_format])
+
+
+def get_preview(
+    path,
+    max_side=PREVIEW_SIZE,
+    image_format=PREVIEW_FORMAT,
+    quality=PREVIEW_QUALITY,
+    cache_dir=CACHE_DIR,
+):
+    """
+    Returns the path of a cached preview, rendering it on first use.
+
+    Args:
+        path (str): Source image path.
+        max_side (int): Longest side of the preview in pixels.
+        image_format (str): ``"JPEG"`` or ``"WEBP"``.
+        quality (int): Encoder quality.
+        cache_dir (str): Cache directory.
+
+    Returns:
+        str: Path of the preview file.
+    """
+    preview_path = _cache_path(path, max_side, image_format, quality, cache_dir)
+    if os.path.exists(preview_path):
+        os.utime(preview_path)
+        return preview_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(path) as image:
+        # For JPEG sources, draft() decodes at a reduced DCT scale directly.
+        image.draft("RGB", (max_side, max_side))
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        fd, partial_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as partial_file:
+                image.save(partial_file, image_format, quality=quality)
+            os.replace(partial_path, preview_path)
+        except BaseException:
+            os.remove(partial_path)
+            raise
+    return preview_path
+
+
+def get_thumbnail(path, cache_dir=CACHE_DIR):
+    """
+    Returns the path of a cached thumbnail.
+
+    Args:
+        path (str): Source image path.
+        cache_dir (str): Cache directory.
+
+    Returns:
+        str: Path of the thumbnail file.
+    """
+    return get_preview(path, THUMBNAIL_SIZE, cache_dir=cache_dir)
+
+
+def cleanup_cache(
+    cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, min_age=MIN_CACHE_AGE
+):
+    """
+    Evicts least recently used previews until the cache fits ``max_bytes``.
+
+    Files rendered or used in the last ``min_age`` seconds are kept, so a
+    preview is never removed between ``get_preview`` returning its path and
+    the page sending it.
+
+    Args:
+        cache_dir (str): Cache directory.
+        max_bytes (int): Maximum total size of the cache in bytes.
+        min_age (float): Seconds since last use before a file can be evicted.
+
+    Returns:
+        int: Number of files removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and not entry.name.endswith(".part"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+
+    removed = 0
+    cutoff = time.time() - min_age
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes or mtime > cutoff:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _prefetch_worker():
+    while True:
+        with _prefetch_cond:
+            while not _prefetch_pending:
+                _prefetch_cond.wait()
+            session, paths = _prefetch_pending.popitem(last=False)
+            path = paths.pop(0)
+            # Back of the line, so every session's next page gets rendered.
+            if paths:
+                _prefetch_pending[session] = paths
+        try:
+            get_preview(path)
+            get_thumbnail(path)
+        except OSError:
+            # Missing or unreadable images are reported when displayed.
+            pass
+        with _prefetch_cond:
+            idle = not _prefetch_pending
+        if idle:
+            cleanup_cache()
+
+
+def prefetch(paths, session=None):
+    """
+    Renders previews and thumbnails for ``paths`` on a background thread.
+
+    Each session has at most one request waiting, which a newer request from
+    the same session replaces, so reruns cannot pile up work. Sessions are
+    served one image at a time in turn.
+
+    Args:
+        paths (list[str]): Source image paths.
+        session (hashable, optional): Requesting session, such as the
+            Streamlit session ID.
+    """
+    global _prefetch_thread
+    with _prefetch_cond:
+        if _prefetch_thread is None:
+            _prefetch_thread = threading.Thread(target=_prefetch_worker, daemon=True)
+            _prefetch_thread.start()
+        _prefetch_pending.pop(session, None)
+        if paths:
+            _prefetch_pending[session] = list(paths)
+        _prefetch_cond.notify()
@@ -0,0 +1,58 @@
+"""
+SQL run by the label page.
+
+Kept free of Streamlit so ``src.check_query_plans`` explains exactly the
+statements the page executes.
+"""
+
+PAGE_SIZE = 50
+
+WEEK_FILTER = """
+    {column}
+        BETWEEN (DATE_TRUNC('week', NOW() AT TIME ZONE 'Asia/Jakarta') + INTERVAL '1 day') AT TIME ZONE 'Asia/Jakarta'
+            AND (DATE_TRUNC('week', NOW() AT TIME ZONE 'Asia/Jakarta') + INTERVAL '7 days') AT TIME ZONE 'Asia/Jakarta'
+"""
+
+# Added to the page query after the first page.
+AFTER_CURSOR = """
+    AND (page.created_at, page.path_gambar)
+        > (CAST(:after_created_at AS timestamptz), CAST(:after_path AS varchar))
+"""
+
+
+def anomaly_page_query(after_cursor):
+    """
+    Returns the keyset page query over this week's distinct anomaly images.
+
+    Args:
+        after_cursor (bool): Whether to add the ``AFTER_CURSOR`` condition.
+
+    Returns:
+        str: SQL with ``:page_size`` and, after the first page,
+            ``:after_created_at``/``:after_path`` parameters.
+    """
+    return f"""
+        SELECT DISTINCT page.path_gambar, page.created_at AS first_created_at
+        FROM production_anomaly AS page
+        WHERE {WEEK_FILTER.format(column="page.created_at")}
+            {AFTER_CURSOR if after_cursor else ""}
+            AND NOT EXISTS (
+                SELECT 1
+                FROM production_anomaly AS earlier
+                WHERE earlier.path_gambar = page.path_gambar
+                    AND {WEEK_FILTER.format(column="earlier.created_at")}
+                    AND earlier.created_at < page.created_at
+            )
+        ORDER BY first_created_at, page.path_gambar
+        LIMIT :page_size
+    """
+
+
+# Takes an expanding ``:paths`` parameter.
+ANOMALY_BOXES_QUERY = f"""
+    SELECT path_gambar, x0, y0, x1, y1, defect_name
+    FROM production_anomaly
+    JOIN class_defect USING (class_id)
+    WHERE path_gambar IN :paths
+        AND {WEEK_FILTER.format(column="created_at")}
+"""
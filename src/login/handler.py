@@ -4,8 +4,6 @@ Login handler module.
 
 import streamlit as st
 
-from src.auth import authenticate, get_role, get_user_id, log_user_session
-
 
 def handle_login(username, password):
     """Handle user authentication and session management."""
@@ -16,19 +14,16 @@ def handle_login(username, password):
         st.write("Please enter a valid password")
         return
 
-    if authenticate(username, password):
+    # SQLAlchemy is only needed once a login is submitted.
+    from src.auth import login
+
+    session = login(username, password)
+    if session:
         st.session_state.logged_in = True
         st.session_state.username = username
-
-        role = get_role(username)
-        if role:
-            st.session_state.role = role
-
-        user_id = get_user_id(username)
-        if user_id:
-            st.session_state.id_user = user_id
-            log_user_session(user_id)
-
+        st.session_state.role = session["role"]
+        st.session_state.id_user = session["id_user"]
+        st.session_state.id_operation = session["id_operation"]
         st.rerun()
     else:
         st.error("Invalid username or password. Please try again.")
@@ -1,10 +1,17 @@
+import importlib
+
 import streamlit as st
 
-import src.admin.app as admin
 import src.auth as auth  # Import authentication module
-import src.detect.app as detect
-import src.label.app as label
-import src.welcome.app as welcome
+
+# Page modules are imported on first visit, so torch, OpenCV and pandas
+# are only loaded by the pages that need them.
+PAGES = {
+    "Welcome Page": "src.welcome.app",
+    "Detect": "src.detect.app",
+    "Label": "src.label.app",
+    "Admin Page": "src.admin.app",
+}
 
 
 def main():
@@ -13,9 +20,7 @@ def main():
         st.warning("Please log in first.")
         return
 
-    menu_option = st.sidebar.selectbox(
-        "Select Menu", ("Welcome Page", "Detect", "Label", "Admin Page")
-    )
+    menu_option = st.sidebar.selectbox("Select Menu", tuple(PAGES))
 
     menu_navigation(menu_option)
 
@@ -25,11 +30,5 @@ def main():
 
 def menu_navigation(menu_option):
     """Navigate to the appropriate page."""
-    if menu_option == "Welcome Page":
-        welcome.main()
-    elif menu_option == "Detect":
-        detect.main()
-    elif menu_option == "Label":
-        label.main()
-    elif menu_option == "Admin Page":
-        admin.main()
+    if menu_option in PAGES:
+        importlib.import_module(PAGES[menu_option]).main()
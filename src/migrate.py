@@ -0,0 +1,290 @@
+"""
+Versioned schema migration runner.
+
+Migrations are the ``NNNN_name.sql`` files in ``migrations/`` at the
+repository root, applied in order, each in its own transaction, and recorded
+in the ``schema_migrations`` table. Migration transactions run without the
+application's ``statement_timeout``, so copying a large table is not
+cancelled, but give up after ``MIGRATION_LOCK_TIMEOUT_MS`` (env, default
+10000) waiting for a lock instead of queueing the app behind them.
+
+Monthly partitions of the production tables are created
+``DEFAULT_MONTHS_AHEAD`` months ahead by every upgrade and, while the app
+runs, by ``start_partition_maintenance`` once a day; rows past the last
+partition land in the DEFAULT partition, after which that month's
+partition can no longer be created. If the app's database user cannot
+create tables (``DB_PARTITION_MAINTENANCE=0``), schedule
+``python -m src.migrate partitions`` at least monthly, e.g. from cron.
+
+Usage (from the repository root):
+
+    python -m src.migrate              # apply pending migrations
+    python -m src.migrate status       # list applied and pending migrations
+    python -m src.migrate baseline 0001
+    python -m src.migrate partitions --months-ahead 3
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import text
+
+from src.database import begin
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+PARTITIONED_TABLES = ("production_anomaly", "production_defect")
+DEFAULT_MONTHS_AHEAD = 3
+LOCK_TIMEOUT_MS = int(os.environ.get("MIGRATION_LOCK_TIMEOUT_MS", 10000))
+PARTITION_MAINTENANCE = os.environ.get("DB_PARTITION_MAINTENANCE", "1") != "0"
+PARTITION_CHECK_INTERVAL = 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+_MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_TOKEN = re.compile(r"\$\w*\$|--|'|;")
+
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+    """
+    Lists migration files in version order.
+
+    Returns:
+        list[tuple]: ``(version, name, path)`` tuples.
+    """
+    migrations = []
+    for filename in sorted(os.listdir(migrations_dir)):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(
+                (match.group(1), match.group(2), os.path.join(migrations_dir, filename))
+            )
+    return migrations
+
+
+def split_statements(sql):
+    """
+    Splits a SQL script into statements.
+
+    Semicolons inside quoted strings, ``--`` comments and dollar-quoted
+    bodies are ignored, so PL/pgSQL functions stay intact.
+
+    Args:
+        sql (str): SQL script.
+
+    Returns:
+        list[str]: Non-empty statements without the trailing semicolon.
+    """
+    statements, start, position = [], 0, 0
+    while match := _TOKEN.search(sql, position):
+        token = match.group()
+        if token == ";":
+            statements.append(sql[start : match.start()])
+            start = position = match.end()
+        elif token == "--":
+            end = sql.find("\n", match.end())
+            position = len(sql) if end < 0 else end
+        else:
+            end = sql.find(token, match.end())
+            position = len(sql) if end < 0 else end + len(token)
+    statements.append(sql[start:])
+    return [
+        statement.strip()
+        for statement in statements
+        if re.sub(r"--[^\n]*", "", statement).strip()
+    ]
+
+
+def _ensure_table(conn):
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version character varying(4) PRIMARY KEY,
+                name character varying NOT NULL,
+                applied_at timestamp with time zone NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+
+
+def _set_timeouts(conn):
+    # SET LOCAL lasts until the end of the transaction, so pooled
+    # connections keep the application's statement_timeout afterwards.
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = {LOCK_TIMEOUT_MS}")
+
+
+def applied_versions():
+    """Returns the set of applied migration versions."""
+    with begin() as conn:
+        _ensure_table(conn)
+        rows = conn.execute(text("SELECT version FROM schema_migrations")).fetchall()
+    return {row[0] for row in rows}
+
+
+def _record(conn, version, name):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+        {"version": version, "name": name},
+    )
+
+
+def upgrade(target=None):
+    """
+    Applies pending migrations up to and including ``target``.
+
+    Args:
+        target (str, optional): Last version to apply; all pending when None.
+
+    Returns:
+        list[str]: Versions applied.
+    """
+    done = applied_versions()
+    applied = []
+    for version, name, path in list_migrations():
+        if target is not None and version > target:
+            break
+        if version in done:
+            continue
+        with open(path, encoding="utf-8") as migration_file:
+            statements = split_statements(migration_file.read())
+        with begin() as conn:
+            _set_timeouts(conn)
+            for statement in statements:
+                conn.exec_driver_sql(statement)
+            _record(conn, version, name)
+        print(f"Applied {version}_{name}")
+        applied.append(version)
+    return applied
+
+
+def baseline(version):
+    """
+    Marks migrations up to ``version`` as applied without running them.
+
+    Used for databases created before the migration runner existed.
+
+    Args:
+        version (str): Last version to mark as applied.
+    """
+    done = applied_versions()
+    with begin() as conn:
+        for migration_version, name, _ in list_migrations():
+            if migration_version > version:
+                break
+            if migration_version not in done:
+                _record(conn, migration_version, name)
+                print(f"Marked {migration_version}_{name} as applied")
+
+
+def ensure_partitions(months_ahead=DEFAULT_MONTHS_AHEAD):
+    """
+    Creates monthly partitions up to ``months_ahead`` months from now.
+
+    Run this from a monthly scheduled job so new rows never land in the
+    default partitions.
+
+    Args:
+        months_ahead (int): Number of future months to create.
+    """
+    with begin() as conn:
+        _set_timeouts(conn)
+        for table_name in PARTITIONED_TABLES:
+            conn.execute(
+                text("SELECT create_monthly_partitions(:parent, now(), :months)"),
+                {"parent": table_name, "months": months_ahead},
+            )
+
+
+_maintenance_started = False
+_maintenance_lock = threading.Lock()
+
+
+def start_partition_maintenance(interval=PARTITION_CHECK_INTERVAL):
+    """
+    Runs ``ensure_partitions`` now and then every ``interval`` seconds.
+
+    The checks run on a daemon thread, started once per process, so a long
+    running app keeps creating partitions without a scheduled job. Disabled
+    with ``DB_PARTITION_MAINTENANCE=0``.
+
+    Args:
+        interval (float): Seconds between checks.
+
+    Returns:
+        bool: True if this call started the thread.
+    """
+    global _maintenance_started
+    with _maintenance_lock:
+        if _maintenance_started or not PARTITION_MAINTENANCE:
+            return False
+        _maintenance_started = True
+
+    def maintain():
+        while True:
+            try:
+                ensure_partitions()
+            except Exception:
+                logger.exception("Creating upcoming partitions failed")
+            time.sleep(interval)
+
+    threading.Thread(target=maintain, name="partition-maintenance", daemon=True).start()
+    return True
+
+
+def status():
+    """Prints applied and pending migrations."""
+    with begin() as conn:
+        _ensure_table(conn)
+        query = text("SELECT version, applied_at FROM schema_migrations")
+        applied = dict(conn.execute(query).fetchall())
+    for version, name, _ in list_migrations():
+        if version in applied:
+            print(f"{version}_{name}: applied {applied[version]}")
+        else:
+            print(f"{version}_{name}: pending")
+
+
+def main(argv=None):
+    """Runs the migration command line and returns an exit code."""
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    commands = parser.add_subparsers(dest="command")
+    upgrade_parser = commands.add_parser("upgrade", help="Apply pending migrations.")
+    upgrade_parser.add_argument("target", nargs="?")
+    commands.add_parser("status", help="List applied and pending migrations.")
+    baseline_parser = commands.add_parser(
+        "baseline", help="Mark migrations as applied without running them."
+    )
+    baseline_parser.add_argument("version")
+    partitions_parser = commands.add_parser(
+        "partitions", help="Create upcoming monthly partitions."
+    )
+    partitions_parser.add_argument(
+        "--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        status()
+    elif args.command == "baseline":
+        baseline(args.version)
+    elif args.command == "partitions":
+        ensure_partitions(args.months_ahead)
+    else:
+        upgrade(getattr(args, "target", None))
+        if "0002" in applied_versions():
+            ensure_partitions()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+DetectionWriter against a SQLite stand-in for the production database.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src import database
+from src.detect.defect_writer import DEFECT_TABLE, DetectionWriter
+
+CREATE_DEFECT_TABLE = f"""
+    CREATE TABLE {DEFECT_TABLE} (
+        path_gambar VARCHAR NOT NULL,
+        class VARCHAR NOT NULL,
+        conf_level NUMERIC NOT NULL,
+        x0 INTEGER, y0 INTEGER, x1 INTEGER, y1 INTEGER
+    )
+"""
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'defects.db'}")
+    monkeypatch.setattr(database, "_engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def create_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_DEFECT_TABLE))
+
+
+def stored_rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {DEFECT_TABLE}")).scalar()
+
+
+def rows(count, path="frame.jpg"):
+    return {
+        DEFECT_TABLE: [
+            {
+                "path_gambar": path,
+                "class": "scratch",
+                "conf_level": 0.9,
+                "x0": i,
+                "y0": i,
+                "x1": i + 10,
+                "y1": i + 10,
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_flushes_when_batch_is_full(engine, tmp_path):
+    create_table(engine)
+    writer = DetectionWriter(batch_rows=5, flush_interval=60, spill_dir=tmp_path)
+    writer.submit(rows(3))
+    writer.submit(rows(3))
+    assert wait_for(lambda: stored_rows(engine) == 6)
+    assert writer.stats()["flushes"] == 1
+    writer.close()
+
+
+def test_flushes_after_interval(engine, tmp_path):
+    create_table(engine)
+    writer = DetectionWriter(batch_rows=1000, flush_interval=0.2, spill_dir=tmp_path)
+    writer.submit(rows(2))
+    assert wait_for(lambda: stored_rows(engine) == 2)
+    writer.close()
+
+
+def test_spills_while_table_is_missing_and_replays(engine, tmp_path):
+    spill_dir = tmp_path / "spill"
+    writer = DetectionWriter(batch_rows=1, flush_interval=0.1, spill_dir=spill_dir)
+    writer.submit(rows(4))
+    assert wait_for(lambda: writer.stats()["rows_spilled"] == 4)
+    assert writer.stats()["last_error"] is not None
+    assert len(list(spill_dir.glob("*.json"))) == 1
+
+    create_table(engine)
+    writer.submit(rows(1))
+    assert wait_for(lambda: stored_rows(engine) == 5)
+    assert not list(spill_dir.glob("*.json"))
+    writer.close()
+
+
+def test_full_queue_does_not_block_submit(engine, tmp_path, monkeypatch):
+    create_table(engine)
+    write = DetectionWriter._write
+
+    def slow_write(batch):
+        time.sleep(0.3)
+        write(batch)
+
+    monkeypatch.setattr(DetectionWriter, "_write", staticmethod(slow_write))
+    writer = DetectionWriter(
+        batch_rows=1, flush_interval=0.1, max_queue=1, spill_dir=tmp_path
+    )
+    start = time.perf_counter()
+    for _ in range(20):
+        writer.submit(rows(1))
+    assert time.perf_counter() - start < 0.1
+    writer.close()
+    stats = writer.stats()
+    assert stored_rows(engine) + stats["rows_dropped"] == 20
+    assert stats["rows_dropped"] > 0
+
+
+def test_close_flushes_pending_rows(engine, tmp_path):
+    create_table(engine)
+    writer = DetectionWriter(batch_rows=1000, flush_interval=60, spill_dir=tmp_path)
+    writer.submit(rows(7))
+    writer.close()
+    assert stored_rows(engine) == 7
+    assert writer.stats()["rows_written"] == 7